@@ -1,56 +1,46 @@
+import time
+
+# inicio del reporte de arranque: antes de importar Tk y el modelo
+STARTED = time.perf_counter()
+
+import os
+import sys
 import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime, timedelta
-import math
+from tkinter import ttk, messagebox, filedialog
+from datetime import date, datetime, timedelta
+
+from parqueadero_bulk import detect_format, export_users, export_vehicles, import_users, import_vehicles
+from parqueadero_events import UPDATED, ConfigChanged, DomainEvent, TicketClosed, TicketOpened, UserChanged, VehicleChanged
+from parqueadero_metrics import serve, write_textfile
+from parqueadero_occupancy import summarize
+from parqueadero_profiling import Profiler, StartupTimer
+from parqueadero_search import SearchResults
+from parqueadero_service import ParkingService, DB_PATH, ARCHIVE_DIR, VEHICLE_TYPES
 
 
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, db_path=DB_PATH, archive_dir=ARCHIVE_DIR):
+        # etapas del arranque hasta el primer cuadro interactivo y del login a la pantalla usable
+        self.startup = StartupTimer(STARTED)
+        self.startup.mark("módulos importados")
         super().__init__()
         self.title("Gestor de Parqueadero (Login simulado)")
         self.geometry("1060x680")
         self.minsize(980, 640)
 
-        # Estado de sesión y almacenamiento en memoria
-        self.session = {"user": None}  # dict con usuario autenticado
-
-        # Modelos en memoria
-        self.users = []  # {id, username, password, nombre}
-        self.vehicles = []  # {id, placa, user_id, marca, modelo, color}
-        self.spots = []  # {id, codigo, ocupado(bool)}
-        self.active_tickets = []  # {id, vehicle_id, spot_id, checkin, user_in}
-        self.closed_tickets = []  # {id, vehicle_id, spot_id, checkin, checkout, user_in, user_out, total}
-
-        # Configuración de negocio
-        self.rate_per_hour = 5.0  # tarifa por hora (USD/moneda local)
-        self.capacity = 12  # número de puestos
-
-        # Secuencias de IDs
-        self._user_next_id = 1
-        self._vehicle_next_id = 1
-        self._spot_next_id = 1
-        self._ticket_next_id = 1
+        # Modelo del parqueadero (sin Tk); la ventana es un cliente del servicio
+        self.service = ParkingService(db_path, archive_dir)
+        self.startup.mark("servicio cargado")
 
-        # UI Frames
+        # UI Frames (las pestañas de MainFrame se construyen al usarse)
         self.login_frame = LoginFrame(self)
         self.register_frame = RegisterUserFrame(self)
         self.main_frame = MainFrame(self)
 
-        self._seed_data()
         self.show_login()
-
-    # ===================== Datos iniciales =====================
-    def _seed_data(self):
-        # Usuarios: admin por defecto
-        self._create_user("admin", "admin", nombre="Administrador")
-        # Crear puestos por capacidad
-        self._ensure_spots(self.capacity)
-        # Usuarios de ejemplo
-        u1 = self._create_user("maria", "1234", nombre="María Pérez")
-        u2 = self._create_user("juan", "1234", nombre="Juan Ruiz")
-        # Vehículos de ejemplo
-        self._create_vehicle("ABC123", u1["id"], marca="Toyota", modelo="Yaris", color="Rojo")
-        self._create_vehicle("XYZ789", u2["id"], marca="Chevrolet", modelo="Onix", color="Negro")
+        self.startup.mark("ventana construida")
+        # los callbacks de inactividad corren después del primer dibujo pendiente
+        self.after_idle(lambda: self.startup.mark("primer cuadro interactivo"))
 
     # ===================== Navegación =====================
     def show_login(self):
@@ -70,215 +60,180 @@ class App(tk.Tk):
         self.register_frame.pack_forget()
         self.main_frame.refresh_all()
         self.main_frame.pack(fill="both", expand=True)
+        # en cola detrás del pintado de la pestaña visible
+        self.after_idle(self._main_ready)
+
+    def _main_ready(self):
+        if self.startup.elapsed("pantalla principal usable") is None:
+            self.startup.mark("pantalla principal usable")
+            if os.environ.get("PARQUEADERO_PROFILE"):
+                print("Arranque:\n" + self.startup.report(), file=sys.stderr)
+        self.main_frame.start_prewarm()
 
     # ===================== Sesión =====================
     def login(self, username, password):
-        user = self._find_user_by_username(username)
-        if user and user["password"] == password:
-            self.session["user"] = user
+        if self.service.login(username, password):
+            if self.startup.elapsed("login") is None:
+                self.startup.mark("login")
             self.show_main()
         else:
             messagebox.showerror("Error", "Usuario o contraseña incorrectos.")
 
     def logout(self):
         if messagebox.askyesno("Cerrar sesión", "¿Desea cerrar la sesión?"):
-            self.session["user"] = None
+            self.service.logout()
             self.show_login()
 
-    # ===================== Utilidades de modelo =====================
-    # Usuarios
-    def _find_user_by_username(self, username):
-        for u in self.users:
-            if u["username"].lower() == username.lower():
-                return u
-        return None
-
-    def _create_user(self, username, password, nombre=""):
-        if self._find_user_by_username(username):
-            return None
-        u = {
-            "id": self._user_next_id,
-            "username": username,
-            "password": password,
-            "nombre": nombre or username,
-        }
-        self.users.append(u)
-        self._user_next_id += 1
-        return u
-
-    def update_user(self, user_id, username, password, nombre):
-        # evitar duplicados de username
-        for u in self.users:
-            if u["id"] != user_id and u["username"].lower() == username.lower():
-                return False
-        for u in self.users:
-            if u["id"] == user_id:
-                u["username"] = username
-                u["password"] = password
-                u["nombre"] = nombre or username
-                return True
-        return False
+# ======================= Frames de UI =======================
+AUTO_SPOT = "Automático"
+METRICS_EXPORT_MS = 15_000  # cada cuánto se reescribe el archivo de métricas
+PREWARM_DELAY_MS = 200  # pausa entre pestañas precargadas, para no frenar al operador
+
+
+class TreeSync:
+    """Último estado pintado de un Treeview (iid -> valores).
+
+    sync() compara contra las filas nuevas y aplica solo las inserciones,
+    borrados y celdas modificadas.
+    """
+
+    def __init__(self, tree, columns):
+        self.tree = tree
+        self.columns = columns
+        self.rows = {}
+        self.cells_set = 0  # contador de celdas escritas (diagnóstico)
+        self.inserted = 0  # filas insertadas (diagnóstico)
+        self.deleted = 0  # filas borradas (diagnóstico)
+
+    def sync(self, rows):
+        new = dict(rows)
+        removed = [iid for iid in self.rows if iid not in new]
+        if removed:
+            self.tree.delete(*removed)
+            self.deleted += len(removed)
+            for iid in removed:
+                del self.rows[iid]
+        for iid, values in new.items():
+            old = self.rows.get(iid)
+            if old is None:
+                self.tree.insert("", "end", iid=iid, values=values)
+                self.inserted += 1
+            elif old != values:
+                self._set_changed(iid, old, values)
+            self.rows[iid] = values
+        return removed
+
+    def update(self, iid, values):
+        old = self.rows.get(iid)
+        if old is not None and old != values:
+            self._set_changed(iid, old, values)
+            self.rows[iid] = values
+
+    def upsert(self, iid, values):
+        if iid in self.rows:
+            self.update(iid, values)
+        else:
+            self.tree.insert("", "end", iid=iid, values=values)
+            self.inserted += 1
+            self.rows[iid] = values
+
+    def remove(self, iid):
+        if self.rows.pop(iid, None) is not None:
+            self.tree.delete(iid)
+            self.deleted += 1
+
+    def _set_changed(self, iid, old, values):
+        for col, a, b in zip(self.columns, old, values):
+            if a != b:
+                self.tree.set(iid, col, b)
+                self.cells_set += 1
+
+    def visible(self):
+        # filas dentro del viewport: primera fila visible y siguientes con bbox
+        tree = self.tree
+        iid = ""
+        for y in range(0, 80, 4):
+            iid = tree.identify_row(y)
+            if iid:
+                break
+        out = []
+        while iid and tree.bbox(iid):
+            out.append(iid)
+            iid = tree.next(iid)
+        return out
 
-    def delete_user(self, user_id):
-        # no permitir eliminar admin
-        for u in self.users:
-            if u["id"] == user_id and u["username"] == "admin":
-                return False
-        # no permitir borrar usuario con vehículos o tickets activos
-        if any(v["user_id"] == user_id for v in self.vehicles):
-            return False
-        self.users = [u for u in self.users if u["id"] != user_id]
-        return True
-
-    # Vehículos
-    def _find_vehicle_by_plate(self, placa):
-        for v in self.vehicles:
-            if v["placa"].upper() == placa.upper():
-                return v
-        return None
-
-    def _create_vehicle(self, placa, user_id, marca="", modelo="", color=""):
-        if self._find_vehicle_by_plate(placa):
-            return None
-        v = {
-            "id": self._vehicle_next_id,
-            "placa": placa.upper().strip(),
-            "user_id": user_id,
-            "marca": marca,
-            "modelo": modelo,
-            "color": color,
-        }
-        self.vehicles.append(v)
-        self._vehicle_next_id += 1
-        return v
-
-    def update_vehicle(self, vehicle_id, placa, user_id, marca, modelo, color):
-        # placa única
-        for v in self.vehicles:
-            if v["id"] != vehicle_id and v["placa"].upper() == placa.upper():
-                return False
-        for v in self.vehicles:
-            if v["id"] == vehicle_id:
-                v["placa"] = placa.upper().strip()
-                v["user_id"] = user_id
-                v["marca"] = marca
-                v["modelo"] = modelo
-                v["color"] = color
-                return True
+
+BULK_FILETYPES = [("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Todos", "*.*")]
+
+
+class LazyTab:
+    """Pestaña que acumula lo que cambió y se pinta cuando está a la vista.
+
+    Los manejadores de eventos llaman invalidate() con claves de cambio;
+    render_pending() las aplica con _apply() o, tras invalidate_all(), hace
+    un refresh_everything() completo.
+    """
+
+    def _init_lazy(self):
+        self._pending = set()
+        self._full = True
+
+    def invalidate(self, *keys):
+        self._pending.update(keys)
+        self.parent.request_render(self)
+
+    def invalidate_all(self):
+        self._full = True
+        self.parent.request_render(self)
+
+    def render_pending(self):
+        pending, self._pending = self._pending, set()
+        if self._full:
+            self._full = False
+            self.refresh_everything()
+        elif pending:
+            self._apply(pending)
+
+    def _apply(self, pending):
+        self.refresh_everything()
+
+
+def bulk_import(master, service, importer):
+    # primero una simulación; se importa solo si el operador confirma
+    path = filedialog.askopenfilename(parent=master, title="Importar", filetypes=BULK_FILETYPES)
+    if not path:
+        return False
+    with open(path, newline="", encoding="utf-8") as fh:
+        report = importer(service, fh, detect_format(path), dry_run=True)
+    detail = "\n".join(f"Línea {line}: {msg}" for line, msg in report.errors[:10])
+    if len(report.errors) > 10:
+        detail += f"\n... y {len(report.errors) - 10} más"
+    text = report.summary() + ("\n\n" + detail if detail else "")
+    if not report.valid:
+        messagebox.showwarning("Importar", text)
         return False
+    if not messagebox.askyesno("Importar", text + "\n\n¿Importar las filas válidas?"):
+        return False
+    with open(path, newline="", encoding="utf-8") as fh:
+        report = importer(service, fh, detect_format(path))
+    messagebox.showinfo("Importar", report.summary())
+    return True
 
-    def delete_vehicle(self, vehicle_id):
-        # no permitir si tiene ticket activo
-        if any(t["vehicle_id"] == vehicle_id for t in self.active_tickets):
-            return False
-        self.vehicles = [v for v in self.vehicles if v["id"] != vehicle_id]
-        return True
-
-    # Puestos
-    def _ensure_spots(self, new_capacity):
-        # Crear o ajustar cantidad de puestos (códigos P1..Pn)
-        current = len(self.spots)
-        if new_capacity > current:
-            for i in range(current + 1, new_capacity + 1):
-                codigo = f"P{i}"
-                self.spots.append({
-                    "id": self._spot_next_id,
-                    "codigo": codigo,
-                    "ocupado": False,
-                })
-                self._spot_next_id += 1
-        elif new_capacity < current:
-            # solo podemos reducir si hay suficientes libres
-            libres = [s for s in self.spots if not s["ocupado"]]
-            exceso = current - new_capacity
-            if len(libres) < exceso:
-                raise ValueError("No hay suficientes puestos libres para reducir capacidad.")
-            # quitar últimos libres
-            to_remove = set(s["id"] for s in libres[-exceso:])
-            self.spots = [s for s in self.spots if s["id"] not in to_remove]
-        self.capacity = new_capacity
-
-    def available_spots(self):
-        return [s for s in self.spots if not s["ocupado"]]
-
-    def get_spot_by_id(self, spot_id):
-        for s in self.spots:
-            if s["id"] == spot_id:
-                return s
-        return None
-
-    # Tickets y lógica de parqueo
-    def checkin(self, placa, maybe_user_id=None, marca="", modelo="", color="", spot_id=None):
-        # Reglas: si vehículo existe, usarlo; si no existe, crear con propietario requerido
-        veh = self._find_vehicle_by_plate(placa)
-        if veh is None:
-            if not maybe_user_id:
-                raise ValueError("Debe seleccionar usuario propietario para una placa nueva.")
-            veh = self._create_vehicle(placa, maybe_user_id, marca, modelo, color)
-            if veh is None:
-                raise ValueError("La placa ya existe.")
-        # verificar que no esté ya activo
-        if any(t["vehicle_id"] == veh["id"] for t in self.active_tickets):
-            raise ValueError("Este vehículo ya tiene una entrada activa.")
-        # verificar puesto
-        spot = self.get_spot_by_id(spot_id) if spot_id else None
-        if not spot or spot["ocupado"]:
-            raise ValueError("Debe seleccionar un puesto disponible.")
-        # crear ticket
-        t = {
-            "id": self._ticket_next_id,
-            "vehicle_id": veh["id"],
-            "spot_id": spot["id"],
-            "checkin": datetime.now(),
-            "user_in": self.session["user"]["id"] if self.session.get("user") else None,
-        }
-        self.active_tickets.append(t)
-        self._ticket_next_id += 1
-        # ocupar puesto
-        spot["ocupado"] = True
-        return t
-
-    def _compute_amount(self, checkin_dt, checkout_dt):
-        elapsed = checkout_dt - checkin_dt
-        minutes = max(1, int(elapsed.total_seconds() // 60))
-        hours = math.ceil(minutes / 60)
-        return hours * float(self.rate_per_hour), elapsed
-
-    def checkout(self, ticket_id):
-        ticket = None
-        for t in self.active_tickets:
-            if t["id"] == ticket_id:
-                ticket = t
-                break
-        if ticket is None:
-            return None
-        now = datetime.now()
-        total, elapsed = self._compute_amount(ticket["checkin"], now)
-        closed = {
-            "id": ticket["id"],
-            "vehicle_id": ticket["vehicle_id"],
-            "spot_id": ticket["spot_id"],
-            "checkin": ticket["checkin"],
-            "checkout": now,
-            "user_in": ticket["user_in"],
-            "user_out": self.session["user"]["id"] if self.session.get("user") else None,
-            "total": total,
-        }
-        self.closed_tickets.append(closed)
-        # liberar puesto
-        spot = self.get_spot_by_id(ticket["spot_id"])
-        if spot:
-            spot["ocupado"] = False
-        # quitar de activos
-        self.active_tickets = [t for t in self.active_tickets if t["id"] != ticket_id]
-        return closed
+
+def bulk_export(master, service, exporter):
+    path = filedialog.asksaveasfilename(parent=master, title="Exportar", defaultextension=".csv", filetypes=BULK_FILETYPES)
+    if not path:
+        return
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        n = exporter(service, fh, detect_format(path))
+    messagebox.showinfo("Exportar", f"{n} filas exportadas.")
 
 
-# ======================= Frames de UI =======================
 class LoginFrame(tk.Frame):
     def __init__(self, master: App):
         super().__init__(master)
         self.master = master
+        self.service = master.service
 
         container = ttk.Frame(self, padding=24)
         container.pack(expand=True)
@@ -319,6 +274,7 @@ class RegisterUserFrame(tk.Frame):
     def __init__(self, master: App):
         super().__init__(master)
         self.master = master
+        self.service = master.service
         container = ttk.Frame(self, padding=24)
         container.pack(expand=True)
 
@@ -352,10 +308,10 @@ class RegisterUserFrame(tk.Frame):
         if not username or not password:
             messagebox.showwarning("Validación", "Usuario y contraseña son obligatorios.")
             return
-        if self.master._find_user_by_username(username):
+        if self.service._find_user_by_username(username):
             messagebox.showwarning("Validación", "El usuario ya existe.")
             return
-        self.master._create_user(username, password, nombre=nombre)
+        self.service._create_user(username, password, nombre=nombre)
         messagebox.showinfo("Registro", "Usuario creado. Inicie sesión.")
         self.master.show_login()
 
@@ -364,6 +320,7 @@ class MainFrame(tk.Frame):
     def __init__(self, master: App):
         super().__init__(master)
         self.master = master
+        self.service = master.service
 
         # Header
         header = ttk.Frame(self, padding=(12, 8))
@@ -375,50 +332,211 @@ class MainFrame(tk.Frame):
         self.nb = ttk.Notebook(self)
         self.nb.pack(fill="both", expand=True)
 
-        self.parking_tab = ParkingTab(self)
-        self.vehicles_tab = VehiclesTab(self)
-        self.users_tab = UsersTab(self)
-        self.config_tab = ConfigTab(self)
-        self.reports_tab = ReportsTab(self)
-
-        self.nb.add(self.parking_tab, text="Parqueo")
-        self.nb.add(self.vehicles_tab, text="Vehículos")
-        self.nb.add(self.users_tab, text="Usuarios")
-        self.nb.add(self.config_tab, text="Configuración")
-        self.nb.add(self.reports_tab, text="Reportes")
+        # pestañas perezosas: cada página es un marco vacío y la pestaña se construye la
+        # primera vez que se selecciona (o antes, en tiempo libre, ver start_prewarm)
+        self._hosts = {}  # clase de pestaña -> marco del notebook
+        self._built = {}  # clase de pestaña -> pestaña construida, en orden de construcción
+        for cls, text in ((ParkingTab, "Parqueo"), (VehiclesTab, "Vehículos"), (UsersTab, "Usuarios"),
+                          (ConfigTab, "Configuración"), (ReportsTab, "Reportes")):
+            host = ttk.Frame(self.nb)
+            self.nb.add(host, text=text)
+            self._hosts[cls] = host
+        self._prewarm_job = None
 
         # Status bar
         self.status_var = tk.StringVar(value="")
         ttk.Label(self, textvariable=self.status_var, anchor="w", padding=(12, 6)).pack(fill="x")
 
-        # refresco periódico de tiempos
-        self.after(1000, self._tick)
+        # refresco perezoso: solo se pinta la pestaña visible; las demás al mostrarse
+        self._render_job = None
+        self._status_job = None
+        self.nb.bind("<<NotebookTabChanged>>", lambda e: self._on_tab_changed())
+        self.service.events.subscribe(DomainEvent, self._on_domain_event)
+
+        # perfilado opcional (PARQUEADERO_PROFILE=1) y pestaña oculta de diagnóstico (Ctrl+Shift+D)
+        self.profiler = Profiler()
+        self._watch_hot_paths()
+        if os.environ.get("PARQUEADERO_PROFILE"):
+            self.profiler.enable()
+        self.diagnostics_tab = None  # se construye al mostrarla
+        self._diagnostics_shown = False
+        self.master.bind_all("<Control-Shift-D>", lambda e: self.toggle_diagnostics())
+
+        # métricas para monitoreo: archivo .prom (PARQUEADERO_METRICS) y/o puerto local (PARQUEADERO_METRICS_PORT)
+        self._metrics_path = os.environ.get("PARQUEADERO_METRICS")
+        if self._metrics_path:
+            self._export_metrics()
+        if os.environ.get("PARQUEADERO_METRICS_PORT"):
+            self.metrics_server = serve(self.service.metrics.registry, int(os.environ["PARQUEADERO_METRICS_PORT"]))
+
+        # refresco de tiempos: despierta cuando cambia el minuto de alguna fila visible
+        self._tick_job = None
+        self._schedule_tick(1000)
+        # a medianoche los contadores de "Hoy" vuelven a cero aunque no haya movimiento
+        self._schedule_rollover()
+
+    def _schedule_tick(self, delay_ms):
+        if self._tick_job:
+            self.after_cancel(self._tick_job)
+        self._tick_job = self.after(delay_ms, self._tick)
+
+    def _schedule_rollover(self):
+        now = self.service.clock.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        # un segundo de margen para caer ya en el día nuevo
+        self.after(int((midnight - now).total_seconds() * 1000) + 1000, self._on_rollover)
+
+    def _on_rollover(self):
+        self._update_status()
+        self._schedule_rollover()
 
     def _tick(self):
-        # refrescar solo pestaña parqueo para tiempos
+        # refrescar solo las filas visibles de la pestaña parqueo (si ya se construyó)
+        delay = 60_000
         try:
-            self.parking_tab.refresh_active_table(update_elapsed_only=True)
+            tab = self._built.get(ParkingTab)
+            if tab is not None:
+                delay = tab.refresh_visible_elapsed()
         finally:
-            self.after(1000, self._tick)
+            self._schedule_tick(delay)
+
+    def _watch_hot_paths(self):
+        prof = self.profiler
+        prof.watch(self.service, SERVICE_HOT_PATHS, label="service")
+        prof.watch(self, ["_update_status", "_tick", "_build_tab"])
+
+    def _watch_tab(self, tab):
+        # las pestañas se instrumentan al construirse
+        tables = [t for t in vars(tab).values() if isinstance(t, TreeSync)]
+        names = [n for n in dir(type(tab)) if n.startswith(("refresh_", "_refresh_"))]
+        names += [n for n in ("render_pending", "_apply", "_render") if hasattr(tab, n)]
+        self.profiler.watch(tab, names, tables=tables)
+
+    def toggle_diagnostics(self):
+        if self.diagnostics_tab is None:
+            self.diagnostics_tab = DiagnosticsTab(self)
+        if self._diagnostics_shown:
+            self.nb.forget(self.diagnostics_tab)
+        else:
+            self.nb.add(self.diagnostics_tab, text="Diagnóstico")
+            self.nb.select(self.diagnostics_tab)
+            self.diagnostics_tab.refresh_everything()
+        self._diagnostics_shown = not self._diagnostics_shown
+
+    # ===================== Pestañas perezosas =====================
+    def _tab(self, cls):
+        tab = self._built.get(cls)
+        return tab if tab is not None else self._build_tab(cls)
+
+    def _build_tab(self, cls):
+        tab = cls(self, self._hosts[cls])
+        tab.pack(fill="both", expand=True)
+        self._built[cls] = tab
+        self._watch_tab(tab)
+        return tab
+
+    @property
+    def parking_tab(self):
+        return self._tab(ParkingTab)
+
+    @property
+    def vehicles_tab(self):
+        return self._tab(VehiclesTab)
+
+    @property
+    def users_tab(self):
+        return self._tab(UsersTab)
+
+    @property
+    def config_tab(self):
+        return self._tab(ConfigTab)
+
+    @property
+    def reports_tab(self):
+        return self._tab(ReportsTab)
+
+    @property
+    def tabs(self):
+        # solo las construidas; las demás se pintan completas al construirse
+        return tuple(self._built.values())
+
+    def _selected_class(self):
+        selected = self.nb.select()
+        return next((cls for cls, host in self._hosts.items() if str(host) == selected), None)
+
+    def _on_tab_changed(self):
+        cls = self._selected_class()
+        if cls is not None:
+            self._tab(cls)
+        self._render_visible()
+
+    def start_prewarm(self):
+        # construye en tiempo libre las pestañas que faltan, una por turno; se pintan al mostrarse
+        if self._prewarm_job is None and len(self._built) < len(self._hosts):
+            self._prewarm_job = self.after(PREWARM_DELAY_MS, self._prewarm)
+
+    def _prewarm(self):
+        self._prewarm_job = None
+        pending = [cls for cls in self._hosts if cls not in self._built]
+        if pending:
+            self._build_tab(pending[0])
+            self.start_prewarm()
 
     def refresh_all(self):
+        # todo se marca para refresco completo; se pinta al hacerse visible
         self._update_status()
-        self.parking_tab.refresh_everything()
-        self.vehicles_tab.refresh_everything()
-        self.users_tab.refresh_everything()
-        self.config_tab.refresh_everything()
-        self.reports_tab.refresh_everything()
+        cls = self._selected_class()
+        if cls is not None:
+            self._tab(cls)
+        for tab in self.tabs:
+            tab.invalidate_all()
+
+    def request_render(self, tab):
+        if self._render_job is None and self.nb.select() == str(tab.master):
+            self._render_job = self.after_idle(self._render_visible)
+
+    def _render_visible(self):
+        self._render_job = None
+        for tab in self.tabs:
+            if self.nb.select() == str(tab.master):
+                tab.render_pending()
+
+    def _on_domain_event(self, _event):
+        if self._status_job is None:
+            self._status_job = self.after_idle(self._update_status)
+
+    def _export_metrics(self):
+        try:
+            write_textfile(self.service.metrics.registry, self._metrics_path)
+        except OSError:
+            pass  # el monitoreo no debe interrumpir la portería; se reintenta en el próximo ciclo
+        self.after(METRICS_EXPORT_MS, self._export_metrics)
 
     def _update_status(self):
-        user = self.master.session.get("user")
-        txt = f"Usuario: {user['username']} | Tarifa: {self.master.rate_per_hour:.2f} /h | Puestos: {len(self.master.spots)} (Libres: {len(self.master.available_spots())}) | Activos: {len(self.master.active_tickets)}"
+        self._status_job = None
+        user = self.service.session.get("user")
+        if user is None:
+            return  # sesión cerrada: se vuelve a pintar al entrar
+        hoy_n, hoy_total = self.service.stats.day(self.service.clock.today())
+        # mismos valores que se exportan: el registro se actualiza en cada entrada/salida
+        m = self.service.metrics
+        zonas = ", ".join(f"{name} {free}/{size}" for name, free, size in m.zones())
+        txt = f"Usuario: {user['username']} | Tarifa: {self.service.rate_per_hour:.2f} /h | Puestos: {int(m.spots.get())} (Libres: {int(m.free.get())}; {zonas}) | Activos: {int(m.active.get())} | Hoy: {hoy_n} salidas, {hoy_total:.2f}"
         self.status_var.set(txt)
 
 
-class ParkingTab(ttk.Frame):
-    def __init__(self, parent: MainFrame):
-        super().__init__(parent.nb, padding=10)
-        self.app = parent.master
+# métodos del modelo que se instrumentan al activar el perfilado
+SERVICE_HOT_PATHS = [
+    "checkin", "checkout", "preview_checkout", "_compute_amount", "available_spots", "free_spot_count",
+    "_create_user", "update_user", "delete_user", "_create_vehicle", "update_vehicle", "delete_vehicle",
+    "_ensure_spots", "set_zone_capacity", "zone_occupancy", "set_rate", "set_tariff", "history", "occupancy",
+]
+
+
+class ParkingTab(LazyTab, ttk.Frame):
+    def __init__(self, parent: MainFrame, master):
+        super().__init__(master, padding=10)
+        self.service = parent.service
         self.parent = parent
 
         self.columnconfigure(0, weight=1)
@@ -457,6 +575,13 @@ class ParkingTab(ttk.Frame):
         self.spot_cb = ttk.Combobox(form, textvariable=self.spot_var, state="readonly")
         self.spot_cb.grid(row=3, column=2, sticky="ew", padx=(0, 8), pady=4)
 
+        # tipo de una placa nueva; la asignación automática busca en las zonas que lo admiten
+        ttk.Label(form, text="Tipo").grid(row=2, column=4, sticky="w")
+        self.tipo_var = tk.StringVar(value=VEHICLE_TYPES[0])
+        ttk.Combobox(form, textvariable=self.tipo_var, values=VEHICLE_TYPES, state="readonly").grid(
+            row=3, column=4, sticky="ew", padx=(0, 8), pady=4
+        )
+
         ttk.Button(form, text="Registrar Entrada", command=self._on_checkin).grid(row=3, column=6, sticky="e", pady=4)
 
         # Active table
@@ -470,10 +595,20 @@ class ParkingTab(ttk.Frame):
         for c, w, a in [("id", 60, "center"), ("placa", 120, "w"), ("puesto", 80, "center"), ("entrada", 180, "center"), ("transcurrido", 140, "e")]:
             self.tree.heading(c, text=c.upper())
             self.tree.column(c, width=w, anchor=a)
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=vsb.set)
+        self.vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscroll=self._on_yscroll)
         self.tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        self.tree.bind("<Map>", lambda e: self._on_yscroll())
+
+        # estado pintado de la tabla y cache de columnas fijas por ticket
+        self.table = TreeSync(self.tree, cols)
+        self._row_cache = {}  # ticket_id -> (id, placa, puesto, entrada)
+
+        # contadores del ticker de tiempos
+        self.ticks = 0
+        self.last_tick_cells = 0
+        self._visible_job = None
 
         # Checkout buttons
         btns = ttk.Frame(self)
@@ -481,40 +616,118 @@ class ParkingTab(ttk.Frame):
         ttk.Button(btns, text="Registrar Salida", command=self._on_checkout).pack(side="left")
         ttk.Button(btns, text="Actualizar", command=self.refresh_everything).pack(side="left", padx=6)
 
+        self._init_lazy()
+        events = self.service.events
+        events.subscribe(TicketOpened, self._on_ticket_event)
+        events.subscribe(TicketClosed, self._on_ticket_event)
+        events.subscribe(VehicleChanged, self._on_vehicle_changed)
+        events.subscribe(UserChanged, lambda e: self.invalidate("owners"))
+        events.subscribe(ConfigChanged, lambda e: e.key in ("capacity", "zones") and self.invalidate("spots"))
+
+    # ===================== Eventos =====================
+    def _on_ticket_event(self, event):
+        self.invalidate(("ticket", event.ticket["id"]), "spots")
+
+    def _on_vehicle_changed(self, event):
+        if event.action == UPDATED:
+            t = self.service.store.active_for_vehicle(event.vehicle_id)
+            if t:
+                self.invalidate_vehicle(event.vehicle_id)
+                self.invalidate(("ticket", t["id"]))
+
+    def _apply(self, pending):
+        if "owners" in pending:
+            self._refresh_owners()
+        if "spots" in pending:
+            self._refresh_spots()
+        now = self.service.clock.now()
+        for key in pending:
+            if isinstance(key, tuple):
+                ticket_id = key[1]
+                t = self.service.get_active_ticket(ticket_id)
+                if t is None:
+                    self.table.remove(str(ticket_id))
+                    self._row_cache.pop(ticket_id, None)
+                else:
+                    self.table.upsert(str(ticket_id), self._row(t, now))
+        self.parent._update_status()
+
     def refresh_everything(self):
-        # owners
-        owners = [f"{u['id']} - {u['nombre']} ({u['username']})" for u in self.app.users]
-        self.owner_cb["values"] = owners
-        if owners and not self.owner_var.get():
-            self.owner_var.set(owners[0])
-        # spots
-        free_spots = self.app.available_spots()
-        self.spot_cb["values"] = [f"{s['id']} - {s['codigo']}" for s in free_spots]
-        if free_spots and not self.spot_var.get():
-            self.spot_var.set(f"{free_spots[0]['id']} - {free_spots[0]['codigo']}")
+        self._refresh_owners()
+        self._refresh_spots()
         # table
         self.refresh_active_table()
         self.parent._update_status()
 
-    def refresh_active_table(self, update_elapsed_only=False):
-        if not update_elapsed_only:
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-        for t in self.app.active_tickets:
-            veh = next((v for v in self.app.vehicles if v["id"] == t["vehicle_id"]), None)
-            spot = self.app.get_spot_by_id(t["spot_id"]) if t else None
+    def _refresh_owners(self):
+        owners = [f"{u['id']} - {u['nombre']} ({u['username']})" for u in self.service.users]
+        self.owner_cb["values"] = owners
+        if owners and not self.owner_var.get():
+            self.owner_var.set(owners[0])
+
+    def _refresh_spots(self):
+        # primera opción: asignación automática del libre más bajo
+        free_spots = self.service.available_spots()
+        self.spot_cb["values"] = [AUTO_SPOT] + [f"{s['id']} - {s['codigo']}" for s in free_spots]
+        if not self.spot_var.get():
+            self.spot_var.set(AUTO_SPOT)
+
+    def _row(self, t, now):
+        fixed = self._row_cache.get(t["id"])
+        if fixed is None:
+            veh = self.service.get_vehicle_by_id(t["vehicle_id"])
+            spot = self.service.get_spot_by_id(t["spot_id"])
             placa = veh["placa"] if veh else "?"
             puesto = spot["codigo"] if spot else "?"
             entrada = t["checkin"].strftime("%Y-%m-%d %H:%M:%S")
-            elapsed = datetime.now() - t["checkin"]
-            h, rem = divmod(int(elapsed.total_seconds()), 3600)
-            m, _ = divmod(rem, 60)
-            trans = f"{h:02d}h {m:02d}m"
-            if update_elapsed_only:
-                if self.tree.exists(str(t["id"])):
-                    self.tree.set(str(t["id"]), "transcurrido", trans)
-            else:
-                self.tree.insert("", "end", iid=str(t["id"]), values=(t["id"], placa, puesto, entrada, trans))
+            fixed = self._row_cache[t["id"]] = (t["id"], placa, puesto, entrada)
+        elapsed = now - t["checkin"]
+        h, rem = divmod(int(elapsed.total_seconds()), 3600)
+        m, _ = divmod(rem, 60)
+        return fixed + (f"{h:02d}h {m:02d}m",)
+
+    def invalidate_vehicle(self, vehicle_id):
+        # la placa cambió: recalcular la fila de su ticket activo
+        t = self.service.store.active_for_vehicle(vehicle_id)
+        if t:
+            self._row_cache.pop(t["id"], None)
+
+    def _on_yscroll(self, *args):
+        if args:
+            self.vsb.set(*args)
+        # filas nuevas en el viewport: refrescar tiempos cuando Tk quede libre
+        if self._visible_job is None:
+            self._visible_job = self.after_idle(self._refresh_visible_now)
+
+    def _refresh_visible_now(self):
+        self._visible_job = None
+        self.parent._tick()
+
+    def refresh_visible_elapsed(self):
+        # actualiza "transcurrido" de las filas visibles y devuelve los ms
+        # hasta el próximo cambio de minuto entre ellas
+        now = self.service.clock.now()
+        before = self.table.cells_set
+        wait = 60_000
+        for iid in self.table.visible():
+            t = self.service.get_active_ticket(int(iid))
+            if t is None:
+                continue
+            self.table.update(iid, self._row(t, now))
+            elapsed_ms = int((now - t["checkin"]).total_seconds() * 1000)
+            wait = min(wait, 60_000 - elapsed_ms % 60_000)
+        self.ticks += 1
+        self.last_tick_cells = self.table.cells_set - before
+        return wait + 50
+
+    def refresh_active_table(self, update_elapsed_only=False):
+        now = self.service.clock.now()
+        if update_elapsed_only:
+            self.refresh_visible_elapsed()
+        else:
+            removed = self.table.sync((str(t["id"]), self._row(t, now)) for t in self.service.active_tickets)
+            for iid in removed:
+                self._row_cache.pop(int(iid), None)
         self.parent._update_status()
 
     def _on_checkin(self):
@@ -524,7 +737,7 @@ class ParkingTab(ttk.Frame):
                 messagebox.showwarning("Validación", "La placa es obligatoria.")
                 return
             owner_id = None
-            if not self.app._find_vehicle_by_plate(placa):
+            if not self.service._find_vehicle_by_plate(placa):
                 # si no existe el vehículo, necesitamos propietario
                 if not self.owner_var.get():
                     messagebox.showwarning("Validación", "Seleccione propietario para una placa nueva.")
@@ -533,23 +746,24 @@ class ParkingTab(ttk.Frame):
             if not self.spot_var.get():
                 messagebox.showwarning("Validación", "Seleccione un puesto disponible.")
                 return
-            spot_id = int(self.spot_var.get().split(" - ")[0])
-            t = self.app.checkin(
+            spot_id = None if self.spot_var.get() == AUTO_SPOT else int(self.spot_var.get().split(" - ")[0])
+            t = self.service.checkin(
                 placa,
                 maybe_user_id=owner_id,
                 marca=self.marca_var.get().strip(),
                 modelo=self.modelo_var.get().strip(),
                 color=self.color_var.get().strip(),
                 spot_id=spot_id,
+                tipo=self.tipo_var.get(),
             )
-            messagebox.showinfo("Entrada registrada", f"Ticket #{t['id']} creado para {placa} en puesto {self.app.get_spot_by_id(spot_id)['codigo']}.")
+            messagebox.showinfo("Entrada registrada", f"Ticket #{t['id']} creado para {placa} en puesto {self.service.get_spot_by_id(t['spot_id'])['codigo']}.")
             # limpiar form parcial
             self.placa_var.set("")
             self.marca_var.set("")
             self.modelo_var.set("")
             self.color_var.set("")
-            self.spot_var.set("")
-            self.refresh_everything()
+            self.spot_var.set(AUTO_SPOT)
+            self.tipo_var.set(VEHICLE_TYPES[0])
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -560,25 +774,24 @@ class ParkingTab(ttk.Frame):
             return
         ticket_id = int(sel[0])
         # Previsualizar total
-        ticket = next((t for t in self.app.active_tickets if t["id"] == ticket_id), None)
-        if not ticket:
+        preview = self.service.preview_checkout(ticket_id)
+        if not preview:
             messagebox.showerror("Error", "No se encontró el ticket.")
             return
-        total, elapsed = self.app._compute_amount(ticket["checkin"], datetime.now())
+        total, elapsed = preview
         h, rem = divmod(int(elapsed.total_seconds()), 3600)
         m, _ = divmod(rem, 60)
         if not messagebox.askyesno("Confirmar salida", f"Tiempo: {h}h {m}m\nTotal: {total:.2f}\n\n¿Confirmar salida?"):
             return
-        closed = self.app.checkout(ticket_id)
+        closed = self.service.checkout(ticket_id)
         if closed:
             messagebox.showinfo("Salida registrada", f"Ticket #{closed['id']} cerrado. Total: {closed['total']:.2f}")
-            self.refresh_everything()
 
 
-class VehiclesTab(ttk.Frame):
-    def __init__(self, parent: MainFrame):
-        super().__init__(parent.nb, padding=10)
-        self.app = parent.master
+class VehiclesTab(LazyTab, ttk.Frame):
+    def __init__(self, parent: MainFrame, master):
+        super().__init__(master, padding=10)
+        self.service = parent.service
         self.parent = parent
 
         self.columnconfigure(0, weight=1)
@@ -608,6 +821,11 @@ class VehiclesTab(ttk.Frame):
 
         ttk.Label(form, text="Color").grid(row=2, column=0, sticky="w")
         ttk.Entry(form, textvariable=self.color_var).grid(row=3, column=0, sticky="ew", padx=(0, 8), pady=4)
+        ttk.Label(form, text="Tipo").grid(row=2, column=2, sticky="w")
+        self.tipo_var = tk.StringVar(value=VEHICLE_TYPES[0])
+        ttk.Combobox(form, textvariable=self.tipo_var, values=VEHICLE_TYPES, state="readonly").grid(
+            row=3, column=2, sticky="ew", padx=(0, 8), pady=4
+        )
 
         btns = ttk.Frame(form)
         btns.grid(row=3, column=6, sticky="e")
@@ -615,13 +833,15 @@ class VehiclesTab(ttk.Frame):
         ttk.Button(btns, text="Actualizar", command=self._on_update).grid(row=0, column=1, padx=4)
         ttk.Button(btns, text="Eliminar", command=self._on_delete).grid(row=0, column=2, padx=4)
         ttk.Button(btns, text="Limpiar", command=self._clear_form).grid(row=0, column=3, padx=4)
+        ttk.Button(btns, text="Importar…", command=self._on_import).grid(row=0, column=4, padx=4)
+        ttk.Button(btns, text="Exportar…", command=self._on_export).grid(row=0, column=5, padx=4)
 
         table_frame = ttk.Frame(self)
         table_frame.grid(row=1, column=0, sticky="nsew", pady=(8, 0))
         table_frame.rowconfigure(0, weight=1)
         table_frame.columnconfigure(0, weight=1)
 
-        cols = ("id", "placa", "propietario", "marca", "modelo", "color")
+        cols = ("id", "placa", "propietario", "marca", "modelo", "color", "tipo")
         self.tree = ttk.Treeview(table_frame, columns=cols, show="headings", selectmode="browse")
         headers = [
             ("id", 60, "center"),
@@ -630,6 +850,7 @@ class VehiclesTab(ttk.Frame):
             ("marca", 120, "w"),
             ("modelo", 120, "w"),
             ("color", 100, "w"),
+            ("tipo", 90, "center"),
         ]
         for c, w, a in headers:
             self.tree.heading(c, text=c.upper())
@@ -641,19 +862,46 @@ class VehiclesTab(ttk.Frame):
 
         self.tree.bind("<<TreeviewSelect>>", self._on_select)
         self._selected_id = None
+        self.table = TreeSync(self.tree, cols)
+
+        self._init_lazy()
+        events = self.service.events
+        events.subscribe(VehicleChanged, lambda e: self.invalidate(e.vehicle_id))
+        events.subscribe(UserChanged, self._on_user_changed)
+
+    def _on_user_changed(self, event):
+        # un usuario renombrado cambia el texto de propietario en sus filas
+        if event.action == UPDATED:
+            self.invalidate_all()
+        else:
+            self.invalidate("owners")
+
+    def _apply(self, pending):
+        if "owners" in pending:
+            self._refresh_owners()
+        for vid in pending:
+            if vid == "owners":
+                continue
+            v = self.service.get_vehicle_by_id(vid)
+            if v is None:
+                self.table.remove(str(vid))
+            else:
+                self.table.upsert(str(vid), self._values(v))
 
     def refresh_everything(self):
-        owners = [f"{u['id']} - {u['nombre']} ({u['username']})" for u in self.app.users]
+        self._refresh_owners()
+        self.table.sync((str(v["id"]), self._values(v)) for v in self.service.vehicles)
+
+    def _refresh_owners(self):
+        owners = [f"{u['id']} - {u['nombre']} ({u['username']})" for u in self.service.users]
         self.owner_cb["values"] = owners
         if owners and not self.owner_var.get():
             self.owner_var.set(owners[0])
-        # table
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for v in self.app.vehicles:
-            owner = next((u for u in self.app.users if u["id"] == v["user_id"]), None)
-            owner_txt = f"{owner['nombre']} ({owner['username']})" if owner else "?"
-            self.tree.insert("", "end", iid=str(v["id"]), values=(v["id"], v["placa"], owner_txt, v["marca"], v["modelo"], v["color"]))
+
+    def _values(self, v):
+        owner = self.service.get_user_by_id(v["user_id"])
+        owner_txt = f"{owner['nombre']} ({owner['username']})" if owner else "?"
+        return (v["id"], v["placa"], owner_txt, v["marca"], v["modelo"], v["color"], v["tipo"])
 
     def _clear_form(self):
         self._selected_id = None
@@ -661,6 +909,7 @@ class VehiclesTab(ttk.Frame):
         self.marca_var.set("")
         self.modelo_var.set("")
         self.color_var.set("")
+        self.tipo_var.set(VEHICLE_TYPES[0])
         if self.owner_cb["values"]:
             self.owner_var.set(self.owner_cb["values"][0])
         self.tree.selection_remove(self.tree.selection())
@@ -670,7 +919,7 @@ class VehiclesTab(ttk.Frame):
         if not sel:
             return
         vid = int(sel[0])
-        v = next((x for x in self.app.vehicles if x["id"] == vid), None)
+        v = self.service.get_vehicle_by_id(vid)
         if not v:
             return
         self._selected_id = v["id"]
@@ -678,7 +927,8 @@ class VehiclesTab(ttk.Frame):
         self.marca_var.set(v["marca"])
         self.modelo_var.set(v["modelo"])
         self.color_var.set(v["color"])
-        owner = next((u for u in self.app.users if u["id"] == v["user_id"]), None)
+        self.tipo_var.set(v["tipo"])
+        owner = self.service.get_user_by_id(v["user_id"])
         if owner:
             display = f"{owner['id']} - {owner['nombre']} ({owner['username']})"
             self.owner_var.set(display)
@@ -692,11 +942,10 @@ class VehiclesTab(ttk.Frame):
             messagebox.showwarning("Validación", "Seleccione propietario.")
             return
         user_id = int(self.owner_var.get().split(" - ")[0])
-        v = self.app._create_vehicle(placa, user_id, self.marca_var.get().strip(), self.modelo_var.get().strip(), self.color_var.get().strip())
+        v = self.service._create_vehicle(placa, user_id, self.marca_var.get().strip(), self.modelo_var.get().strip(), self.color_var.get().strip(), self.tipo_var.get())
         if not v:
             messagebox.showerror("Error", "La placa ya existe.")
             return
-        self.refresh_everything()
         self._clear_form()
 
     def _on_update(self):
@@ -708,11 +957,10 @@ class VehiclesTab(ttk.Frame):
             messagebox.showwarning("Validación", "Placa obligatoria.")
             return
         user_id = int(self.owner_var.get().split(" - ")[0])
-        ok = self.app.update_vehicle(self._selected_id, placa, user_id, self.marca_var.get().strip(), self.modelo_var.get().strip(), self.color_var.get().strip())
+        ok = self.service.update_vehicle(self._selected_id, placa, user_id, self.marca_var.get().strip(), self.modelo_var.get().strip(), self.color_var.get().strip(), self.tipo_var.get())
         if not ok:
             messagebox.showerror("Error", "No se pudo actualizar (placa duplicada).")
             return
-        self.refresh_everything()
         self._clear_form()
 
     def _on_delete(self):
@@ -721,18 +969,23 @@ class VehiclesTab(ttk.Frame):
             return
         if not messagebox.askyesno("Eliminar", "¿Eliminar el vehículo seleccionado?"):
             return
-        ok = self.app.delete_vehicle(self._selected_id)
+        ok = self.service.delete_vehicle(self._selected_id)
         if not ok:
             messagebox.showerror("Error", "No se puede eliminar: ticket activo.")
             return
-        self.refresh_everything()
         self._clear_form()
 
+    def _on_import(self):
+        bulk_import(self, self.service, import_vehicles)
 
-class UsersTab(ttk.Frame):
-    def __init__(self, parent: MainFrame):
-        super().__init__(parent.nb, padding=10)
-        self.app = parent.master
+    def _on_export(self):
+        bulk_export(self, self.service, export_vehicles)
+
+
+class UsersTab(LazyTab, ttk.Frame):
+    def __init__(self, parent: MainFrame, master):
+        super().__init__(master, padding=10)
+        self.service = parent.service
         self.parent = parent
 
         self.columnconfigure(0, weight=1)
@@ -761,6 +1014,8 @@ class UsersTab(ttk.Frame):
         ttk.Button(btns, text="Actualizar", command=self._on_update).grid(row=0, column=1, padx=4)
         ttk.Button(btns, text="Eliminar", command=self._on_delete).grid(row=0, column=2, padx=4)
         ttk.Button(btns, text="Limpiar", command=self._clear_form).grid(row=0, column=3, padx=4)
+        ttk.Button(btns, text="Importar…", command=self._on_import).grid(row=0, column=4, padx=4)
+        ttk.Button(btns, text="Exportar…", command=self._on_export).grid(row=0, column=5, padx=4)
 
         table_frame = ttk.Frame(self)
         table_frame.grid(row=1, column=0, sticky="nsew", pady=(8, 0))
@@ -779,12 +1034,21 @@ class UsersTab(ttk.Frame):
 
         self.tree.bind("<<TreeviewSelect>>", self._on_select)
         self._selected_id = None
+        self.table = TreeSync(self.tree, cols)
+
+        self._init_lazy()
+        self.service.events.subscribe(UserChanged, lambda e: self.invalidate(e.user_id))
+
+    def _apply(self, pending):
+        for uid in pending:
+            u = self.service.get_user_by_id(uid)
+            if u is None:
+                self.table.remove(str(uid))
+            else:
+                self.table.upsert(str(uid), (u["id"], u["username"], u["nombre"]))
 
     def refresh_everything(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for u in self.app.users:
-            self.tree.insert("", "end", iid=str(u["id"]), values=(u["id"], u["username"], u["nombre"]))
+        self.table.sync((str(u["id"]), (u["id"], u["username"], u["nombre"])) for u in self.service.users)
 
     def _clear_form(self):
         self._selected_id = None
@@ -798,7 +1062,7 @@ class UsersTab(ttk.Frame):
         if not sel:
             return
         uid = int(sel[0])
-        u = next((x for x in self.app.users if x["id"] == uid), None)
+        u = self.service.get_user_by_id(uid)
         if not u:
             return
         self._selected_id = u["id"]
@@ -813,11 +1077,10 @@ class UsersTab(ttk.Frame):
         if not username or not password:
             messagebox.showwarning("Validación", "Usuario y contraseña obligatorios.")
             return
-        if self.app._find_user_by_username(username):
+        if self.service._find_user_by_username(username):
             messagebox.showerror("Error", "El usuario ya existe.")
             return
-        self.app._create_user(username, password, nombre or username)
-        self.refresh_everything()
+        self.service._create_user(username, password, nombre or username)
         self._clear_form()
 
     def _on_update(self):
@@ -827,41 +1090,46 @@ class UsersTab(ttk.Frame):
         if self.username_var.get().strip() == "admin" and self._selected_id != 1:
             messagebox.showwarning("Validación", "No se puede reasignar el nombre 'admin'.")
             return
-        ok = self.app.update_user(self._selected_id, self.username_var.get().strip(), self.password_var.get().strip(), self.nombre_var.get().strip())
+        ok = self.service.update_user(self._selected_id, self.username_var.get().strip(), self.password_var.get().strip(), self.nombre_var.get().strip())
         if not ok:
             messagebox.showerror("Error", "No se pudo actualizar (usuario duplicado).")
             return
-        self.refresh_everything()
         self._clear_form()
 
     def _on_delete(self):
         if not self._selected_id:
             messagebox.showinfo("Eliminar", "Seleccione un usuario.")
             return
-        if any(u["username"] == "admin" and u["id"] == self._selected_id for u in self.app.users):
+        u = self.service.get_user_by_id(self._selected_id)
+        if u and u["username"] == "admin":
             messagebox.showwarning("Validación", "No se puede eliminar el usuario admin.")
             return
         if not messagebox.askyesno("Eliminar", "¿Eliminar el usuario seleccionado?"):
             return
-        ok = self.app.delete_user(self._selected_id)
+        ok = self.service.delete_user(self._selected_id)
         if not ok:
             messagebox.showerror("Error", "No se puede eliminar (quizá tiene vehículos).")
             return
-        self.refresh_everything()
         self._clear_form()
 
+    def _on_import(self):
+        bulk_import(self, self.service, import_users)
 
-class ConfigTab(ttk.Frame):
-    def __init__(self, parent: MainFrame):
-        super().__init__(parent.nb, padding=10)
-        self.app = parent.master
+    def _on_export(self):
+        bulk_export(self, self.service, export_users)
+
+
+class ConfigTab(LazyTab, ttk.Frame):
+    def __init__(self, parent: MainFrame, master):
+        super().__init__(master, padding=10)
+        self.service = parent.service
         self.parent = parent
 
         frm = ttk.LabelFrame(self, text="Configuración", padding=12)
         frm.pack(fill="x")
 
         ttk.Label(frm, text="Tarifa por hora").grid(row=0, column=0, sticky="w", padx=(0, 8), pady=4)
-        ttk.Label(frm, text="Capacidad (puestos)").grid(row=0, column=2, sticky="w", padx=(24, 8), pady=4)
+        ttk.Label(frm, text="Capacidad total (puestos)").grid(row=0, column=2, sticky="w", padx=(24, 8), pady=4)
 
         self.rate_var = tk.StringVar()
         self.cap_var = tk.StringVar()
@@ -871,9 +1139,190 @@ class ConfigTab(ttk.Frame):
 
         ttk.Button(frm, text="Guardar", command=self._on_save).grid(row=1, column=3, sticky="w", padx=(12, 0), pady=4)
 
+        # reglas adicionales de cobro (vacío = sin esa regla)
+        rules = ttk.LabelFrame(self, text="Reglas de tarifa", padding=12)
+        rules.pack(fill="x", pady=(10, 0))
+        self.night_rate_var = tk.StringVar()
+        self.night_start_var = tk.StringVar()
+        self.night_end_var = tk.StringVar()
+        self.first_hour_var = tk.StringVar()
+        self.grace_var = tk.StringVar()
+        self.cap_day_var = tk.StringVar()
+        for col, (text, var) in enumerate([
+            ("Tarifa nocturna", self.night_rate_var), ("Noche desde (HH:MM)", self.night_start_var),
+            ("Noche hasta (HH:MM)", self.night_end_var), ("Primera hora", self.first_hour_var),
+            ("Gracia (min)", self.grace_var), ("Tope diario", self.cap_day_var),
+        ]):
+            ttk.Label(rules, text=text).grid(row=0, column=col, sticky="w", padx=(0, 12), pady=4)
+            ttk.Entry(rules, textvariable=var, width=12).grid(row=1, column=col, sticky="w", padx=(0, 12), pady=4)
+
+        # zonas: la zona general absorbe los cambios de la capacidad total
+        zones = ttk.LabelFrame(self, text="Zonas", padding=12)
+        zones.pack(fill="both", expand=True, pady=(10, 0))
+        zones.columnconfigure(0, weight=1)
+        zones.rowconfigure(0, weight=1)
+        cols = ("id", "nombre", "nivel", "tipos", "reservada", "puestos", "libres")
+        self.zone_tree = ttk.Treeview(zones, columns=cols, show="headings", selectmode="browse", height=5)
+        for c, w, a in [("id", 50, "center"), ("nombre", 140, "w"), ("nivel", 80, "center"), ("tipos", 180, "w"),
+                        ("reservada", 80, "center"), ("puestos", 80, "e"), ("libres", 80, "e")]:
+            self.zone_tree.heading(c, text=c.upper())
+            self.zone_tree.column(c, width=w, anchor=a)
+        self.zone_tree.grid(row=0, column=0, columnspan=2, sticky="nsew")
+        self.zone_tree.bind("<<TreeviewSelect>>", self._on_zone_select)
+        self.zone_table = TreeSync(self.zone_tree, cols)
+        self._zone_id = None
+
+        zform = ttk.Frame(zones)
+        zform.grid(row=1, column=0, sticky="ew", pady=(8, 0))
+        self.zone_name_var = tk.StringVar()
+        self.zone_level_var = tk.StringVar()
+        self.zone_prefix_var = tk.StringVar()
+        self.zone_size_var = tk.StringVar()
+        self.zone_reserved_var = tk.BooleanVar(value=False)
+        self.zone_type_vars = {t: tk.BooleanVar(value=True) for t in VEHICLE_TYPES}
+        for text, var, width in [("Nombre", self.zone_name_var, 14), ("Nivel", self.zone_level_var, 6),
+                                 ("Prefijo", self.zone_prefix_var, 6), ("Puestos", self.zone_size_var, 6)]:
+            ttk.Label(zform, text=text).pack(side="left", padx=(0, 4))
+            ttk.Entry(zform, textvariable=var, width=width).pack(side="left", padx=(0, 8))
+        for tipo, var in self.zone_type_vars.items():
+            ttk.Checkbutton(zform, text=tipo, variable=var).pack(side="left")
+        ttk.Checkbutton(zform, text="Reservada", variable=self.zone_reserved_var).pack(side="left", padx=(8, 0))
+
+        zbtns = ttk.Frame(zones)
+        zbtns.grid(row=1, column=1, sticky="e", pady=(8, 0))
+        ttk.Button(zbtns, text="Agregar", command=self._on_zone_add).pack(side="left", padx=4)
+        ttk.Button(zbtns, text="Actualizar", command=self._on_zone_update).pack(side="left", padx=4)
+        ttk.Button(zbtns, text="Eliminar", command=self._on_zone_delete).pack(side="left", padx=4)
+        ttk.Button(zbtns, text="Limpiar", command=self._clear_zone_form).pack(side="left", padx=4)
+
+        self._init_lazy()
+        events = self.service.events
+        events.subscribe(ConfigChanged, lambda e: self.invalidate(e.key))
+        # entradas y salidas solo cambian la columna de libres
+        events.subscribe(TicketOpened, lambda e: self.invalidate("libres"))
+        events.subscribe(TicketClosed, lambda e: self.invalidate("libres"))
+
+    def _apply(self, pending):
+        if pending == {"libres"}:
+            self._refresh_zones()
+        else:
+            self.refresh_everything()
+
+    def _refresh_zones(self):
+        # puestos y libres salen de los contadores por zona
+        self.zone_table.sync(
+            (str(z["id"]), (z["id"], z["nombre"], z["nivel"], ", ".join(z["tipos"]),
+                            "sí" if z["reservada"] else "no", size, free))
+            for z, size, free in self.service.zone_occupancy()
+        )
+
     def refresh_everything(self):
-        self.rate_var.set(f"{self.app.rate_per_hour:.2f}")
-        self.cap_var.set(str(len(self.app.spots)))
+        rules = self.service.tariff.rules
+        self.rate_var.set(f"{self.service.rate_per_hour:.2f}")
+        self.cap_var.set(str(len(self.service.spots)))
+        def money(v):
+            return "" if v is None else f"{v:.2f}"
+
+        self.night_rate_var.set(money(rules["night_rate"]))
+        self.night_start_var.set(rules["night_start"])
+        self.night_end_var.set(rules["night_end"])
+        self.first_hour_var.set(money(rules["first_hour"]))
+        self.grace_var.set(str(rules["grace_minutes"]) if rules["grace_minutes"] else "")
+        self.cap_day_var.set(money(rules["daily_cap"]))
+        self._refresh_zones()
+
+    # ===================== Zonas =====================
+    def _clear_zone_form(self):
+        self._zone_id = None
+        self.zone_name_var.set("")
+        self.zone_level_var.set("")
+        self.zone_prefix_var.set("")
+        self.zone_size_var.set("")
+        self.zone_reserved_var.set(False)
+        for var in self.zone_type_vars.values():
+            var.set(True)
+        self.zone_tree.selection_remove(self.zone_tree.selection())
+
+    def _on_zone_select(self, _evt):
+        sel = self.zone_tree.selection()
+        z = self.service.get_zone_by_id(int(sel[0])) if sel else None
+        if not z:
+            return
+        self._zone_id = z["id"]
+        self.zone_name_var.set(z["nombre"])
+        self.zone_level_var.set(z["nivel"])
+        self.zone_prefix_var.set(z["prefijo"])
+        self.zone_size_var.set(str(self.service.store.zone_size(z["id"])))
+        self.zone_reserved_var.set(z["reservada"])
+        for tipo, var in self.zone_type_vars.items():
+            var.set(tipo in z["tipos"])
+
+    def _zone_form(self):
+        # (campos de la zona, puestos); ValueError si los puestos no son un entero >= 0
+        try:
+            size = int(self.zone_size_var.get().strip() or 0)
+        except ValueError:
+            raise ValueError("Puestos inválidos para la zona.") from None
+        if size < 0:
+            raise ValueError("Los puestos no pueden ser negativos.")
+        fields = {
+            "nombre": self.zone_name_var.get(),
+            "nivel": self.zone_level_var.get(),
+            "prefijo": self.zone_prefix_var.get(),
+            "tipos": [t for t, var in self.zone_type_vars.items() if var.get()],
+            "reservada": self.zone_reserved_var.get(),
+        }
+        return fields, size
+
+    def _on_zone_add(self):
+        try:
+            fields, size = self._zone_form()
+            self.service.create_zone(capacidad=size, **fields)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self._clear_zone_form()
+
+    def _on_zone_update(self):
+        if not self._zone_id:
+            messagebox.showinfo("Actualizar", "Seleccione una zona de la tabla.")
+            return
+        try:
+            fields, size = self._zone_form()
+            # primero los datos (validan), luego los puestos (pueden faltar libres)
+            self.service.update_zone(self._zone_id, **fields)
+            if size != self.service.store.zone_size(self._zone_id):
+                self.service.set_zone_capacity(self._zone_id, size)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self._clear_zone_form()
+
+    def _on_zone_delete(self):
+        if not self._zone_id:
+            messagebox.showinfo("Eliminar", "Seleccione una zona de la tabla.")
+            return
+        if not messagebox.askyesno("Eliminar", "¿Eliminar la zona seleccionada y sus puestos?"):
+            return
+        if not self.service.delete_zone(self._zone_id):
+            messagebox.showerror("Error", "No se puede eliminar: es la zona general o tiene vehículos adentro.")
+            return
+        self._clear_zone_form()
+
+    def _tariff_rules(self, rate):
+        def optional(var):
+            text = var.get().strip().replace(",", ".")
+            return float(text) if text else None
+
+        return {
+            "rate": rate,
+            "night_rate": optional(self.night_rate_var),
+            "night_start": self.night_start_var.get().strip() or "20:00",
+            "night_end": self.night_end_var.get().strip() or "06:00",
+            "first_hour": optional(self.first_hour_var),
+            "grace_minutes": int(self.grace_var.get().strip() or 0),
+            "daily_cap": optional(self.cap_day_var),
+        }
 
     def _on_save(self):
         try:
@@ -883,60 +1332,380 @@ class ConfigTab(ttk.Frame):
             cap = int(self.cap_var.get())
             if cap <= 0:
                 raise ValueError
-            # actualizar
-            # primero tarifa
-            self.app.rate_per_hour = rate
-            # luego capacidad
-            if cap != len(self.app.spots):
-                self.app._ensure_spots(cap)
-            messagebox.showinfo("Configuración", "Configuración guardada.")
-            self.parent._update_status()
-            self.parent.parking_tab.refresh_everything()
+            rules = self._tariff_rules(rate)
         except ValueError:
             messagebox.showerror("Error", "Valores inválidos para tarifa/capacidad.")
+            return
+        try:
+            # primero tarifa (valida las reglas), luego capacidad
+            self.service.set_tariff(rules)
+            if cap != len(self.service.spots):
+                self.service._ensure_spots(cap)
+            messagebox.showinfo("Configuración", "Configuración guardada.")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
 
-class ReportsTab(ttk.Frame):
-    def __init__(self, parent: MainFrame):
-        super().__init__(parent.nb, padding=10)
-        self.app = parent.master
+class ReportsTab(LazyTab, ttk.Frame):
+    # Tabla virtual: el Treeview tiene solo las filas visibles y se rellenan
+    # desde el historial según el desplazamiento del scrollbar.
+    ROW_HEIGHT = 20
+
+    def __init__(self, parent: MainFrame, master):
+        super().__init__(master, padding=10)
+        self.service = parent.service
         self.parent = parent
 
         self.columnconfigure(0, weight=1)
-        self.rowconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        # filtros de búsqueda (vacío = sin filtro); se combinan con Desde/Hasta
+        search = ttk.Frame(self)
+        search.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 8))
+        self.f_placa_var = tk.StringVar()
+        self.f_puesto_var = tk.StringVar()
+        self.f_operador_var = tk.StringVar()
+        self.f_min_var = tk.StringVar()
+        self.f_max_var = tk.StringVar()
+        for text, var, width in [("Placa", self.f_placa_var, 10), ("Puesto", self.f_puesto_var, 6),
+                                 ("Operador", self.f_operador_var, 12), ("Monto mín", self.f_min_var, 8),
+                                 ("Monto máx", self.f_max_var, 8)]:
+            ttk.Label(search, text=text).pack(side="left", padx=(0, 4))
+            ttk.Entry(search, textvariable=var, width=width).pack(side="left", padx=(0, 8))
+        ttk.Button(search, text="Limpiar", command=self._on_clear_filters).pack(side="right")
+        ttk.Button(search, text="Buscar", command=self.refresh_everything).pack(side="right", padx=6)
 
         cols = ("id", "placa", "puesto", "entrada", "salida", "total")
-        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=20)
         for c, w, a in [("id", 60, "center"), ("placa", 120, "w"), ("puesto", 80, "center"), ("entrada", 180, "center"), ("salida", 180, "center"), ("total", 100, "e")]:
-            self.tree.heading(c, text=c.upper())
+            self.tree.heading(c, text=c.upper(), command=lambda c=c: self._on_sort(c))
             self.tree.column(c, width=w, anchor=a)
-        vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=vsb.set)
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scroll)
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        self.vsb.grid(row=1, column=1, sticky="ns")
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self._scroll_by(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(1, "units"))
 
         footer = ttk.Frame(self)
-        footer.grid(row=1, column=0, sticky="ew", pady=(8, 0))
+        footer.grid(row=2, column=0, sticky="ew", pady=(8, 0))
         self.total_var = tk.StringVar(value="Total ingresos: 0.00")
         ttk.Label(footer, textvariable=self.total_var).pack(side="left")
         ttk.Button(footer, text="Actualizar", command=self.refresh_everything).pack(side="right")
 
+        # rango de fechas de salida (AAAA-MM-DD, vacío = sin límite)
+        self.hasta_var = tk.StringVar()
+        self.desde_var = tk.StringVar()
+        ttk.Entry(footer, textvariable=self.hasta_var, width=12).pack(side="right", padx=(0, 8))
+        ttk.Label(footer, text="Hasta").pack(side="right", padx=(8, 4))
+        ttk.Entry(footer, textvariable=self.desde_var, width=12).pack(side="right")
+        ttk.Label(footer, text="Desde").pack(side="right", padx=(8, 4))
+
+        # ocupación en el rango: por hora (hasta una semana) o por día
+        occ = ttk.LabelFrame(self, text="Ocupación", padding=8)
+        occ.grid(row=3, column=0, columnspan=2, sticky="ew", pady=(8, 0))
+        occ.columnconfigure(0, weight=1)
+        occ_cols = ("periodo", "promedio", "maximo")
+        self.occ_tree = ttk.Treeview(occ, columns=occ_cols, show="headings", height=6)
+        for c, w, a in [("periodo", 180, "w"), ("promedio", 100, "e"), ("maximo", 100, "e")]:
+            self.occ_tree.heading(c, text=c.upper())
+            self.occ_tree.column(c, width=w, anchor=a)
+        occ_vsb = ttk.Scrollbar(occ, orient="vertical", command=self.occ_tree.yview)
+        self.occ_tree.configure(yscroll=occ_vsb.set)
+        self.occ_tree.grid(row=0, column=0, sticky="ew")
+        occ_vsb.grid(row=0, column=1, sticky="ns")
+        self.occ_var = tk.StringVar(value="")
+        ttk.Label(occ, textvariable=self.occ_var).grid(row=1, column=0, sticky="w", pady=(6, 0))
+        self.occ_table = TreeSync(self.occ_tree, occ_cols)
+
+        self.table = TreeSync(self.tree, cols)
+        self.rows = None  # historial con acceso por posición
+        self.offset = 0
+        self.page_size = 20
+        self.sort_col = None
+        self.sort_desc = False
+        self._search_job = None  # after() de la búsqueda en curso
+        self._query = (None, None, {})  # desde, hasta y filtros de las filas mostradas
+        self._closed = []  # (ticket, posición en el índice de búsqueda) cerrados desde entonces
+
+        self._init_lazy()
+        events = self.service.events
+        events.subscribe(TicketClosed, self._on_ticket_closed)
+        events.subscribe(VehicleChanged, lambda e: e.action == UPDATED and self.invalidate("rows"))
+
+    def _on_ticket_closed(self, e):
+        # el servicio se suscribió antes y ya agregó el ticket al índice de búsqueda: es su última fila
+        ref = len(self.rows.index) - 1 if isinstance(self.rows, SearchResults) else None
+        self._closed.append((e.ticket, ref))
+        self.invalidate("closed")
+
+    def _apply(self, pending):
+        if "closed" in pending:
+            closed, self._closed = self._closed, []
+            if self.rows is not None:
+                self._add_closed(closed)
+        # cambió una placa o hay filas nuevas: repintar la ventana visible
+        if self.rows is not None:
+            self._render()
+
+    def _add_closed(self, closed):
+        # cada salida se agrega a las filas (en su lugar si hay orden) y a los totales, sin
+        # releer el historial; la ocupación pasada no cambia y se recalcula con Actualizar
+        start, end, filters = self._query
+        searching = isinstance(self.rows, SearchResults)
+        for t, ref in closed:
+            day = t["checkout"].date()
+            if (start and day < start) or (end and day > end) or not self._matches(t, filters):
+                continue
+            self.rows.append(ref if searching else t)
+        if searching:
+            if self.rows.done:
+                self.total_var.set(f"Resultados: {len(self.rows)} | Total: {self.rows.total:.2f}")
+        else:
+            count, total = self.service.stats.total_between(start, end)
+            self.total_var.set(f"Total ingresos: {total:.2f} | Tickets: {count}")
+
+    def _matches(self, t, filters):
+        # mismos criterios que search_history (operador = quien registró la salida)
+        if "placa" in filters:
+            v = self.service._find_vehicle_by_plate(filters["placa"])
+            if v is None or v["id"] != t["vehicle_id"]:
+                return False
+        return (
+            filters.get("spot_id", t["spot_id"]) == t["spot_id"]
+            and filters.get("operator_id", t["user_out"]) == t["user_out"]
+            and filters.get("min_total", t["total"]) <= t["total"]
+            and filters.get("max_total", t["total"]) >= t["total"]
+        )
+
+    # columna -> (campo del ticket, transformación para ordenar)
+    def _sort_key(self, col):
+        if col == "placa":
+            return "vehicle_id", lambda vid: (self.service.get_vehicle_by_id(vid) or {}).get("placa", "?")
+        if col == "puesto":
+            return "spot_id", lambda sid: (self.service.get_spot_by_id(sid) or {}).get("codigo", "?")
+        field = {"entrada": "checkin", "salida": "checkout"}.get(col, col)
+        return field, None
+
+    def _date_range(self):
+        desde = self.desde_var.get().strip()
+        hasta = self.hasta_var.get().strip()
+        return (date.fromisoformat(desde) if desde else None, date.fromisoformat(hasta) if hasta else None)
+
+    def _filters(self):
+        # filtros de la barra de búsqueda como argumentos de search_history
+        filters = {}
+        placa = self.f_placa_var.get().strip()
+        if placa:
+            filters["placa"] = placa
+        puesto = self.f_puesto_var.get().strip().upper()
+        if puesto:
+            spot = next((s for s in self.service.spots if s["codigo"].upper() == puesto), None)
+            if spot is None:
+                raise ValueError(f"El puesto {puesto} no existe.")
+            filters["spot_id"] = spot["id"]
+        operador = self.f_operador_var.get().strip()
+        if operador:
+            user = self.service._find_user_by_username(operador)
+            if user is None:
+                raise ValueError(f"El operador {operador} no existe.")
+            filters["operator_id"] = user["id"]
+        for key, var in (("min_total", self.f_min_var), ("max_total", self.f_max_var)):
+            text = var.get().strip()
+            if text:
+                try:
+                    filters[key] = float(text)
+                except ValueError:
+                    raise ValueError("Montos inválidos.") from None
+        return filters
+
+    def _on_clear_filters(self):
+        for var in (self.f_placa_var, self.f_puesto_var, self.f_operador_var, self.f_min_var, self.f_max_var):
+            var.set("")
+        self.refresh_everything()
+
     def refresh_everything(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        total_sum = 0.0
-        for t in self.app.closed_tickets:
-            veh = next((v for v in self.app.vehicles if v["id"] == t["vehicle_id"]), None)
-            spot = self.app.get_spot_by_id(t["spot_id"]) if t else None
-            placa = veh["placa"] if veh else "?"
-            puesto = spot["codigo"] if spot else "?"
-            entrada = t["checkin"].strftime("%Y-%m-%d %H:%M:%S")
-            salida = t["checkout"].strftime("%Y-%m-%d %H:%M:%S")
-            total_sum += float(t["total"]) if t.get("total") else 0.0
-            self.tree.insert("", "end", iid=str(t["id"]), values=(t["id"], placa, puesto, entrada, salida, f"{t['total']:.2f}"))
-        self.total_var.set(f"Total ingresos: {total_sum:.2f}")
+        try:
+            start, end = self._date_range()
+        except ValueError:
+            messagebox.showerror("Error", "Fechas inválidas (use AAAA-MM-DD).")
+            return
+        try:
+            filters = self._filters()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        self._query = (start, end, filters)
+        self._closed = []
+        if filters:
+            # búsqueda indexada: las filas aparecen a medida que se encuentran
+            self.rows = self.service.search_history(start=start, end=end, **filters)
+            self.offset = 0
+            self._search_step()
+        else:
+            self.rows = self.service.history(start, end)
+            if self.sort_col:
+                field, transform = self._sort_key(self.sort_col)
+                self.rows.sort(field, self.sort_desc, transform)
+            self.offset = min(self.offset, max(0, len(self.rows) - self.page_size))
+            self._render()
+            count, total = self.service.stats.total_between(start, end)
+            self.total_var.set(f"Total ingresos: {total:.2f} | Tickets: {count}")
+        self._refresh_occupancy(start, end)
+
+    def _search_step(self):
+        self._search_job = None
+        rows = self.rows
+        rows.fetch(8)
+        if rows.done and self.sort_col:
+            field, transform = self._sort_key(self.sort_col)
+            rows.sort(field, self.sort_desc, transform)
+        self._render()
+        state = "" if rows.done else " (buscando…)"
+        self.total_var.set(f"Resultados: {len(rows)} | Total: {rows.total:.2f}{state}")
+        if not rows.done:
+            self._search_job = self.after(1, self._search_step)
+
+    def _refresh_occupancy(self, start, end):
+        # sin fechas: el día de hoy hasta ahora
+        since = datetime.combine(start or end or self.service.clock.today(), datetime.min.time())
+        until = datetime.combine(end, datetime.min.time()) + timedelta(days=1) if end else None
+        if until is not None and until <= since:
+            self.occ_table.sync([])
+            self.occ_var.set("")
+            return
+        report = self.service.occupancy(since, until, bucket=60)
+        days = (report["end"] - report["start"]) / 86400
+        per, fmt = (60, "%Y-%m-%d %H:00") if days <= 7 else (1440, "%Y-%m-%d")
+        self.occ_table.sync(
+            (str(g), ((since + timedelta(minutes=g * per)).strftime(fmt), f"{avg:.1f}", peak))
+            for g, avg, peak in summarize(report["curve"], per)
+        )
+        pico = datetime.fromtimestamp(report["peak_at"]).strftime("%Y-%m-%d %H:%M")
+        lleno = report["time_at_capacity"] / 60
+        self.occ_var.set(
+            f"Pico: {report['peak']} de {report['capacity']} ({pico}) | Tiempo lleno: {lleno:.0f} min"
+        )
+
+    def _format(self, t):
+        veh = self.service.get_vehicle_by_id(t["vehicle_id"])
+        spot = self.service.get_spot_by_id(t["spot_id"])
+        placa = veh["placa"] if veh else "?"
+        puesto = spot["codigo"] if spot else "?"
+        entrada = t["checkin"].strftime("%Y-%m-%d %H:%M:%S")
+        salida = t["checkout"].strftime("%Y-%m-%d %H:%M:%S")
+        return (t["id"], placa, puesto, entrada, salida, f"{t['total']:.2f}")
+
+    def _render(self):
+        # solo se materializan las filas de la ventana visible
+        n = len(self.rows) if self.rows is not None else 0
+        end = min(n, self.offset + self.page_size)
+        self.table.sync((f"r{i - self.offset}", self._format(self.rows.row(i))) for i in range(self.offset, end))
+        if n:
+            self.vsb.set(self.offset / n, end / n)
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def _scroll_to(self, offset):
+        n = len(self.rows) if self.rows is not None else 0
+        offset = max(0, min(int(offset), n - self.page_size))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _scroll_by(self, amount, what):
+        step = self.page_size if what.startswith("page") else 1
+        self._scroll_to(self.offset + int(amount) * step)
+
+    def _on_scroll(self, action, *args):
+        if action == "moveto":
+            n = len(self.rows) if self.rows is not None else 0
+            self._scroll_to(float(args[0]) * n)
+        elif action == "scroll":
+            self._scroll_by(args[0], args[1])
+
+    def _on_resize(self, event):
+        rows = max(1, (event.height - self.ROW_HEIGHT) // self.ROW_HEIGHT)
+        if rows != self.page_size:
+            self.page_size = rows
+            if self.rows is not None:
+                self._render()
+
+    def _on_sort(self, col):
+        if self.rows is None:
+            return
+        self.sort_desc = not self.sort_desc if self.sort_col == col else False
+        self.sort_col = col
+        field, transform = self._sort_key(col)
+        self.rows.sort(field, self.sort_desc, transform)
+        self.offset = 0
+        self._render()
+
+
+class DiagnosticsTab(ttk.Frame):
+    # Pestaña oculta: métodos más costosos según el perfilador
+    def __init__(self, parent: MainFrame):
+        super().__init__(parent.nb, padding=10)
+        self.parent = parent
+        self.profiler = parent.profiler
+
+        self.startup = parent.master.startup
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        bar = ttk.Frame(self)
+        bar.grid(row=0, column=0, sticky="ew")
+        self.enabled_var = tk.BooleanVar(value=self.profiler.enabled)
+        ttk.Checkbutton(bar, text="Perfilado activo", variable=self.enabled_var, command=self._on_toggle).pack(side="left")
+        ttk.Button(bar, text="Guardar JSON…", command=self._on_dump).pack(side="right")
+        ttk.Button(bar, text="Limpiar", command=self._on_reset).pack(side="right", padx=6)
+        ttk.Button(bar, text="Actualizar", command=self.refresh_everything).pack(side="right")
+
+        cols = ("metodo", "llamadas", "total_ms", "prom_ms", "max_ms", "filas_ins", "filas_borr")
+        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        for c, w, a in [("metodo", 260, "w"), ("llamadas", 80, "e"), ("total_ms", 100, "e"), ("prom_ms", 90, "e"), ("max_ms", 90, "e"), ("filas_ins", 80, "e"), ("filas_borr", 80, "e")]:
+            self.tree.heading(c, text=c.upper())
+            self.tree.column(c, width=w, anchor=a)
+        vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscroll=vsb.set)
+        self.tree.grid(row=1, column=0, sticky="nsew", pady=(8, 0))
+        vsb.grid(row=1, column=1, sticky="ns", pady=(8, 0))
+        self.table = TreeSync(self.tree, cols)
+
+        # tiempos de arranque (módulos, servicio, ventana, primer cuadro, login)
+        self.startup_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.startup_var, font=("TkFixedFont", 9), justify="left").grid(
+            row=2, column=0, columnspan=2, sticky="w", pady=(8, 0)
+        )
+
+    def refresh_everything(self):
+        self.startup_var.set("Arranque:\n" + self.startup.report())
+        rows = self.profiler.top(50)
+        self.table.sync(
+            (r["name"], (r["name"], r["calls"], f"{r['total_ms']:.1f}", f"{r['avg_ms']:.2f}", f"{r['max_ms']:.1f}", r["rows_inserted"], r["rows_deleted"]))
+            for r in rows
+        )
+
+    def _on_toggle(self):
+        if self.enabled_var.get():
+            self.profiler.enable()
+        else:
+            self.profiler.disable()
+
+    def _on_reset(self):
+        self.profiler.reset()
+        self.refresh_everything()
+
+    def _on_dump(self):
+        path = filedialog.asksaveasfilename(parent=self, title="Guardar diagnóstico", defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            self.profiler.dump(path, startup=self.startup.to_dict())
+            messagebox.showinfo("Diagnóstico", f"Diagnóstico guardado en {path}.")
 
 
 if __name__ == "__main__":
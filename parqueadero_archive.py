@@ -0,0 +1,256 @@
+"""
+Archivo de tickets cerrados por día
+-----------------------------------
+Cada ticket cerrado se agrega a un archivo binario del día de su salida
+(AAAA-MM-DD.tickets) con registros de tamaño fijo, así que las particiones
+se pueden mapear en memoria y un reporte por rango de fechas solo abre los
+días que necesita.
+
+Registro (64 bytes, little-endian):
+    id, vehicle_id, spot_id (int64), checkin, checkout (epoch float64),
+    user_in, user_out (int64, 0 = sin usuario), total (float64)
+
+No depende de Tkinter.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from datetime import date, datetime
+
+RECORD = struct.Struct("<qqqddqqd")
+SUFFIX = ".tickets"
+# posición de cada campo dentro del registro crudo
+FIELDS = {"id": 0, "vehicle_id": 1, "spot_id": 2, "checkin": 3, "checkout": 4, "user_in": 5, "user_out": 6, "total": 7}
+# mismo registro como dtype estructurado de NumPy (numpy.frombuffer sobre raw())
+RECORD_DTYPE = [
+    ("id", "<i8"), ("vehicle_id", "<i8"), ("spot_id", "<i8"), ("checkin", "<f8"),
+    ("checkout", "<f8"), ("user_in", "<i8"), ("user_out", "<i8"), ("total", "<f8"),
+]
+
+
+def record_to_ticket(r):
+    return {
+        "id": r[0],
+        "vehicle_id": r[1],
+        "spot_id": r[2],
+        "checkin": datetime.fromtimestamp(r[3]),
+        "checkout": datetime.fromtimestamp(r[4]),
+        "user_in": r[5] or None,
+        "user_out": r[6] or None,
+        "total": r[7],
+    }
+
+
+def insort(seq, item, key, reverse=False, first=False):
+    # inserta item en seq (ordenada por key, como sorted(): estable) con O(log n) comparaciones;
+    # entre claves iguales va al final, o al principio con first (si antes del sort estaba primero)
+    x = key(item)
+    lo, hi = 0, len(seq)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        y = key(seq[mid])
+        if first:
+            right = y > x if reverse else y < x
+        else:
+            right = y >= x if reverse else y <= x
+        if right:
+            lo = mid + 1
+        else:
+            hi = mid
+    seq.insert(lo, item)
+
+
+def ticket_to_record(t):
+    return RECORD.pack(
+        t["id"],
+        t["vehicle_id"],
+        t["spot_id"],
+        t["checkin"].timestamp(),
+        t["checkout"].timestamp(),
+        t["user_in"] or 0,
+        t["user_out"] or 0,
+        float(t["total"]),
+    )
+
+
+class ClosedTicketArchive:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._open_day = None
+        self._fh = None
+        self._maps = {}  # día -> mmap abierto para lecturas aleatorias
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+            self._open_day = None
+        self.release_maps()
+
+    def _path(self, day):
+        return os.path.join(self.directory, day.isoformat() + SUFFIX)
+
+    # ===================== Escritura =====================
+    def append(self, closed):
+        day = closed["checkout"].date()
+        if day != self._open_day:
+            self.close()
+            self._fh = open(self._path(day), "ab")
+            self._open_day = day
+        self._fh.write(ticket_to_record(closed))
+        self._fh.flush()
+
+    def extend(self, tickets):
+        for t in tickets:
+            self.append(t)
+
+    # ===================== Lectura =====================
+    def days(self):
+        out = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                out.append(date.fromisoformat(name[: -len(SUFFIX)]))
+        out.sort()
+        return out
+
+    def count(self, day):
+        try:
+            return os.path.getsize(self._path(day)) // RECORD.size
+        except FileNotFoundError:
+            return 0
+
+    def records(self, day):
+        # tuplas crudas del día, leídas desde el archivo mapeado en memoria
+        path = self._path(day)
+        size = self.count(day) * RECORD.size
+        if size == 0:
+            return
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for off in range(0, size, RECORD.size):
+                yield RECORD.unpack_from(mm, off)
+
+    def raw(self, day):
+        # bytes de los registros completos del día, para lectores vectorizados
+        size = self.count(day) * RECORD.size
+        if size == 0:
+            return b""
+        with open(self._path(day), "rb") as fh:
+            return fh.read(size)
+
+    def record_at(self, day, n):
+        # lectura aleatoria de un registro; se re-mapea si el archivo creció
+        mm = self._maps.get(day)
+        end = (n + 1) * RECORD.size
+        if mm is None or len(mm) < end:
+            if mm is not None:
+                mm.close()
+            with open(self._path(day), "rb") as fh:
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[day] = mm
+        return RECORD.unpack_from(mm, n * RECORD.size)
+
+    def release_maps(self):
+        for mm in self._maps.values():
+            mm.close()
+        self._maps.clear()
+
+    def read_day(self, day):
+        for r in self.records(day):
+            yield record_to_ticket(r)
+
+    def days_between(self, start=None, end=None):
+        return [d for d in self.days() if (start is None or d >= start) and (end is None or d <= end)]
+
+    def iter_range(self, start=None, end=None):
+        for day in self.days_between(start, end):
+            yield from self.read_day(day)
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def __len__(self):
+        return sum(self.count(d) for d in self.days())
+
+
+class HistoryIndex:
+    """Índice liviano sobre las particiones de un rango de fechas.
+
+    Guarda solo (día, posición) por fila en arreglos compactos; los registros
+    se leen del archivo cuando se piden con row(i).
+    """
+
+    def __init__(self, archive, start=None, end=None):
+        self.archive = archive
+        self.days = archive.days_between(start, end)
+        self._day_of = array("i")
+        self._pos = array("i")
+        for di, day in enumerate(self.days):
+            n = archive.count(day)
+            self._day_of.extend(array("i", [di]) * n)
+            self._pos.extend(range(n))
+        self.order = None
+        self._keys = None  # claves del último sort(), para insertar en orden
+        self._sort = None  # (posición del campo, reverse, transform)
+
+    def __len__(self):
+        return len(self._pos)
+
+    def _raw(self, k):
+        return self.archive.record_at(self.days[self._day_of[k]], self._pos[k])
+
+    def row(self, i):
+        k = self.order[i] if self.order is not None else i
+        return record_to_ticket(self._raw(k))
+
+    def sort(self, field, reverse=False, transform=None):
+        idx = FIELDS[field]
+        keys = [r[idx] for day in self.days for r in self.archive.records(day)]
+        if transform:
+            keys = [transform(k) for k in keys]
+        self.order = array("i", sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse))
+        self._keys = keys
+        self._sort = (idx, reverse, transform)
+
+    def append(self, closed):
+        # ticket recién cerrado, ya escrito al final de la partición de su día
+        day = closed["checkout"].date()
+        if not self.days or self.days[-1] != day:
+            self.days.append(day)
+        di = len(self.days) - 1
+        k = len(self._pos)
+        # el índice tiene todos los registros de sus días: la posición es la siguiente del día
+        self._day_of.append(di)
+        self._pos.append(self._pos[k - 1] + 1 if k and self._day_of[k - 1] == di else 0)
+        if self.order is not None:
+            idx, reverse, transform = self._sort
+            key = self._raw(k)[idx]
+            self._keys.append(transform(key) if transform else key)
+            insort(self.order, k, self._keys.__getitem__, reverse)
+
+
+class ListHistory:
+    """Misma interfaz que HistoryIndex sobre una lista de tickets en memoria."""
+
+    def __init__(self, tickets):
+        self.tickets = list(tickets)
+        self._key = None  # clave y sentido del último sort()
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def row(self, i):
+        return self.tickets[i]
+
+    def sort(self, field, reverse=False, transform=None):
+        key = (lambda t: transform(t[field])) if transform else (lambda t: t[field])
+        self.tickets.sort(key=key, reverse=reverse)
+        self._key = (key, reverse)
+
+    def append(self, closed):
+        if self._key is None:
+            self.tickets.append(closed)
+        else:
+            insort(self.tickets, closed, *self._key)
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del parqueadero
+--------------------------
+Corren sobre ParkingService, sin Tkinter.
+
+`gate` mide el costo de ParkingService.checkin + checkout en función del
+tamaño de la flota registrada. Con el almacén indexado el costo por operación
+debe mantenerse plano entre 100 y 1.000.000 de vehículos.
+
+`persist` mide el throughput sostenido de entradas/salidas con cada
+transacción confirmada en SQLite (WAL, synchronous=FULL por defecto).
+
+`concurrency` reparte 10.000 entradas (con salidas intercaladas) entre hilos
+que compiten por los mismos puestos y placas, verifica que ningún puesto ni
+vehículo quede con dos tickets activos y reporta ops/s por cantidad de hilos.
+
+`simulate` genera tráfico sintético (llegadas Poisson, estadía con la
+distribución elegida) contra un parqueadero de N puestos y una flota de M
+vehículos, y reporta latencia p50/p95/p99 por operación, throughput y pico
+de memoria. El servicio usa un ManualClock que avanza con el tiempo simulado,
+así que las estadías duran lo que dice la distribución y se cobran con las
+reglas de --tariff (franja nocturna, primera hora, tope). Con --json guarda
+el resultado; con --compare lo contrasta con una corrida anterior y muestra
+el cambio porcentual de cada percentil.
+
+`memory` compara la memoria de N tickets cerrados como dicts, como registros
+con __slots__ y en columnas (ClosedTicketTable), y el tiempo de recorrerlos.
+
+Uso:
+    python parqueadero_bench.py gate --sizes 100 1000 10000 100000 1000000
+    python parqueadero_bench.py persist --ops 5000 --sync FULL NORMAL
+    python parqueadero_bench.py concurrency --threads 1 2 4 8 16 --checkins 10000
+    python parqueadero_bench.py simulate --rate 20 --minutes 1440 --dwell lognormal:90:0.8 --json base.json
+    python parqueadero_bench.py simulate --rate 20 --minutes 1440 --compare base.json --fail-over 25
+    python parqueadero_bench.py simulate --minutes 2880 --tariff nocturna.json
+    python parqueadero_bench.py billing --tickets 10000000 --rates 4 5 6 7.5
+    python parqueadero_bench.py startup
+    python parqueadero_bench.py memory --tickets 1000000
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from parqueadero_billing import billed_hours, compare_tariffs, compute_amount, numpy_or_none
+from parqueadero_clock import ManualClock
+from parqueadero_service import ParkingService
+from parqueadero_tickets import ClosedTicket, ClosedTicketTable
+
+SIM_START = datetime(2026, 1, 5, 6, 0)  # inicio del tráfico simulado (lunes 06:00)
+
+
+def _build_service(n_vehicles, n_spots, **kwargs):
+    svc = ParkingService(seed=False, **kwargs)
+    with svc.transaction():
+        admin = svc._create_user("admin", "admin", nombre="Administrador")
+        svc._ensure_spots(n_spots)
+        for i in range(1, n_vehicles + 1):
+            svc._create_vehicle(f"V{i:07d}", admin["id"])
+    svc.login("admin", "admin")
+    return svc
+
+
+def _gate_cycle(svc, placa, spot_id):
+    t = svc.checkin(placa, spot_id=spot_id)
+    svc.checkout(t["id"])
+
+
+def bench_gate(sizes, ops, n_spots, seed):
+    rng = random.Random(seed)
+    print(f"{'vehiculos':>10} {'ops':>8} {'us/op':>10}")
+    results = []
+    for n in sizes:
+        svc = _build_service(n, n_spots)
+        plates = [f"V{rng.randint(1, n):07d}" for _ in range(ops)]
+        spots = [rng.randint(1, n_spots) for _ in range(ops)]
+        start = time.perf_counter()
+        for i in range(ops):
+            _gate_cycle(svc, plates[i], spots[i])
+        elapsed = time.perf_counter() - start
+        us = elapsed / ops * 1e6
+        results.append((n, us))
+        print(f"{n:>10} {ops:>8} {us:>10.2f}")
+    return results
+
+
+def bench_persist(modes, ops, n_vehicles, n_spots, seed):
+    rng = random.Random(seed)
+    print(f"{'synchronous':>12} {'ops':>8} {'ops/s':>10} {'us/op':>10}")
+    results = []
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            svc = _build_service(
+                n_vehicles, n_spots,
+                db_path=os.path.join(tmp, "bench.db"), archive_dir=os.path.join(tmp, "archivo"), synchronous=mode,
+            )
+            plates = [f"V{rng.randint(1, n_vehicles):07d}" for _ in range(ops)]
+            spots = [rng.randint(1, n_spots) for _ in range(ops)]
+            start = time.perf_counter()
+            for i in range(ops):
+                _gate_cycle(svc, plates[i], spots[i])
+            elapsed = time.perf_counter() - start
+            svc.close()
+        # cada ciclo son dos operaciones confirmadas: entrada y salida
+        rate = 2 * ops / elapsed
+        results.append((mode, rate))
+        print(f"{mode:>12} {2 * ops:>8} {rate:>10.0f} {1e6 / rate:>10.1f}")
+    return results
+
+
+def _concurrency_worker(svc, plates, spot_ids, keep):
+    # entradas con puesto elegido (o automático si es None); salida del más viejo
+    ok = rejected = 0
+    mine = []
+    for placa, spot_id in zip(plates, spot_ids):
+        try:
+            t = svc.checkin(placa, spot_id=spot_id)
+        except ValueError:
+            rejected += 1
+            continue
+        ok += 1
+        mine.append(t["id"])
+        if len(mine) > keep:
+            svc.checkout(mine.pop(0))
+    return ok, rejected
+
+
+def check_no_double_booking(svc):
+    by_spot, by_vehicle = {}, {}
+    for t in svc.active_tickets:
+        assert t["spot_id"] not in by_spot, f"puesto {t['spot_id']} con dos tickets activos"
+        assert t["vehicle_id"] not in by_vehicle, f"vehículo {t['vehicle_id']} con dos tickets activos"
+        by_spot[t["spot_id"]] = t["id"]
+        by_vehicle[t["vehicle_id"]] = t["id"]
+    for s in svc.spots:
+        assert s["ocupado"] == (s["id"] in by_spot), f"puesto {s['id']} con estado inconsistente"
+    assert svc.free_spot_count() + len(by_spot) == len(svc.spots), "conteo de libres inconsistente"
+
+
+def bench_concurrency(thread_counts, checkins, n_vehicles, n_spots, keep, seed):
+    rng = random.Random(seed)
+    plates = [f"V{rng.randint(1, n_vehicles):07d}" for _ in range(checkins)]
+    # un tercio con asignación automática, el resto compite por puestos concretos
+    spot_ids = [None if rng.random() < 1 / 3 else rng.randint(1, n_spots) for _ in range(checkins)]
+    print(f"{'hilos':>6} {'entradas':>9} {'rechazos':>9} {'ops/s':>10}")
+    results = []
+    for n in thread_counts:
+        svc = _build_service(n_vehicles, n_spots)
+        chunks = [(plates[i::n], spot_ids[i::n]) for i in range(n)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            outcomes = list(pool.map(lambda c: _concurrency_worker(svc, c[0], c[1], keep), chunks))
+        elapsed = time.perf_counter() - start
+        check_no_double_booking(svc)
+        ok = sum(o for o, _ in outcomes)
+        rejected = sum(r for _, r in outcomes)
+        assert ok + rejected == checkins
+        ops_s = checkins / elapsed
+        results.append((n, ops_s))
+        print(f"{n:>6} {ok:>9} {rejected:>9} {ops_s:>10.0f}")
+    return results
+
+
+def bench_billing(n, rates, baseline, seed):
+    # estadías de 0 a 3 días con precisión de microsegundos
+    rng = random.Random(seed)
+    start_us = 1_700_000_000 * 1_000_000
+    np = numpy_or_none()
+    if np is not None:
+        gen = np.random.default_rng(seed)
+        ins = start_us + gen.integers(0, 365 * 86_400_000_000, n, dtype=np.int64)
+        outs = ins + gen.integers(0, 3 * 86_400_000_000, n, dtype=np.int64)
+    else:
+        ins = [start_us + rng.randrange(365 * 86_400_000_000) for _ in range(n)]
+        outs = [i + rng.randrange(3 * 86_400_000_000) for i in ins]
+
+    t0 = time.perf_counter()
+    results = compare_tariffs(ins, outs, rates, baseline)
+    elapsed = time.perf_counter() - t0
+
+    # verificación contra la regla por ticket en una muestra
+    hours = billed_hours(ins, outs)
+    epoch = datetime(1970, 1, 1)
+    for k in rng.sample(range(n), min(n, 1000)):
+        ci = epoch + timedelta(microseconds=int(ins[k]))
+        co = epoch + timedelta(microseconds=int(outs[k]))
+        assert compute_amount(ci, co, baseline)[0] == hours[k] * float(baseline)
+
+    print(f"{n} tickets, {len(rates)} tarifas en {elapsed:.2f}s ({'numpy' if np is not None else 'python'})")
+    print(f"{'tarifa':>8} {'recaudo':>16} {'delta':>16}")
+    for r in results:
+        print(f"{r['rate']:>8.2f} {r['revenue']:>16.2f} {r['delta']:>+16.2f}")
+    return results
+
+
+def parse_dwell(spec):
+    """Distribución de estadía en minutos: exp:MEDIA, lognormal:MEDIANA:SIGMA,
+    uniform:MIN:MAX o fixed:MINUTOS."""
+    kind, *params = spec.split(":")
+    try:
+        p = [float(x) for x in params]
+    except ValueError:
+        p = []
+    # medias, medianas y cotas en minutos deben ser positivas y finitas
+    if p and all(math.isfinite(x) for x in p):
+        if kind == "exp" and len(p) == 1 and p[0] > 0:
+            mean, = p
+            return lambda rng: rng.expovariate(1 / mean)
+        if kind == "lognormal" and len(p) == 2 and p[0] > 0 and p[1] >= 0:
+            median, sigma = p
+            return lambda rng: rng.lognormvariate(math.log(median), sigma)
+        if kind == "uniform" and len(p) == 2 and 0 < p[0] <= p[1]:
+            lo, hi = p
+            return lambda rng: rng.uniform(lo, hi)
+        if kind == "fixed" and len(p) == 1 and p[0] > 0:
+            minutes, = p
+            return lambda rng: minutes
+    raise argparse.ArgumentTypeError(f"distribución de estadía inválida: {spec}")
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples = {}  # operación -> [segundos]
+
+    def time(self, op, func, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.samples.setdefault(op, []).append(time.perf_counter() - t0)
+
+    def summary(self):
+        out = {}
+        for op, xs in sorted(self.samples.items()):
+            xs = sorted(xs)
+            n = len(xs)
+            out[op] = {
+                "count": n,
+                "p50_us": xs[int(0.50 * (n - 1))] * 1e6,
+                "p95_us": xs[int(0.95 * (n - 1))] * 1e6,
+                "p99_us": xs[int(0.99 * (n - 1))] * 1e6,
+                "max_us": xs[-1] * 1e6,
+            }
+        return out
+
+
+def _arrivals(rng, rate, minutes):
+    # proceso de Poisson: separación exponencial con media 1/rate minutos
+    t = rng.expovariate(rate)
+    while t < minutes:
+        yield t
+        t += rng.expovariate(rate)
+
+
+def _simulate(svc, rec, seed, rate, minutes, dwell, fleet, new_ratio):
+    # eventos (minuto simulado, secuencia, tipo, datos) en orden de tiempo; el reloj
+    # manual del servicio se pone en la hora de cada evento
+    rng = random.Random(seed)
+    owner = svc.session["user"]["id"]
+    clock = svc.clock
+    start = clock.now()
+    events = [(t, i, "in", None) for i, t in enumerate(_arrivals(rng, rate, minutes))]
+    heapq.heapify(events)
+    seq = len(events)
+    parked = set()
+    new_plates = rejected = 0
+    revenue = 0.0
+    while events:
+        t, _, kind, data = heapq.heappop(events)
+        clock.set(start + timedelta(minutes=t))
+        if kind == "in":
+            rec.time("available_spots", svc.available_spots)
+            if rng.random() < new_ratio:
+                new_plates += 1
+                placa = f"N{new_plates:07d}"
+                rec.time("_create_vehicle", svc._create_vehicle, placa, owner)
+            else:
+                placa = f"V{rng.randint(1, fleet):07d}"
+                if placa in parked:
+                    continue
+            try:
+                ticket = rec.time("checkin", svc.checkin, placa)
+            except ValueError:  # lleno
+                rejected += 1
+                continue
+            parked.add(placa)
+            seq += 1
+            heapq.heappush(events, (t + dwell(rng), seq, "out", (ticket, placa)))
+        else:
+            ticket, placa = data
+            rec.time("_compute_amount", svc._compute_amount, ticket["checkin"], clock.now())
+            closed = rec.time("checkout", svc.checkout, ticket["id"])
+            revenue += closed["total"]
+            parked.discard(placa)
+    return rejected, revenue
+
+
+def _simulation_service(fleet, n_spots, rules):
+    # hora de inicio fija: resultados repetibles y el día simulado cruza la franja nocturna
+    svc = _build_service(fleet, n_spots, clock=ManualClock(SIM_START))
+    if rules:
+        svc.set_tariff(rules)
+    return svc
+
+
+def bench_simulate(rate, minutes, dwell_spec, n_spots, fleet, new_ratio, seed, memory=True, rules=None):
+    dwell = parse_dwell(dwell_spec)
+    svc = _simulation_service(fleet, n_spots, rules)
+    tariff = svc.tariff.rules
+    rec = LatencyRecorder()
+    start = time.perf_counter()
+    rejected, revenue = _simulate(svc, rec, seed, rate, minutes, dwell, fleet, new_ratio)
+    wall = time.perf_counter() - start
+    ops = rec.summary()
+    total_ops = sum(o["count"] for o in ops.values())
+
+    peak = None
+    if memory:
+        # segunda corrida idéntica con tracemalloc (encarece la latencia, por eso va aparte)
+        tracemalloc.start()
+        svc = _simulation_service(fleet, n_spots, rules)
+        _simulate(svc, LatencyRecorder(), seed, rate, minutes, dwell, fleet, new_ratio)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    result = {
+        "params": {
+            "rate_per_min": rate, "minutes": minutes, "dwell": dwell_spec, "spots": n_spots,
+            "fleet": fleet, "new_ratio": new_ratio, "seed": seed, "tariff": tariff,
+        },
+        "wall_s": wall,
+        "ops_per_s": total_ops / wall if wall else 0.0,
+        "rejected": rejected,
+        "revenue": revenue,
+        "peak_memory_bytes": peak,
+        "ops": ops,
+    }
+    print(f"{total_ops} operaciones en {wall:.2f}s ({result['ops_per_s']:.0f} ops/s), {rejected} rechazos por lleno")
+    print(f"recaudo simulado: {revenue:.2f}")
+    if peak is not None:
+        print(f"pico de memoria (tracemalloc): {peak / 2**20:.1f} MiB")
+    print(f"{'operacion':>16} {'n':>8} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'max us':>9}")
+    for op, o in ops.items():
+        print(f"{op:>16} {o['count']:>8} {o['p50_us']:>9.1f} {o['p95_us']:>9.1f} {o['p99_us']:>9.1f} {o['max_us']:>9.1f}")
+    return result
+
+
+def compare_runs(base, current, fail_over=None):
+    # cambio porcentual por percentil; devuelve las regresiones sobre el umbral
+    print(f"{'operacion':>16} {'p50':>9} {'p95':>9} {'p99':>9}")
+    regressions = []
+    for op, cur in current["ops"].items():
+        old = base["ops"].get(op)
+        if old is None:
+            continue
+        deltas = [(cur[k] - old[k]) / old[k] * 100 if old[k] else 0.0 for k in ("p50_us", "p95_us", "p99_us")]
+        print(f"{op:>16} " + " ".join(f"{d:>+8.1f}%" for d in deltas))
+        if fail_over is not None and max(deltas) > fail_over:
+            regressions.append(op)
+    if base.get("ops_per_s"):
+        print(f"throughput: {(current['ops_per_s'] - base['ops_per_s']) / base['ops_per_s'] * 100:+.1f}%")
+    return regressions
+
+
+STARTUP_SCRIPT = """
+import os, sys, tempfile, time
+t0 = time.perf_counter()
+from parqueadero_service import ParkingService
+t1 = time.perf_counter()
+ParkingService()
+t2 = time.perf_counter()
+with tempfile.TemporaryDirectory() as tmp:
+    db, ar = os.path.join(tmp, "p.db"), os.path.join(tmp, "archivo")
+    ParkingService(db, ar).close()
+    t3 = time.perf_counter()
+    ParkingService(db, ar).close()
+    t4 = time.perf_counter()
+print((t1 - t0) * 1e3, (t2 - t1) * 1e3, (t3 - t2) * 1e3, (t4 - t3) * 1e3, "tkinter" in sys.modules)
+"""
+
+
+def bench_startup(runs):
+    # cada corrida en un intérprete nuevo para medir la importación en frío
+    here = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=here, capture_output=True, text=True, check=True)
+        *times, tk_loaded = out.stdout.split()
+        rows.append([float(x) for x in times])
+    best = [min(col) for col in zip(*rows)]
+    print(f"importar parqueadero_service: {best[0]:7.2f} ms")
+    print(f"ParkingService() en memoria: {best[1]:7.2f} ms")
+    print(f"ParkingService(db) primera vez: {best[2]:7.2f} ms")
+    print(f"ParkingService(db) al reabrir: {best[3]:7.2f} ms")
+    print(f"tkinter importado: {tk_loaded}")
+    return best
+
+
+def _synthetic_closed(n, seed):
+    # tickets cerrados como los arma ParkingService.checkout, en orden de salida
+    rng = random.Random(seed)
+    t = datetime(2025, 1, 1)
+    for i in range(1, n + 1):
+        t += timedelta(microseconds=rng.randrange(1, 60_000_000))
+        checkin = t - timedelta(microseconds=rng.randrange(60_000_000, 3 * 86_400_000_000))
+        yield {
+            "id": i,
+            "vehicle_id": rng.randrange(1, 50_000),
+            "spot_id": rng.randrange(1, 500),
+            "checkin": checkin,
+            "checkout": t,
+            "user_in": rng.randrange(1, 20),
+            "user_out": rng.randrange(1, 20),
+            "total": float(rng.randrange(1, 48) * 5),
+        }
+
+
+def bench_memory(n, seed):
+    layouts = [
+        ("dict", lambda rows: list(rows)),
+        ("__slots__", lambda rows: [ClosedTicket.from_dict(t) for t in rows]),
+        ("columnas", ClosedTicketTable),
+    ]
+    results = {}
+    print(f"{n} tickets cerrados")
+    print(f"{'formato':>10} {'MiB':>10} {'bytes/ticket':>14} {'recorrer (s)':>14}")
+    for name, build in layouts:
+        tracemalloc.start()
+        store = build(_synthetic_closed(n, seed))
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        t0 = time.perf_counter()
+        total = sum(t["total"] for t in store)
+        scan = time.perf_counter() - t0
+        results[name] = {"bytes": used, "bytes_per_ticket": used / n, "scan_s": scan, "total": total}
+        print(f"{name:>10} {used / 2**20:>10.1f} {used / n:>14.1f} {scan:>14.2f}")
+        del store
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del parqueadero")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    gate = sub.add_parser("gate", help="entrada+salida vs. tamaño de flota")
+    gate.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000, 1_000_000])
+    gate.add_argument("--ops", type=int, default=20_000)
+    gate.add_argument("--spots", type=int, default=500)
+    gate.add_argument("--seed", type=int, default=7)
+
+    persist = sub.add_parser("persist", help="entradas/salidas por segundo confirmadas en SQLite")
+    persist.add_argument("--sync", nargs="+", default=["FULL", "NORMAL"], choices=["OFF", "NORMAL", "FULL"])
+    persist.add_argument("--ops", type=int, default=5_000)
+    persist.add_argument("--vehicles", type=int, default=10_000)
+    persist.add_argument("--spots", type=int, default=500)
+    persist.add_argument("--seed", type=int, default=7)
+
+    conc = sub.add_parser("concurrency", help="entradas concurrentes sin doble reserva, ops/s por hilos")
+    conc.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    conc.add_argument("--checkins", type=int, default=10_000)
+    conc.add_argument("--vehicles", type=int, default=3_000)
+    conc.add_argument("--spots", type=int, default=500)
+    conc.add_argument("--keep", type=int, default=20, help="tickets abiertos por hilo antes de dar salida")
+    conc.add_argument("--seed", type=int, default=7)
+
+    sim = sub.add_parser("simulate", help="tráfico sintético con llegadas Poisson, latencia por operación")
+    sim.add_argument("--rate", type=float, default=3.0, help="llegadas por minuto")
+    sim.add_argument("--minutes", type=float, default=1440.0, help="minutos simulados")
+    sim.add_argument("--dwell", default="lognormal:90:0.8", help="exp:MEDIA | lognormal:MEDIANA:SIGMA | uniform:MIN:MAX | fixed:M")
+    sim.add_argument("--spots", type=int, default=500)
+    sim.add_argument("--fleet", type=int, default=20_000)
+    sim.add_argument("--new-ratio", type=float, default=0.05, help="fracción de llegadas con placa nueva")
+    sim.add_argument("--seed", type=int, default=7)
+    sim.add_argument("--tariff", default=None, help="JSON con las reglas de tarifa (ver parqueadero_tariff)")
+    sim.add_argument("--no-memory", action="store_true", help="omitir la corrida con tracemalloc")
+    sim.add_argument("--json", default=None, help="guardar el resultado en este archivo")
+    sim.add_argument("--compare", default=None, help="JSON de una corrida anterior")
+    sim.add_argument("--fail-over", type=float, default=None, help="salir con error si algún percentil empeora más de este %%")
+
+    billing = sub.add_parser("billing", help="re-facturación por lotes con varias tarifas")
+    billing.add_argument("--tickets", type=int, default=10_000_000)
+    billing.add_argument("--rates", type=float, nargs="+", default=[4.0, 5.0, 6.0, 7.5])
+    billing.add_argument("--baseline", type=float, default=5.0)
+    billing.add_argument("--seed", type=int, default=7)
+
+    startup = sub.add_parser("startup", help="tiempo de importar y construir ParkingService")
+    startup.add_argument("--runs", type=int, default=5)
+
+    memory = sub.add_parser("memory", help="memoria de los tickets cerrados: dict vs. __slots__ vs. columnas")
+    memory.add_argument("--tickets", type=int, default=1_000_000)
+    memory.add_argument("--seed", type=int, default=7)
+
+    args = parser.parse_args(argv)
+    if args.cmd == "gate":
+        bench_gate(args.sizes, args.ops, args.spots, args.seed)
+    elif args.cmd == "persist":
+        bench_persist(args.sync, args.ops, args.vehicles, args.spots, args.seed)
+    elif args.cmd == "concurrency":
+        bench_concurrency(args.threads, args.checkins, args.vehicles, args.spots, args.keep, args.seed)
+    elif args.cmd == "simulate":
+        try:
+            parse_dwell(args.dwell)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        rules = None
+        if args.tariff:
+            with open(args.tariff, encoding="utf-8") as fh:
+                rules = json.load(fh)
+        try:
+            result = bench_simulate(
+                args.rate, args.minutes, args.dwell, args.spots, args.fleet, args.new_ratio, args.seed,
+                not args.no_memory, rules,
+            )
+        except ValueError as e:  # reglas de tarifa inválidas
+            parser.error(str(e))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as fh:
+                json.dump(result, fh, indent=2)
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as fh:
+                regressions = compare_runs(json.load(fh), result, args.fail_over)
+            if regressions:
+                print("regresiones: " + ", ".join(regressions))
+                return 1
+    elif args.cmd == "billing":
+        bench_billing(args.tickets, args.rates, args.baseline, args.seed)
+    elif args.cmd == "startup":
+        bench_startup(args.runs)
+    elif args.cmd == "memory":
+        bench_memory(args.tickets, args.seed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Importación y exportación masiva del parqueadero
+------------------------------------------------
+Carga usuarios y vehículos desde CSV o JSONL (una fila a la vez, sin leer el
+archivo completo) para dar de alta flotas corporativas, y exporta las mismas
+entidades en streaming.
+
+Cada fila se valida contra los índices del almacén (username y placa) y contra
+lo ya visto en el mismo archivo; las válidas se confirman en lotes de
+BATCH_SIZE filas por transacción. Con dry_run solo se valida y se reporta.
+
+    python parqueadero_bulk.py import vehicles flota.csv --dry-run --errors errores.csv
+    python parqueadero_bulk.py import users usuarios.jsonl --db parqueadero.db
+    python parqueadero_bulk.py export vehicles vehiculos.jsonl
+
+Columnas:
+    usuarios:  username, password, nombre
+    vehículos: placa, propietario (username) o user_id, marca, modelo, color, tipo
+
+La contraseña solo se lee al importar: la exportación de usuarios no la
+incluye, así que para re-importar ese archivo hay que agregar la columna.
+
+No depende de Tkinter.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from parqueadero_service import DB_PATH, ParkingService
+from parqueadero_store import plate_key, username_key
+
+BATCH_SIZE = 1000
+USER_FIELDS = ("id", "username", "nombre")  # sin password: solo se importa
+VEHICLE_FIELDS = ("id", "placa", "propietario", "user_id", "marca", "modelo", "color", "tipo")
+
+
+def detect_format(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def read_rows(fh, fmt):
+    # (línea, fila, error) de a una; una línea JSON inválida no detiene la carga
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_no, line in enumerate(fh, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Se esperaba un objeto JSON."
+            continue
+        yield line_no, row, None
+
+
+def _text(row, key):
+    value = row.get(key)
+    return "" if value is None else str(value).strip()
+
+
+class ImportReport:
+    def __init__(self, entity, dry_run):
+        self.entity = entity
+        self.dry_run = dry_run
+        self.rows = 0
+        self.valid = 0  # filas que pasan la validación
+        self.created = 0  # filas realmente creadas (0 en dry_run)
+        self.errors = []  # (línea, mensaje)
+        self.seconds = 0.0
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+    def summary(self):
+        head = "Simulación" if self.dry_run else "Importación"
+        done = f"{self.valid} válidos" if self.dry_run else f"{self.created} creados"
+        return f"{head} de {self.entity}: {self.rows} filas, {done}, {len(self.errors)} con error ({self.seconds:.2f} s)"
+
+    def write_errors(self, fh):
+        w = csv.writer(fh)
+        w.writerow(("linea", "error"))
+        w.writerows(self.errors)
+
+
+def _import(svc, fh, fmt, dry_run, batch_size, entity, validate, create):
+    report = ImportReport(entity, dry_run)
+    start = time.perf_counter()
+    seen = set()
+    pending = []
+
+    def flush():
+        with svc.transaction():
+            for args in pending:
+                create(*args)
+        report.created += len(pending)
+        pending.clear()
+
+    for line, row, problem in read_rows(fh, fmt):
+        report.rows += 1
+        if problem is None:
+            try:
+                key, args = validate(row)
+            except ValueError as e:
+                problem = str(e)
+            else:
+                if key in seen:
+                    problem = "Duplicado dentro del archivo."
+        if problem is not None:
+            report.error(line, problem)
+            continue
+        seen.add(key)
+        report.valid += 1
+        if not dry_run:
+            pending.append(args)
+            if len(pending) >= batch_size:
+                flush()
+    if pending:
+        flush()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def import_users(svc, fh, fmt="csv", dry_run=False, batch_size=BATCH_SIZE):
+    def validate(row):
+        username = _text(row, "username")
+        password = _text(row, "password")
+        if not username or not password:
+            raise ValueError("Usuario y contraseña obligatorios.")
+        if svc._find_user_by_username(username):
+            raise ValueError(f"El usuario {username} ya existe.")
+        return username_key(username), (username, password, _text(row, "nombre") or username)
+
+    return _import(svc, fh, fmt, dry_run, batch_size, "usuarios", validate, svc._create_user)
+
+
+def import_vehicles(svc, fh, fmt="csv", dry_run=False, batch_size=BATCH_SIZE):
+    def validate(row):
+        placa = plate_key(_text(row, "placa"))
+        if not placa:
+            raise ValueError("Placa obligatoria.")
+        if svc._find_vehicle_by_plate(placa):
+            raise ValueError(f"La placa {placa} ya existe.")
+        owner_name = _text(row, "propietario")
+        if owner_name:
+            owner = svc._find_user_by_username(owner_name)
+        else:
+            try:
+                owner = svc.get_user_by_id(int(_text(row, "user_id")))
+            except ValueError:
+                raise ValueError("Propietario obligatorio (propietario o user_id).") from None
+        if owner is None:
+            raise ValueError("El propietario no existe.")
+        tipo = svc._vehicle_type(_text(row, "tipo"))  # vacío: auto
+        args = (placa, owner["id"], _text(row, "marca"), _text(row, "modelo"), _text(row, "color"), tipo)
+        return placa, args
+
+    return _import(svc, fh, fmt, dry_run, batch_size, "vehículos", validate, svc._create_vehicle)
+
+
+# ======================= Exportación =======================
+def _write(fh, fmt, fields, rows):
+    n = 0
+    if fmt == "csv":
+        w = csv.DictWriter(fh, fieldnames=fields)
+        w.writeheader()
+        for row in rows:
+            w.writerow(row)
+            n += 1
+    else:
+        for row in rows:
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def export_users(svc, fh, fmt="csv"):
+    rows = ({k: u[k] for k in USER_FIELDS} for u in svc.users)
+    return _write(fh, fmt, USER_FIELDS, rows)
+
+
+def export_vehicles(svc, fh, fmt="csv"):
+    def rows():
+        for v in svc.vehicles:
+            owner = svc.get_user_by_id(v["user_id"])
+            yield {
+                "id": v["id"],
+                "placa": v["placa"],
+                "propietario": owner["username"] if owner else "",
+                "user_id": v["user_id"],
+                "marca": v["marca"],
+                "modelo": v["modelo"],
+                "color": v["color"],
+                "tipo": v["tipo"],
+            }
+
+    return _write(fh, fmt, VEHICLE_FIELDS, rows())
+
+
+IMPORTERS = {"users": import_users, "vehicles": import_vehicles}
+EXPORTERS = {"users": export_users, "vehicles": export_vehicles}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importación/exportación masiva del parqueadero")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("import", "export"):
+        p = sub.add_parser(name)
+        p.add_argument("entity", choices=["users", "vehicles"])
+        p.add_argument("path")
+        p.add_argument("--db", default=DB_PATH)
+        p.add_argument("--format", choices=["csv", "jsonl"], default=None, help="por defecto según la extensión")
+    imp = sub.choices["import"]
+    imp.add_argument("--dry-run", action="store_true", help="solo validar, no crear nada")
+    imp.add_argument("--errors", default=None, help="CSV con el reporte de errores por fila")
+    imp.add_argument("--batch", type=int, default=BATCH_SIZE)
+
+    args = parser.parse_args(argv)
+    fmt = args.format or detect_format(args.path)
+    if not os.path.exists(args.db):
+        parser.error(f"no existe la base {args.db}")
+    # exportar y simular solo leen; una importación real no siembra datos de ejemplo
+    try:
+        svc = ParkingService(args.db, seed=False, read_only=args.cmd == "export" or args.dry_run)
+    except sqlite3.Error as e:
+        parser.error(f"no se pudo abrir {args.db}: {e}")
+    try:
+        if args.cmd == "export":
+            with open(args.path, "w", newline="", encoding="utf-8") as fh:
+                n = EXPORTERS[args.entity](svc, fh, fmt)
+            print(f"{n} filas exportadas a {args.path}")
+            return 0
+        with open(args.path, newline="", encoding="utf-8") as fh:
+            report = IMPORTERS[args.entity](svc, fh, fmt, args.dry_run, args.batch)
+        print(report.summary())
+        if args.errors:
+            with open(args.errors, "w", newline="", encoding="utf-8") as fh:
+                report.write_errors(fh)
+        else:
+            for line, message in report.errors[:20]:
+                print(f"  línea {line}: {message}")
+        return 1 if report.errors else 0
+    finally:
+        svc.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Relojes del parqueadero
+-----------------------
+ParkingService y la ventana piden la hora a un reloj en vez de llamar a
+datetime.now(), así que se pueden reproducir días registrados o probar la
+facturación con horas fijas.
+
+    svc = ParkingService()                          # SystemClock
+    clock = ManualClock(datetime(2026, 10, 16, 7))  # pruebas y replay
+    svc = ParkingService(clock=clock)
+    clock.advance(minutes=90)
+
+No depende de Tkinter.
+"""
+
+from datetime import date, datetime, timedelta
+
+
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+    def today(self):
+        return date.today()
+
+
+class ManualClock:
+    """Reloj que solo avanza cuando se le indica."""
+
+    def __init__(self, start):
+        self._now = start
+
+    def now(self):
+        return self._now
+
+    def today(self):
+        return self._now.date()
+
+    def set(self, when):
+        self._now = when
+
+    def advance(self, delta=None, **kwargs):
+        # advance(timedelta(...)) o advance(minutes=90)
+        self._now += delta if delta is not None else timedelta(**kwargs)
@@ -0,0 +1,382 @@
+"""
+Persistencia del parqueadero en SQLite
+--------------------------------------
+Repositorio con modo WAL, consultas parametrizadas (sqlite3 cachea las
+sentencias preparadas) y transacciones agrupadas. Al arrancar se cargan solo
+usuarios, vehículos, zonas, puestos y tickets activos; los tickets cerrados
+se leen por páginas cuando se necesitan.
+
+No depende de Tkinter.
+"""
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    password TEXT NOT NULL,
+    nombre TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vehicles (
+    id INTEGER PRIMARY KEY,
+    placa TEXT NOT NULL UNIQUE,
+    user_id INTEGER NOT NULL,
+    marca TEXT NOT NULL DEFAULT '',
+    modelo TEXT NOT NULL DEFAULT '',
+    color TEXT NOT NULL DEFAULT '',
+    tipo TEXT NOT NULL DEFAULT 'auto'
+);
+CREATE TABLE IF NOT EXISTS zones (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    nivel TEXT NOT NULL DEFAULT '',
+    prefijo TEXT NOT NULL DEFAULT '',
+    tipos TEXT NOT NULL DEFAULT 'auto,moto,electrico',
+    reservada INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS spots (
+    id INTEGER PRIMARY KEY,
+    codigo TEXT NOT NULL,
+    zone_id INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    vehicle_id INTEGER NOT NULL,
+    spot_id INTEGER NOT NULL,
+    checkin REAL NOT NULL,
+    checkout REAL,
+    user_in INTEGER,
+    user_out INTEGER,
+    total REAL
+);
+CREATE INDEX IF NOT EXISTS tickets_activos ON tickets(id) WHERE checkout IS NULL;
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    PRIMARY KEY (dim, key)
+);
+"""
+
+# columnas agregadas después de la primera versión: (tabla, columna, definición)
+MIGRATIONS = (
+    ("vehicles", "tipo", "TEXT NOT NULL DEFAULT 'auto'"),
+    ("spots", "zone_id", "INTEGER NOT NULL DEFAULT 1"),
+)
+
+MAX_ID = 2**63 - 1
+CLOSED_COLUMNS = "id, vehicle_id, spot_id, checkin, checkout, user_in, user_out, total"
+
+
+def _ts(dt):
+    return dt.timestamp()
+
+
+def _dt(ts):
+    return datetime.fromtimestamp(ts)
+
+
+def _closed_row(r):
+    return {
+        "id": r[0],
+        "vehicle_id": r[1],
+        "spot_id": r[2],
+        "checkin": _dt(r[3]),
+        "checkout": _dt(r[4]),
+        "user_in": r[5],
+        "user_out": r[6],
+        "total": r[7],
+    }
+
+
+class ParkingRepository:
+    def __init__(self, path, synchronous="FULL", read_only=False):
+        if read_only:
+            # herramientas de inspección (replay, re-facturación): sin esquema, migraciones
+            # ni PRAGMAs que escriban; SQLite rechaza cualquier escritura
+            uri = Path(path).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+        else:
+            # autocommit: las transacciones se abren explícitamente con transaction()
+            self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"PRAGMA synchronous={synchronous}")
+            self.conn.execute("PRAGMA foreign_keys=OFF")
+            self.conn.executescript(SCHEMA)
+            self._migrate()
+        self._depth = 0
+        self._lock = threading.RLock()  # un hilo a la vez por conexión
+        self._on_commit = []  # acciones fuera de SQLite que esperan el COMMIT externo
+
+    def close(self):
+        self.conn.close()
+
+    def _migrate(self):
+        # bases creadas antes de zonas y tipos de vehículo
+        for table, column, decl in MIGRATIONS:
+            have = {r[1] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+            if column not in have:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    @contextmanager
+    def transaction(self):
+        # anidable: la externa hace BEGIN/COMMIT y cada anidada es un SAVEPOINT, así un
+        # error adentro deshace solo lo suyo; otros hilos esperan
+        with self._lock:
+            depth = self._depth
+            savepoint = f"sp{depth}"
+            if depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+            else:
+                self.conn.execute(f"SAVEPOINT {savepoint}")
+            pending = len(self._on_commit)
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if depth == 0:
+                    self._on_commit.clear()
+                    self.conn.execute("ROLLBACK")
+                else:
+                    del self._on_commit[pending:]
+                    if self.conn.in_transaction:
+                        self.conn.execute(f"ROLLBACK TO {savepoint}")
+                        self.conn.execute(f"RELEASE {savepoint}")
+                raise
+            self._depth -= 1
+            if depth:
+                self.conn.execute(f"RELEASE {savepoint}")
+            else:
+                try:
+                    self.conn.execute("COMMIT")
+                except BaseException:
+                    self._on_commit.clear()
+                    if self.conn.in_transaction:
+                        self.conn.execute("ROLLBACK")
+                    raise
+                actions, self._on_commit = self._on_commit, []
+                for fn in actions:
+                    fn()
+
+    def on_commit(self, fn):
+        # fn corre cuando confirma la transacción externa (con ROLLBACK se descarta)
+        with self._lock:
+            if self._depth:
+                self._on_commit.append(fn)
+                return
+        fn()
+
+    # ===================== Carga inicial =====================
+    def is_empty(self):
+        return self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM users)").fetchone()[0] == 1
+
+    def load_users(self):
+        cur = self.conn.execute("SELECT id, username, password, nombre FROM users ORDER BY id")
+        return [{"id": r[0], "username": r[1], "password": r[2], "nombre": r[3]} for r in cur]
+
+    def load_vehicles(self):
+        cur = self.conn.execute("SELECT id, placa, user_id, marca, modelo, color, tipo FROM vehicles ORDER BY id")
+        return [
+            {"id": r[0], "placa": r[1], "user_id": r[2], "marca": r[3], "modelo": r[4], "color": r[5], "tipo": r[6]}
+            for r in cur
+        ]
+
+    def load_zones(self):
+        cur = self.conn.execute("SELECT id, nombre, nivel, prefijo, tipos, reservada FROM zones ORDER BY id")
+        return [
+            {"id": r[0], "nombre": r[1], "nivel": r[2], "prefijo": r[3], "tipos": tuple(r[4].split(",")), "reservada": bool(r[5])}
+            for r in cur
+        ]
+
+    def load_spots(self):
+        cur = self.conn.execute("SELECT id, codigo, zone_id FROM spots ORDER BY id")
+        return [{"id": r[0], "codigo": r[1], "zone_id": r[2], "ocupado": False} for r in cur]
+
+    def load_active_tickets(self):
+        cur = self.conn.execute(
+            "SELECT id, vehicle_id, spot_id, checkin, user_in FROM tickets WHERE checkout IS NULL ORDER BY id"
+        )
+        return [
+            {"id": r[0], "vehicle_id": r[1], "spot_id": r[2], "checkin": _dt(r[3]), "user_in": r[4]}
+            for r in cur
+        ]
+
+    def max_ids(self):
+        q = "SELECT COALESCE(MAX(id), 0) FROM "
+        return {t: self.conn.execute(q + t).fetchone()[0] for t in ("users", "vehicles", "zones", "spots", "tickets")}
+
+    def get_setting(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def tariff_rules(self, default_rate=5.0):
+        # reglas guardadas; bases anteriores al motor de tarifas solo tienen la tarifa plana
+        stored = self.get_setting("tariff")
+        if stored:
+            return json.loads(stored)
+        return {"rate": float(self.get_setting("rate_per_hour", default_rate))}
+
+    def vehicle_plates(self):
+        # id -> placa (sirve también en bases sin migrar)
+        return dict(self.conn.execute("SELECT id, placa FROM vehicles"))
+
+    def spot_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM spots").fetchone()[0]
+
+    def set_setting(self, key, value):
+        self.conn.execute(
+            "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    # ===================== Agregados =====================
+    def load_aggregates(self):
+        return self.conn.execute("SELECT dim, key, count, total FROM aggregates").fetchall()
+
+    def bump_aggregates(self, deltas):
+        self.conn.executemany(
+            "INSERT INTO aggregates (dim, key, count, total) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(dim, key) DO UPDATE SET count = count + excluded.count, total = total + excluded.total",
+            deltas,
+        )
+
+    def replace_aggregates(self, rows):
+        with self.transaction():
+            self.conn.execute("DELETE FROM aggregates")
+            self.conn.executemany("INSERT INTO aggregates (dim, key, count, total) VALUES (?, ?, ?, ?)", rows)
+
+    # ===================== Tickets cerrados (paginados) =====================
+    def closed_count(self, max_id=None):
+        if max_id is None:
+            max_id = MAX_ID
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tickets WHERE checkout IS NOT NULL AND id <= ?", (max_id,)
+        ).fetchone()[0]
+
+    def closed_page(self, after_id=0, limit=1000, max_id=None):
+        # paginación por clave: id > after_id, ordenado por id
+        if max_id is None:
+            max_id = MAX_ID
+        cur = self.conn.execute(
+            f"SELECT {CLOSED_COLUMNS} FROM tickets WHERE checkout IS NOT NULL AND id > ? AND id <= ? ORDER BY id LIMIT ?",
+            (after_id, max_id, limit),
+        )
+        return [_closed_row(r) for r in cur]
+
+    def longest_stay(self):
+        # segundos de la estadía cerrada más larga (0 sin historial)
+        row = self.conn.execute("SELECT MAX(checkout - checkin) FROM tickets WHERE checkout IS NOT NULL").fetchone()
+        return row[0] or 0.0
+
+    def closed_between(self, start, end):
+        # cerrados con salida en [start, end) (datetimes), en orden de salida
+        cur = self.conn.execute(
+            f"SELECT {CLOSED_COLUMNS} FROM tickets WHERE checkout >= ? AND checkout < ? ORDER BY checkout",
+            (_ts(start), _ts(end)),
+        )
+        return [_closed_row(r) for r in cur]
+
+    def iter_closed(self, page_size=1000, max_id=None):
+        after = 0
+        while True:
+            page = self.closed_page(after, page_size, max_id)
+            if not page:
+                return
+            yield from page
+            after = page[-1]["id"]
+
+    # ===================== Escrituras =====================
+    def insert_user(self, u):
+        self.conn.execute(
+            "INSERT INTO users (id, username, password, nombre) VALUES (?, ?, ?, ?)",
+            (u["id"], u["username"], u["password"], u["nombre"]),
+        )
+
+    def update_user(self, u):
+        self.conn.execute(
+            "UPDATE users SET username = ?, password = ?, nombre = ? WHERE id = ?",
+            (u["username"], u["password"], u["nombre"], u["id"]),
+        )
+
+    def delete_user(self, user_id):
+        self.conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+
+    def insert_vehicle(self, v):
+        self.conn.execute(
+            "INSERT INTO vehicles (id, placa, user_id, marca, modelo, color, tipo) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (v["id"], v["placa"], v["user_id"], v["marca"], v["modelo"], v["color"], v["tipo"]),
+        )
+
+    def update_vehicle(self, v):
+        self.conn.execute(
+            "UPDATE vehicles SET placa = ?, user_id = ?, marca = ?, modelo = ?, color = ?, tipo = ? WHERE id = ?",
+            (v["placa"], v["user_id"], v["marca"], v["modelo"], v["color"], v["tipo"], v["id"]),
+        )
+
+    def delete_vehicle(self, vehicle_id):
+        self.conn.execute("DELETE FROM vehicles WHERE id = ?", (vehicle_id,))
+
+    def save_zone(self, z):
+        self.conn.execute(
+            "INSERT INTO zones (id, nombre, nivel, prefijo, tipos, reservada) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET nombre = excluded.nombre, nivel = excluded.nivel, "
+            "prefijo = excluded.prefijo, tipos = excluded.tipos, reservada = excluded.reservada",
+            (z["id"], z["nombre"], z["nivel"], z["prefijo"], ",".join(z["tipos"]), int(z["reservada"])),
+        )
+
+    def delete_zone(self, zone_id):
+        self.conn.execute("DELETE FROM zones WHERE id = ?", (zone_id,))
+
+    def insert_spots(self, spots):
+        self.conn.executemany(
+            "INSERT INTO spots (id, codigo, zone_id) VALUES (?, ?, ?)", [(s["id"], s["codigo"], s["zone_id"]) for s in spots]
+        )
+
+    def delete_spots(self, spot_ids):
+        self.conn.executemany("DELETE FROM spots WHERE id = ?", [(i,) for i in spot_ids])
+
+    def open_ticket(self, t):
+        self.conn.execute(
+            "INSERT INTO tickets (id, vehicle_id, spot_id, checkin, user_in) VALUES (?, ?, ?, ?, ?)",
+            (t["id"], t["vehicle_id"], t["spot_id"], _ts(t["checkin"]), t["user_in"]),
+        )
+
+    def close_ticket(self, closed):
+        self.conn.execute(
+            "UPDATE tickets SET checkout = ?, user_out = ?, total = ? WHERE id = ?",
+            (_ts(closed["checkout"]), closed["user_out"], closed["total"], closed["id"]),
+        )
+
+
+class PagedClosedTickets:
+    """Historial de tickets cerrados: páginas desde SQLite + los de la sesión.
+
+    Los cerrados antes de arrancar (id <= max_id) se leen por páginas al
+    iterar; los cerrados durante la sesión viven en memoria.
+    """
+
+    def __init__(self, repo, session, max_id, page_size=1000):
+        self.repo = repo
+        self.session = session
+        self.max_id = max_id
+        self.page_size = page_size
+        self._persisted = repo.closed_count(max_id)
+
+    def __len__(self):
+        return self._persisted + len(self.session)
+
+    def __iter__(self):
+        yield from self.repo.iter_closed(self.page_size, self.max_id)
+        yield from self.session
@@ -0,0 +1,77 @@
+"""
+Eventos de dominio del parqueadero
+----------------------------------
+ParkingService publica un evento por cada cambio del modelo; las vistas se
+suscriben solo a los tipos que muestran. Los manejadores corren en el hilo
+que publica, así que deben ser baratos (marcar qué cambió y nada más).
+
+    bus.subscribe(TicketOpened, handler)
+    bus.publish(TicketOpened(ticket))
+
+No depende de Tkinter.
+"""
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+class DomainEvent:
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class UserChanged(DomainEvent):
+    __slots__ = ("user_id", "action")
+
+    def __init__(self, user_id, action):
+        self.user_id = user_id
+        self.action = action
+
+
+class VehicleChanged(DomainEvent):
+    __slots__ = ("vehicle_id", "action")
+
+    def __init__(self, vehicle_id, action):
+        self.vehicle_id = vehicle_id
+        self.action = action
+
+
+class TicketOpened(DomainEvent):
+    __slots__ = ("ticket",)
+
+    def __init__(self, ticket):
+        self.ticket = ticket
+
+
+class TicketClosed(DomainEvent):
+    __slots__ = ("ticket",)
+
+    def __init__(self, ticket):
+        self.ticket = ticket
+
+
+class ConfigChanged(DomainEvent):
+    __slots__ = ("key", "value")
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+
+
+class EventBus:
+    def __init__(self):
+        self._handlers = {}  # tipo de evento -> [manejadores]
+
+    def subscribe(self, event_type, handler):
+        self._handlers.setdefault(event_type, []).append(handler)
+        return lambda: self._handlers[event_type].remove(handler)
+
+    def publish(self, event):
+        # también recibe quien se suscribió a DomainEvent (todos los eventos)
+        for cls in type(event).__mro__:
+            for handler in tuple(self._handlers.get(cls, ())):
+                handler(event)
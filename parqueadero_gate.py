@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+API de porterías del parqueadero
+--------------------------------
+Servidor asyncio con JSON sobre HTTP/1.1 (keep-alive) para que varias
+porterías registren entradas y salidas contra un mismo ParkingService.
+
+    POST /checkin   {"placa": "ABC123", "user_id": 1, "spot_id": null, "operador": 1}
+    POST /checkin   {"placa": "MOT12A", "user_id": 1, "tipo": "moto", "zona": 2}
+    POST /checkout  {"ticket_id": 7, "operador": 1}
+    GET  /preview?ticket_id=7
+    GET  /spots/free    (libres y puestos, también por zona)
+    GET  /metrics       (formato de texto de Prometheus, ver parqueadero_metrics)
+
+Todas las modificaciones pasan por una única cola con un solo escritor, así
+la asignación de puestos y los IDs de ticket son consistentes. El escritor
+agrupa lo que haya en cola en una sola transacción (group commit) y responde
+recién cuando esa transacción confirmó. Cada solicitud corre en su propio
+SAVEPOINT: si falla, se deshace solo lo suyo y recibe su error (400 o 500);
+si falla el COMMIT, todo el lote recibe 500 y el servicio vuelve a leer su
+estado de la base.
+
+Incluye un cliente de carga local:
+
+    python parqueadero_gate.py serve --port 8080 --spots 500
+    python parqueadero_gate.py load --port 8080 --gates 50 --seconds 10
+    python parqueadero_gate.py load --spawn --gates 50      # servidor en el mismo proceso
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from parqueadero_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from parqueadero_service import ParkingService
+
+MAX_BATCH = 64
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_field(body, key):
+    # ids opcionales: ausente o null es None; si viene, debe ser un entero
+    value = body.get(key)
+    if value is None:
+        return None
+    if isinstance(value, (int, str)) and not isinstance(value, bool):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise HttpError(400, f"El campo {key} debe ser un entero.")
+
+
+def _text_field(body, key):
+    value = body.get(key)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise HttpError(400, f"El campo {key} debe ser texto.")
+    return value.strip()
+
+
+def _ticket_json(t):
+    out = {k: v for k, v in t.items() if k not in ("checkin", "checkout")}
+    out["checkin"] = t["checkin"].isoformat()
+    if "checkout" in t:
+        out["checkout"] = t["checkout"].isoformat()
+    return out
+
+
+class GateServer:
+    def __init__(self, service):
+        self.service = service
+        self.queue = None
+        self.requests = 0
+
+    # ===================== Escritor único =====================
+    async def _writer(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < MAX_BATCH and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            outcomes = []  # (futuro, resultado, error); se entregan después del COMMIT
+            try:
+                with self.service.transaction():
+                    for func, args, fut in batch:
+                        # cada solicitud en su SAVEPOINT: un error solo afecta a esa solicitud
+                        try:
+                            with self.service.transaction():
+                                result = func(*args)
+                        except (ValueError, TypeError, KeyError) as e:
+                            outcomes.append((fut, None, HttpError(400, str(e))))
+                        except Exception as e:
+                            outcomes.append((fut, None, HttpError(500, f"No se pudo guardar: {e}")))
+                        else:
+                            outcomes.append((fut, result, None))
+            except Exception as e:
+                # falló el COMMIT: nada del lote quedó guardado, la memoria vuelve a la base
+                self.service.reload()
+                outcomes = [(fut, None, HttpError(500, f"No se pudo guardar: {e}")) for _, _, fut in batch]
+            for fut, result, error in outcomes:
+                if fut.done():  # el cliente se desconectó
+                    continue
+                if error is not None:
+                    fut.set_exception(error)
+                else:
+                    fut.set_result(result)
+
+    async def _mutate(self, func, *args):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((func, args, fut))
+        return await fut
+
+    # ===================== Rutas =====================
+    async def handle(self, method, path, query, body):
+        svc = self.service
+        if path == "/checkin":
+            if method != "POST":
+                raise HttpError(405, "Use POST.")
+            placa = _text_field(body, "placa").upper()
+            if not placa:
+                raise HttpError(400, "La placa es obligatoria.")
+            user_id, spot_id = _int_field(body, "user_id"), _int_field(body, "spot_id")
+            operator_id, zone_id = _int_field(body, "operador"), _int_field(body, "zona")
+            marca, modelo, color = (_text_field(body, k) for k in ("marca", "modelo", "color"))
+            t = await self._mutate(
+                lambda: svc.checkin(
+                    placa,
+                    maybe_user_id=user_id,
+                    marca=marca,
+                    modelo=modelo,
+                    color=color,
+                    spot_id=spot_id,
+                    operator_id=operator_id,
+                    tipo=body.get("tipo"),
+                    zone_id=zone_id,
+                )
+            )
+            return dict(_ticket_json(t), puesto=svc.get_spot_by_id(t["spot_id"])["codigo"])
+        if path == "/checkout":
+            if method != "POST":
+                raise HttpError(405, "Use POST.")
+            ticket_id = _int_field(body, "ticket_id")
+            if ticket_id is None:
+                raise HttpError(400, "El ticket es obligatorio.")
+            operator_id = _int_field(body, "operador")
+            closed = await self._mutate(lambda: svc.checkout(ticket_id, operator_id=operator_id))
+            if closed is None:
+                raise HttpError(404, "No se encontró el ticket.")
+            return _ticket_json(closed)
+        if path == "/preview":
+            ticket_id = int(query.get("ticket_id", ["0"])[0])
+            preview = svc.preview_checkout(ticket_id)
+            if preview is None:
+                raise HttpError(404, "No se encontró el ticket.")
+            total, elapsed = preview
+            return {"ticket_id": ticket_id, "total": total, "minutos": int(elapsed.total_seconds() // 60)}
+        if path == "/spots/free":
+            zonas = [
+                {"id": z["id"], "nombre": z["nombre"], "libres": free, "puestos": size}
+                for z, size, free in svc.zone_occupancy()
+            ]
+            return {"libres": svc.free_spot_count(), "puestos": len(svc.spots), "zonas": zonas}
+        if path == "/metrics":
+            return svc.metrics.registry.render()
+        raise HttpError(404, "Ruta desconocida.")
+
+    # ===================== HTTP =====================
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                headers = {}
+                try:
+                    method, target, _ = line.decode("latin-1").split(" ", 2)
+                    while True:
+                        h = await reader.readline()
+                        if h in (b"\r\n", b"\n", b""):
+                            break
+                        k, _, v = h.decode("latin-1").partition(":")
+                        headers[k.strip().lower()] = v.strip()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    # solicitud malformada: no se sabe dónde empieza la siguiente
+                    await self._respond(writer, 400, {"error": "Solicitud HTTP inválida."})
+                    break
+                raw = await reader.readexactly(length) if length else b""
+                url = urlsplit(target)
+                try:
+                    body = json.loads(raw) if raw else {}
+                    if not isinstance(body, dict):
+                        raise HttpError(400, "El cuerpo debe ser un objeto JSON.")
+                    payload = await self.handle(method, url.path, parse_qs(url.query), body)
+                    status = 200
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (ValueError, TypeError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:  # p. ej. sqlite3.Error: se responde y la conexión sigue
+                    status, payload = 500, {"error": str(e)}
+                self.requests += 1
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload):
+        # texto plano solo para /metrics; el resto es JSON
+        if isinstance(payload, str):
+            data, ctype = payload.encode(), METRICS_CONTENT_TYPE
+        else:
+            data, ctype = json.dumps(payload).encode(), "application/json"
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {ctype}\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
+        return await asyncio.start_server(self.serve_client, host, port)
+
+
+# ======================= Cliente de carga =======================
+class GateClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: gate\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            h = await self.reader.readline()
+            if h in (b"\r\n", b""):
+                break
+            k, _, v = h.decode("latin-1").partition(":")
+            if k.strip().lower() == "content-length":
+                length = int(v)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+
+async def _gate_loop(gate, host, port, deadline, latencies, errors, rng):
+    client = await GateClient.connect(host, port)
+    plates = [f"G{gate:02d}X{i:03d}" for i in range(20)]
+
+    async def timed(method, path, body=None):
+        t0 = time.perf_counter()
+        status, payload = await client.request(method, path, body)
+        latencies.append(time.perf_counter() - t0)
+        if status != 200:
+            errors.append((path, status, payload.get("error")))
+        return status, payload
+
+    try:
+        while time.perf_counter() < deadline:
+            status, t = await timed("POST", "/checkin", {"placa": rng.choice(plates), "user_id": 1, "operador": 1})
+            if status != 200:
+                continue
+            await timed("GET", f"/preview?ticket_id={t['id']}")
+            await timed("GET", "/spots/free")
+            await timed("POST", "/checkout", {"ticket_id": t["id"], "operador": 1})
+    finally:
+        client.close()
+
+
+async def run_load(host, port, gates, seconds, seed):
+    rng = random.Random(seed)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(
+        _gate_loop(g, host, port, deadline, latencies, errors, random.Random(rng.random())) for g in range(gates)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    n = len(latencies)
+
+    def pct(p):
+        return latencies[min(n - 1, int(p * n))] * 1e3 if n else 0.0
+
+    print(f"porterías: {gates}  solicitudes: {n}  errores: {len(errors)}")
+    print(f"req/s: {n / elapsed:.0f}  p50: {pct(0.50):.2f} ms  p99: {pct(0.99):.2f} ms  max: {pct(1.0):.2f} ms")
+    return {"requests": n, "errors": len(errors), "rps": n / elapsed, "p50_ms": pct(0.50), "p99_ms": pct(0.99)}
+
+
+def build_service(args):
+    svc = ParkingService(args.db, args.archive)
+    if len(svc.spots) < args.spots:
+        svc._ensure_spots(args.spots)
+    return svc
+
+
+async def _serve(args):
+    gate = GateServer(build_service(args))
+    server = await gate.start(args.host, args.port)
+    print(f"Porterías escuchando en http://{args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+async def _load(args):
+    if args.spawn:
+        gate = GateServer(build_service(args))
+        server = await gate.start(args.host, 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await run_load(args.host, port, args.gates, args.seconds, args.seed)
+    return await run_load(args.host, args.port, args.gates, args.seconds, args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API de porterías del parqueadero")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("serve", "load"):
+        p = sub.add_parser(name)
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8080)
+        p.add_argument("--db", default=None, help="ruta SQLite (por defecto solo memoria)")
+        p.add_argument("--archive", default=None, help="carpeta del archivo de tickets")
+        p.add_argument("--spots", type=int, default=500)
+    load = sub.choices["load"]
+    load.add_argument("--gates", type=int, default=50)
+    load.add_argument("--seconds", type=float, default=10.0)
+    load.add_argument("--seed", type=int, default=7)
+    load.add_argument("--spawn", action="store_true", help="levantar el servidor en este mismo proceso")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "serve":
+        asyncio.run(_serve(args))
+    else:
+        asyncio.run(_load(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Métricas en vivo del parqueadero
+--------------------------------
+Registro de contadores, gauges e histogramas con etiquetas opcionales. Los
+valores se actualizan en el momento de cada operación (no se recalculan al
+leerlos), así que leer una métrica es O(1) y exportarlas no toca el modelo.
+
+El registro se exporta en el formato de texto de Prometheus: a un archivo
+(para el textfile collector de node_exporter) o por HTTP en un puerto local.
+
+    reg = MetricsRegistry()
+    entradas = reg.counter("parqueadero_checkins_total", "Entradas registradas.")
+    entradas.inc()
+    libres = reg.gauge("parqueadero_zone_spots_free", "Puestos libres por zona.", labels=("zona_id", "zona"))
+    libres.labels(1, "General").set(10)
+    write_textfile(reg, "/var/lib/node_exporter/parqueadero.prom")
+    server = serve(reg, 9108)  # GET http://127.0.0.1:9108/metrics
+
+ParkingMetrics agrupa las métricas que actualiza ParkingService.
+
+No depende de Tkinter.
+"""
+
+import math
+import os
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# límites superiores en segundos; el último bucket (+Inf) se agrega solo
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+STAY_BUCKETS = (15, 30, 60, 120, 240, 480, 720, 1440, 2880)  # minutos
+
+
+def _escape(text):
+    return str(text).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _label_text(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class _FunctionValue:
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def get(self):
+        return self.fn()
+
+
+class _CounterValue(_Value):
+    __slots__ = ()
+
+    def inc(self, amount=1.0):
+        if amount < 0:
+            raise ValueError("Un contador solo puede aumentar.")
+        with self._lock:
+            self.value += amount
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # por bucket, sin acumular; el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self):
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        out, acc = [], 0
+        for bound, c in zip(self.bounds + (math.inf,), counts):
+            acc += c
+            out.append((bound, acc))
+        return out, total, n
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children = {}  # valores de las etiquetas -> valor
+        self._lock = threading.Lock()
+        # sin etiquetas: un único valor al que delegan inc/set/observe
+        self._default = None if self.label_names else self.labels()
+
+    def _child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} espera las etiquetas {self.label_names}.")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def remove(self, *values):
+        with self._lock:
+            self._children.pop(tuple(str(v) for v in values), None)
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def items(self):
+        # [(valores de etiquetas, valor)] en orden de creación
+        with self._lock:
+            return list(self._children.items())
+
+    def get(self):
+        return self._default.get()
+
+    def samples(self):
+        # (nombre, [(etiqueta, valor)], número) para el exportador
+        for key, child in self.items():
+            yield self.name, list(zip(self.label_names, key)), child.get()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _child(self):
+        return _Value()
+
+    def inc(self, amount=1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, fn):
+        # el valor se calcula al leerlo (derivado de otras métricas, sin costo por evento)
+        with self._lock:
+            self._default = self._children[()] = _FunctionValue(fn)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def get(self):
+        # (cantidad, suma) de las observaciones
+        return self._default.count, self._default.sum
+
+    def samples(self):
+        for key, child in self.items():
+            pairs = list(zip(self.label_names, key))
+            buckets, total, n = child.cumulative()
+            for bound, acc in buckets:
+                yield self.name + "_bucket", pairs + [("le", _number(bound))], acc
+            yield self.name + "_sum", pairs, total
+            yield self.name + "_count", pairs, n
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}  # nombre -> métrica, en orden de registro
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def __iter__(self):
+        return iter(list(self._metrics.values()))
+
+    def render(self):
+        """Todas las métricas en el formato de texto de Prometheus."""
+        lines = []
+        for m in self:
+            lines.append(f"# HELP {m.name} {_help(m.help)}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, pairs, value in m.samples():
+                lines.append(f"{name}{_label_text(pairs)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ======================= Exportación =======================
+def write_textfile(registry, path):
+    # escritura atómica: el colector nunca lee un archivo a medias
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(registry.render())
+    os.replace(tmp, path)
+
+
+def serve(registry, port, host="127.0.0.1"):
+    """GET /metrics en un hilo de fondo; devuelve el servidor (server.shutdown() lo detiene)."""
+    # import aquí: http.server pesa en el arranque y solo hace falta con el puerto activado
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            data = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass  # sin una línea en stderr por cada scrape
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metricas", daemon=True).start()
+    return server
+
+
+# ======================= Métricas del parqueadero =======================
+class ParkingMetrics:
+    """Métricas que ParkingService actualiza en cada entrada, salida y cambio de puestos."""
+
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else MetricsRegistry()
+        r = self.registry
+        self.checkins = r.counter("parqueadero_checkins_total", "Entradas registradas.")
+        self.rejected = r.counter(
+            "parqueadero_checkins_rejected_total", "Entradas rechazadas (sin puesto, duplicadas o inválidas)."
+        )
+        self.checkouts = r.counter("parqueadero_checkouts_total", "Salidas registradas.")
+        self.revenue = r.counter("parqueadero_revenue_total", "Recaudo de las salidas registradas.")
+        self.active = r.gauge("parqueadero_active_tickets", "Vehículos dentro del parqueadero.")
+        self.spots = r.gauge("parqueadero_spots", "Puestos en total.")
+        self.free = r.gauge("parqueadero_spots_free", "Puestos libres en total.")
+        self.occupancy = r.gauge("parqueadero_occupancy_ratio", "Fracción de puestos ocupados.")
+        # por id de zona (dos zonas pueden llamarse igual); el nombre va como etiqueta informativa
+        self.zone_spots = r.gauge("parqueadero_zone_spots", "Puestos por zona.", labels=("zona_id", "zona"))
+        self.zone_free = r.gauge("parqueadero_zone_spots_free", "Puestos libres por zona.", labels=("zona_id", "zona"))
+        self.op_seconds = r.histogram(
+            "parqueadero_operation_seconds", "Duración de las operaciones del servicio.", labels=("op",)
+        )
+        self.free.set_function(self._free_total)
+        self.active.set_function(self._active)
+        self.occupancy.set_function(self._occupancy)
+        self._zone_free_by_id = {}  # zone_id -> libres de la zona (ver sync_spots)
+        self.checkin_seconds = self.op_seconds.labels("checkin")
+        self.checkout_seconds = self.op_seconds.labels("checkout")
+        self.stay_minutes = r.histogram(
+            "parqueadero_stay_minutes", "Duración de las estadías cerradas.", buckets=STAY_BUCKETS
+        )
+
+    def sync_spots(self, store):
+        # puestos y libres de todas las zonas desde el almacén (al arrancar y al cambiar la configuración)
+        self.zone_spots.clear()
+        self.zone_free.clear()
+        by_id = {}
+        for z in store.zones.values():
+            self.zone_spots.labels(z["id"], z["nombre"]).set(store.zone_size(z["id"]))
+            by_id[z["id"]] = self.zone_free.labels(z["id"], z["nombre"])
+            by_id[z["id"]].set(store.zone_free_count(z["id"]))
+        self.spots.set(len(store.spots))
+        self._zone_free_by_id = by_id
+
+    def spot_taken(self, zone_id):
+        # entrada o salida: un solo valor por evento; totales y ocupación se derivan al leer
+        self._zone_free_by_id[zone_id].dec(1)
+
+    def spot_released(self, zone_id):
+        self._zone_free_by_id[zone_id].inc(1)
+
+    def ticket_closed(self, total, minutes):
+        # salida confirmada: conteo, recaudo y duración de la estadía
+        self.checkouts.inc()
+        self.revenue.inc(total)
+        self.stay_minutes.observe(minutes)
+
+    def _free_total(self):
+        return sum(free.get() for _, free in self.zone_free.items())
+
+    def _active(self):
+        # cada ticket activo ocupa exactamente un puesto
+        return self.spots.get() - self.free.get()
+
+    def _occupancy(self):
+        total = self.spots.get()
+        return (total - self.free.get()) / total if total else 0.0
+
+    def zones(self):
+        # [(zona, libres, puestos)] en orden de zona, para la barra de estado
+        return [
+            (key[1], int(free.get()), int(self.zone_spots.labels(*key).get()))
+            for key, free in self.zone_free.items()
+        ]
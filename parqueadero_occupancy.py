@@ -0,0 +1,169 @@
+"""
+Ocupación del parqueadero en el tiempo
+--------------------------------------
+Barrido (sweep line) sobre los eventos de entrada (+1) y salida (-1) de los
+tickets para obtener:
+
+- la curva de ocupación muestreada al inicio de cada intervalo (bucket),
+  calculada con una suma acumulada sobre un arreglo de deltas;
+- el pico exacto de ocupación y cuándo ocurrió;
+- el tiempo total con el parqueadero lleno (ocupación >= capacidad).
+
+Los tiempos son epoch en segundos (float). Los tickets activos se pasan con
+salida = ahora. Todo se recorta a la ventana [start, end). Con NumPy las
+operaciones son vectorizadas; sin NumPy hay un camino en Python puro con el
+mismo resultado.
+
+No depende de Tkinter.
+"""
+
+import math
+from bisect import bisect_right
+from itertools import accumulate
+
+from parqueadero_archive import RECORD, RECORD_DTYPE
+from parqueadero_billing import numpy_or_none
+
+
+def archive_times(archive, start_day=None, end_day=None):
+    # (entradas, salidas) de las particiones con salida en [start_day, end_day], leídas en crudo
+    np = numpy_or_none()
+    days = archive.days_between(start_day, end_day)
+    if np is not None:
+        dtype = np.dtype(RECORD_DTYPE)
+        parts = [np.frombuffer(archive.raw(day), dtype=dtype) for day in days]
+        if not parts:
+            return np.empty(0), np.empty(0)
+        recs = np.concatenate(parts)
+        return recs["checkin"], recs["checkout"]
+    ins, outs = [], []
+    for day in days:
+        for r in RECORD.iter_unpack(archive.raw(day)):
+            ins.append(r[3])
+            outs.append(r[4])
+    return ins, outs
+
+
+def merge(*sources):
+    # une varias fuentes (entradas, salidas) en un solo par de arreglos
+    np = numpy_or_none()
+    if np is not None:
+        return (
+            np.concatenate([np.asarray(i, dtype=np.float64) for i, _ in sources]),
+            np.concatenate([np.asarray(o, dtype=np.float64) for _, o in sources]),
+        )
+    ins, outs = [], []
+    for i, o in sources:
+        ins.extend(i)
+        outs.extend(o)
+    return ins, outs
+
+
+def _clip(ins, outs, start, end):
+    # solo los tickets que se cruzan con la ventana, recortados a ella
+    np = numpy_or_none()
+    if np is not None:
+        ins = np.clip(np.asarray(ins, dtype=np.float64), start, end)
+        outs = np.clip(np.asarray(outs, dtype=np.float64), start, end)
+        keep = ins < outs
+        return ins[keep], outs[keep]
+    pairs = [(max(i, start), min(o, end)) for i, o in zip(ins, outs)]
+    pairs = [(i, o) for i, o in pairs if i < o]
+    return [i for i, _ in pairs], [o for _, o in pairs]
+
+
+def curve(ins, outs, start, end, bucket=60):
+    """Ocupación al inicio de cada intervalo de `bucket` segundos en [start, end).
+
+    Un ticket cuenta en la muestra t si entrada <= t < salida.
+    """
+    ins, outs = _clip(ins, outs, start, end)
+    return _curve(ins, outs, start, end, bucket)
+
+
+def _curve(ins, outs, start, end, bucket):
+    n = max(0, math.ceil((end - start) / bucket))
+    np = numpy_or_none()
+    if np is not None:
+        first = np.minimum(np.ceil((ins - start) / bucket).astype(np.int64), n)
+        last = np.minimum(np.ceil((outs - start) / bucket).astype(np.int64), n)
+        delta = np.bincount(first, minlength=n + 1) - np.bincount(last, minlength=n + 1)
+        return np.cumsum(delta)[:n]
+    delta = [0] * (n + 1)
+    # -((start - t) // bucket) es el techo de (t - start) / bucket
+    for k in [min(n, -int((start - i) // bucket)) for i in ins]:
+        delta[k] += 1
+    for k in [min(n, -int((start - o) // bucket)) for o in outs]:
+        delta[k] -= 1
+    return list(accumulate(delta))[:n]
+
+
+def sweep(ins, outs, start, end, capacity):
+    """Pico exacto, instante del pico y segundos con ocupación >= capacidad."""
+    ins, outs = _clip(ins, outs, start, end)
+    return _sweep(ins, outs, start, capacity)
+
+
+def _sweep(ins, outs, start, capacity):
+    np = numpy_or_none()
+    if np is not None:
+        if not len(ins):
+            return {"peak": 0, "peak_at": start, "time_at_capacity": 0.0}
+        times = np.concatenate((ins, outs))
+        deltas = np.concatenate((np.ones(len(ins), np.int64), -np.ones(len(outs), np.int64)))
+        # a igual tiempo primero las salidas: el puesto se libera antes de reusarse
+        order = np.lexsort((deltas, times))
+        times = times[order]
+        level = np.cumsum(deltas[order])
+        k = int(level.argmax())
+        full = level[:-1] >= capacity
+        return {
+            "peak": int(level[k]),
+            "peak_at": float(times[k]),
+            "time_at_capacity": float(np.diff(times)[full].sum()),
+        }
+    ins, outs = sorted(ins), sorted(outs)
+    if not ins:
+        return {"peak": 0, "peak_at": start, "time_at_capacity": 0.0}
+    # nivel justo después de cada entrada: entradas hasta ella - salidas hasta su instante
+    levels = [k - bisect_right(outs, t) for k, t in enumerate(ins, 1)]
+    k = max(range(len(levels)), key=levels.__getitem__)
+    full = _time_at_capacity(ins, outs, capacity) if levels[k] >= capacity else 0.0
+    return {"peak": levels[k], "peak_at": ins[k], "time_at_capacity": full}
+
+
+def _time_at_capacity(ins, outs, capacity):
+    # barrido completo; solo hace falta si el pico alcanzó la capacidad
+    level = 0
+    at_capacity = 0.0
+    prev = None
+    i = j = 0
+    while i < len(ins) or j < len(outs):
+        # salidas primero cuando coinciden con una entrada
+        if j < len(outs) and (i == len(ins) or outs[j] <= ins[i]):
+            t, step = outs[j], -1
+            j += 1
+        else:
+            t, step = ins[i], 1
+            i += 1
+        if prev is not None and level >= capacity:
+            at_capacity += t - prev
+        level += step
+        prev = t
+    return at_capacity
+
+
+def summarize(samples, per):
+    # (índice de grupo, promedio, máximo) cada `per` muestras
+    out = []
+    for g, k in enumerate(range(0, len(samples), per)):
+        chunk = samples[k:k + per]
+        out.append((g, float(sum(chunk)) / len(chunk), int(max(chunk))))
+    return out
+
+
+def occupancy(ins, outs, start, end, capacity, bucket=60):
+    ins, outs = _clip(ins, outs, start, end)
+    report = _sweep(ins, outs, start, capacity)
+    report.update(start=start, end=end, bucket=bucket, capacity=capacity, curve=_curve(ins, outs, start, end, bucket))
+    return report
@@ -0,0 +1,171 @@
+"""
+Perfilado opcional del parqueadero
+----------------------------------
+Instrumenta métodos del servicio y de las pestañas: cantidad de llamadas,
+tiempo acumulado y máximo, y filas de Treeview insertadas/borradas. Las
+últimas llamadas quedan en un buffer circular de tamaño fijo.
+
+Desactivado no cuesta nada: los envoltorios se instalan sobre la instancia
+al llamar enable() y se quitan con disable(), así que el resto del tiempo se
+ejecutan los métodos originales de la clase.
+
+    prof = Profiler()
+    prof.watch(service, ["checkin", "checkout"])
+    prof.watch(tab, ["refresh_everything"], tables=[tab.table])
+    prof.enable()
+    prof.top(10)
+    prof.dump("diagnostico.json")
+
+StartupTimer guarda las marcas del arranque (módulos, servicio, ventana,
+primer cuadro interactivo, login hasta pantalla usable) para el reporte
+de inicio.
+
+No depende de Tkinter.
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import deque
+
+RING_SIZE = 2000
+
+
+class Profiler:
+    def __init__(self, ring_size=RING_SIZE):
+        self.enabled = False
+        self.stats = {}  # nombre -> [llamadas, total_s, max_s, filas insertadas, filas borradas]
+        self.recent = deque(maxlen=ring_size)  # (epoch, nombre, ms, +filas, -filas)
+        self._targets = []  # (objeto, método, etiqueta, tablas)
+        self._saved = {}  # (id(objeto), método) -> atributo previo de la instancia
+        self._lock = threading.Lock()
+
+    def watch(self, obj, names, label=None, tables=()):
+        # registra métodos a instrumentar; no cambia nada hasta enable()
+        label = label or type(obj).__name__
+        for name in names:
+            target = (obj, name, label, tuple(tables))
+            self._targets.append(target)
+            if self.enabled:
+                self._wrap(*target)
+
+    def enable(self):
+        if not self.enabled:
+            for target in self._targets:
+                self._wrap(*target)
+            self.enabled = True
+
+    def disable(self):
+        if self.enabled:
+            for obj, name, _, _ in self._targets:
+                saved = self._saved.pop((id(obj), name), None)
+                if saved is None:
+                    obj.__dict__.pop(name, None)
+                else:
+                    setattr(obj, name, saved)
+            self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.recent.clear()
+
+    def _wrap(self, obj, name, label, tables):
+        func = getattr(obj, name)
+        if name in obj.__dict__:
+            self._saved[(id(obj), name)] = obj.__dict__[name]
+        key = f"{label}.{name}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            ins = sum(t.inserted for t in tables)
+            dels = sum(t.deleted for t in tables)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.record(
+                    key, elapsed,
+                    sum(t.inserted for t in tables) - ins,
+                    sum(t.deleted for t in tables) - dels,
+                )
+
+        setattr(obj, name, wrapper)
+
+    def record(self, key, elapsed, inserted=0, deleted=0):
+        with self._lock:
+            s = self.stats.get(key)
+            if s is None:
+                s = self.stats[key] = [0, 0.0, 0.0, 0, 0]
+            s[0] += 1
+            s[1] += elapsed
+            if elapsed > s[2]:
+                s[2] = elapsed
+            s[3] += inserted
+            s[4] += deleted
+            self.recent.append((time.time(), key, elapsed * 1e3, inserted, deleted))
+
+    # ===================== Consultas =====================
+    def top(self, n=20, by="total"):
+        index = {"calls": 0, "total": 1, "max": 2, "rows": 3}[by]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self.stats.items()]
+        items.sort(key=lambda kv: kv[1][index], reverse=True)
+        return [
+            {
+                "name": k,
+                "calls": v[0],
+                "total_ms": v[1] * 1e3,
+                "avg_ms": v[1] * 1e3 / v[0] if v[0] else 0.0,
+                "max_ms": v[2] * 1e3,
+                "rows_inserted": v[3],
+                "rows_deleted": v[4],
+            }
+            for k, v in items[:n]
+        ]
+
+    def to_dict(self):
+        with self._lock:
+            recent = list(self.recent)
+        return {
+            "enabled": self.enabled,
+            "generated_at": time.time(),
+            "stats": self.top(len(self.stats)),
+            "recent": [
+                {"at": at, "name": name, "ms": ms, "rows_inserted": i, "rows_deleted": d}
+                for at, name, ms, i, d in recent
+            ],
+        }
+
+    def dump(self, path, **extra):
+        # extra: secciones adicionales del diagnóstico (p. ej. startup=timer.to_dict())
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(dict(self.to_dict(), **extra), fh, indent=2)
+
+
+class StartupTimer:
+    """Marcas de tiempo desde `start` (perf_counter) hasta cada etapa del arranque."""
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = []  # (etapa, segundos desde start)
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.start))
+
+    def elapsed(self, name):
+        # segundos hasta la primera marca con ese nombre (None si no ocurrió)
+        return next((t for n, t in self.marks if n == name), None)
+
+    def report(self):
+        lines = []
+        prev = 0.0
+        for name, t in self.marks:
+            lines.append(f"{name:<32} {t * 1e3:8.1f} ms  (+{(t - prev) * 1e3:.1f})")
+            prev = t
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {"marks": [{"name": n, "ms": t * 1e3} for n, t in self.marks]}
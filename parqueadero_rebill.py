@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Re-facturación histórica y conciliación
+---------------------------------------
+Recalcula el total de cada ticket cerrado con las reglas de tarifa indicadas
+(la misma Tariff.price que usa ParkingService en la salida) y lo compara con
+lo cobrado. El trabajo se reparte por particiones del archivo por día en un
+ProcessPoolExecutor: cada proceso lee su día, escribe sus diferencias en un
+CSV parcial y devuelve un resumen.
+
+El checkpoint (JSONL) guarda las reglas usadas y el resumen de cada día
+terminado; si el proceso se corta, la siguiente corrida con el mismo
+checkpoint retoma solo los días pendientes. Al final los CSV parciales se
+unen, en orden de día, en el reporte de diferencias.
+
+    python parqueadero_rebill.py --report diferencias.csv
+    python parqueadero_rebill.py --tariff corregida.json --workers 8 --checkpoint rebill.ckpt
+    python parqueadero_rebill.py --start 2024-01-01 --end 2024-12-31 --rate 6
+
+Sin --tariff ni --rate se usan las reglas guardadas en la base.
+
+No depende de Tkinter.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+from parqueadero_archive import RECORD, ClosedTicketArchive
+from parqueadero_db import ParkingRepository
+from parqueadero_service import ARCHIVE_DIR, DB_PATH
+from parqueadero_tariff import Tariff
+
+TOLERANCE = 0.005  # diferencias menores son redondeo
+CHECKPOINT = "refacturacion.ckpt"
+REPORT_FIELDS = ("dia", "id", "vehicle_id", "spot_id", "entrada", "salida", "cobrado", "recalculado", "diferencia")
+
+
+def rebill_day(directory, day, rules, parts_dir):
+    """Re-factura un día del archivo; sus diferencias quedan en parts_dir/<día>.csv."""
+    tariff = Tariff(rules)
+    archive = ClosedTicketArchive(directory)
+    path = os.path.join(parts_dir, f"{day.isoformat()}.csv")
+    tickets = mismatches = 0
+    charged = repriced = 0.0
+    try:
+        with open(path + ".tmp", "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            for tid, vid, sid, ci, co, _, _, total in RECORD.iter_unpack(archive.raw(day)):
+                checkin, checkout = datetime.fromtimestamp(ci), datetime.fromtimestamp(co)
+                amount = tariff.price(checkin, checkout)[0]
+                tickets += 1
+                charged += total
+                repriced += amount
+                if abs(amount - total) > TOLERANCE:
+                    mismatches += 1
+                    w.writerow((
+                        day.isoformat(), tid, vid, sid, checkin.isoformat(sep=" "), checkout.isoformat(sep=" "),
+                        f"{total:.2f}", f"{amount:.2f}", f"{amount - total:+.2f}",
+                    ))
+    finally:
+        archive.close()
+    # el CSV parcial aparece completo o no aparece
+    os.replace(path + ".tmp", path)
+    return {"day": day.isoformat(), "tickets": tickets, "charged": charged, "repriced": repriced, "mismatches": mismatches}
+
+
+def read_checkpoint(path, rules):
+    # {día: resumen} de una corrida anterior con las mismas reglas
+    if not os.path.exists(path):
+        return {}
+    done = {}
+    with open(path, encoding="utf-8") as fh:
+        header = json.loads(fh.readline() or "{}")
+        if header.get("rules") != rules:
+            raise ValueError(f"El checkpoint {path} es de otras reglas de tarifa; use --restart.")
+        for line in fh:
+            try:
+                summary = json.loads(line)
+            except ValueError:  # última línea a medio escribir
+                break
+            done[summary["day"]] = summary
+    return done
+
+
+def merge_report(parts_dir, days, out):
+    # une los CSV parciales en orden de día
+    with open(out, "w", newline="", encoding="utf-8") as dst:
+        csv.writer(dst).writerow(REPORT_FIELDS)
+        for day in days:
+            with open(os.path.join(parts_dir, f"{day}.csv"), encoding="utf-8") as src:
+                for line in src:
+                    dst.write(line)
+
+
+def rebill(directory, rules, checkpoint=CHECKPOINT, workers=None, start=None, end=None, restart=False, progress=None):
+    """Re-factura los días del archivo en [start, end]; devuelve los resúmenes por día."""
+    rules = Tariff(rules).rules  # valida y completa
+    parts_dir = checkpoint + ".partes"
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    done = read_checkpoint(checkpoint, rules)
+    os.makedirs(parts_dir, exist_ok=True)
+    done = {d: s for d, s in done.items() if os.path.exists(os.path.join(parts_dir, f"{d}.csv"))}
+
+    archive = ClosedTicketArchive(directory)
+    days = archive.days_between(start, end)
+    archive.close()
+    pending = [d for d in days if d.isoformat() not in done]
+
+    with open(checkpoint, "a", encoding="utf-8") as ckpt:
+        if ckpt.tell() == 0:
+            ckpt.write(json.dumps({"rules": rules, "archive": os.path.abspath(directory)}) + "\n")
+
+        def finish(summary):
+            done[summary["day"]] = summary
+            ckpt.write(json.dumps(summary) + "\n")
+            ckpt.flush()
+            if progress:
+                progress(len(done), len(days))
+
+        if workers == 1 or len(pending) <= 1:
+            for day in pending:
+                finish(rebill_day(directory, day, rules, parts_dir))
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            try:
+                futures = [pool.submit(rebill_day, directory, day, rules, parts_dir) for day in pending]
+                for future in as_completed(futures):
+                    finish(future.result())
+            finally:
+                # si se corta (error o Ctrl+C) no seguir con los días en cola
+                pool.shutdown(cancel_futures=True)
+    return [done[d.isoformat()] for d in days]
+
+
+def totals(summaries):
+    out = {"days": len(summaries), "tickets": 0, "charged": 0.0, "repriced": 0.0, "mismatches": 0}
+    for s in summaries:
+        for key in ("tickets", "charged", "repriced", "mismatches"):
+            out[key] += s[key]
+    out["delta"] = out["repriced"] - out["charged"]
+    return out
+
+
+def stored_rules(db_path):
+    # reglas de tarifa guardadas en la base (las mismas que carga ParkingService), sin escribir en ella
+    if not db_path or not os.path.exists(db_path):
+        return {}
+    repo = ParkingRepository(db_path, read_only=True)
+    try:
+        return repo.tariff_rules()
+    finally:
+        repo.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-facturación histórica y conciliación del parqueadero")
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    parser.add_argument("--db", default=DB_PATH, help="de aquí salen las reglas si no se indica --tariff")
+    parser.add_argument("--tariff", default=None, help="JSON con las reglas de tarifa a aplicar")
+    parser.add_argument("--rate", type=float, default=None, help="tarifa de día (sobre las demás reglas)")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--checkpoint", default=CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="descartar el checkpoint y empezar de cero")
+    parser.add_argument("--report", default=None, help="CSV con los tickets cuyo total no coincide")
+    parser.add_argument("--json", default=None, help="guardar el resumen en este archivo")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.archive):
+        parser.error(f"no existe el archivo por día {args.archive}")
+
+    if args.tariff:
+        with open(args.tariff, encoding="utf-8") as fh:
+            rules = json.load(fh)
+    else:
+        rules = stored_rules(args.db)
+    if args.rate is not None:
+        rules = dict(rules, rate=args.rate)
+
+    def progress(n, total):
+        print(f"\r{n}/{total} días", end="", file=sys.stderr, flush=True)
+
+    t0 = time.perf_counter()
+    try:
+        summaries = rebill(
+            args.archive, rules, args.checkpoint, args.workers, args.start, args.end, args.restart, progress
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - t0
+    print(file=sys.stderr)
+
+    result = totals(summaries)
+    result["seconds"] = elapsed
+    print(f"{result['days']} días, {result['tickets']} tickets en {elapsed:.2f}s")
+    print(f"cobrado: {result['charged']:.2f}  recalculado: {result['repriced']:.2f}  diferencia: {result['delta']:+.2f}")
+    print(f"tickets con diferencia: {result['mismatches']}")
+    worst = sorted(summaries, key=lambda s: abs(s["repriced"] - s["charged"]), reverse=True)[:10]
+    for s in worst:
+        if s["mismatches"]:
+            print(f"  {s['day']}: {s['mismatches']} tickets, {s['repriced'] - s['charged']:+.2f}")
+    if args.report:
+        merge_report(args.checkpoint + ".partes", [s["day"] for s in summaries], args.report)
+        print(f"reporte: {args.report}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"totals": result, "days": summaries}, fh, indent=2)
+    return 1 if result["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
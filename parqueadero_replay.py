@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Replay acelerado de días registrados
+------------------------------------
+Pasa un registro de entradas y salidas por un ParkingService en memoria con
+un ManualClock: cada operación corre con su hora registrada, así que montos,
+ocupación y rechazos por lleno salen como en el día real, pero con la tarifa
+y la capacidad que se quieran probar.
+
+Con --speed 1000 se respetan los intervalos del registro a 1000x; con
+--speed 0 (por defecto) se corre sin pausas.
+
+Registro (JSONL, en orden de tiempo):
+    {"at": "2026-10-16T08:03:12.120000", "op": "in", "placa": "ABC123"}
+    {"at": "2026-10-16T09:41:55.004000", "op": "out", "placa": "ABC123"}
+
+    python parqueadero_replay.py viernes.jsonl --rate 6 --capacity 40
+    python parqueadero_replay.py --db parqueadero.db --archive parqueadero_archivo --day 2026-10-16 --save viernes.jsonl
+    python parqueadero_replay.py viernes.jsonl --speed 1000 --json resultado.json
+    python parqueadero_replay.py viernes.jsonl --tariff nocturna.json
+
+--tariff toma un JSON con reglas de parqueadero_tariff (night_rate,
+first_hour, daily_cap, ...); --rate cambia solo la tarifa de día.
+
+Con --day la base se abre en solo lectura y el archivo por día se lee
+directo de sus particiones: la herramienta nunca modifica los datos reales.
+
+No depende de Tkinter.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from parqueadero_archive import ClosedTicketArchive
+from parqueadero_bench import LatencyRecorder
+from parqueadero_clock import ManualClock
+from parqueadero_db import ParkingRepository
+from parqueadero_service import ARCHIVE_DIR, DB_PATH, ParkingService
+from parqueadero_store import plate_key
+
+IN = "in"
+OUT = "out"
+# por debajo de esto el reloj de pared es ruido y la aceleración no significa nada
+MIN_WALL_S = 0.01
+
+
+def read_log(fh):
+    # (hora, operación, placa) por línea; una línea inválida detiene la lectura
+    for line_no, line in enumerate(fh, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            event = (datetime.fromisoformat(row["at"]), row["op"], plate_key(row["placa"]))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Línea {line_no} inválida: {e}") from None
+        if event[1] not in (IN, OUT):
+            raise ValueError(f"Línea {line_no}: operación desconocida {event[1]!r}.")
+        yield event
+
+
+def write_log(fh, events):
+    for at, op, placa in events:
+        fh.write(json.dumps({"at": at.isoformat(), "op": op, "placa": placa}) + "\n")
+
+
+def events_from_history(tickets, plates, day):
+    """Entradas y salidas de los tickets que estuvieron en el parqueadero ese día.
+
+    tickets: cerrados con salida ese día o el siguiente; plates: vehicle_id -> placa.
+    Devuelve (eventos, recaudo registrado). Los tickets que entraron ese día y
+    salieron después de medianoche del día siguiente no se incluyen.
+    """
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+    events = []
+    revenue = 0.0
+    for t in tickets:
+        if t["checkin"] >= end:
+            continue
+        placa = plates.get(t["vehicle_id"]) or f"V{t['vehicle_id']}"
+        events.append((t["checkin"], IN, placa))
+        events.append((t["checkout"], OUT, placa))
+        revenue += t["total"]
+    # a igual hora primero las salidas, como en el barrido de ocupación
+    events.sort(key=lambda e: (e[0], e[1] != OUT))
+    return events, revenue
+
+
+def read_history(db_path, archive_dir, day):
+    """(eventos, recaudo registrado, reglas de tarifa, capacidad) de un día del historial.
+
+    Solo lee: la base en modo de solo lectura y el archivo por día (si tiene
+    particiones; si no, los cerrados siguen en la base).
+    """
+    start = datetime.combine(day, datetime.min.time())
+    repo = ParkingRepository(db_path, read_only=True)
+    try:
+        plates = repo.vehicle_plates()
+        rules, capacity = repo.tariff_rules(), repo.spot_count()
+        archive = ClosedTicketArchive(archive_dir) if archive_dir and os.path.isdir(archive_dir) else None
+        if archive is not None and archive.days():
+            try:
+                tickets = list(archive.iter_range(day, day + timedelta(days=1)))
+            finally:
+                archive.close()
+        else:
+            tickets = repo.closed_between(start, start + timedelta(days=2))
+    finally:
+        repo.close()
+    events, revenue = events_from_history(tickets, plates, day)
+    return events, revenue, rules, capacity
+
+
+def replay(events, rate=5.0, capacity=12, speed=0.0, sleep=time.sleep, rules=None):
+    events = list(events)
+    if not events:
+        raise ValueError("El registro está vacío.")
+    first = events[0][0]
+    clock = ManualClock(first)
+    svc = ParkingService(clock=clock)
+    svc.login("admin", "admin")
+    owner = svc.session["user"]["id"]
+    svc.set_tariff(dict(rules or {}, rate=rate))
+    svc._ensure_spots(capacity)
+
+    rec = LatencyRecorder()
+    tickets = rejected = skipped = 0
+    revenue = 0.0
+    turned_away = set()  # placas rechazadas por lleno: su salida no se reproduce
+    wall0 = time.perf_counter()
+    for at, op, placa in events:
+        if speed:
+            # esperar hasta la hora acelerada del evento
+            delay = wall0 + (at - first).total_seconds() / speed - time.perf_counter()
+            if delay > 0:
+                sleep(delay)
+        clock.set(at)
+        if op == IN:
+            if not svc.free_spot_count():
+                rejected += 1
+                turned_away.add(placa)
+                continue
+            try:
+                rec.time("checkin", svc.checkin, placa, owner)
+            except ValueError:  # ya estaba adentro
+                skipped += 1
+            continue
+        if placa in turned_away:
+            turned_away.discard(placa)
+            continue
+        veh = svc._find_vehicle_by_plate(placa)
+        ticket = svc.store.active_for_vehicle(veh["id"]) if veh else None
+        if ticket is None:  # salida sin entrada en el registro
+            skipped += 1
+            continue
+        closed = rec.time("checkout", svc.checkout, ticket["id"])
+        tickets += 1
+        revenue += closed["total"]
+    wall = time.perf_counter() - wall0
+
+    occ = svc.occupancy(first, clock.now(), bucket=60)
+    span = (clock.now() - first).total_seconds()
+    return {
+        "params": {"rate": rate, "capacity": capacity, "speed": speed, "tariff": svc.tariff.rules},
+        "events": len(events),
+        "start": first.isoformat(),
+        "end": clock.now().isoformat(),
+        "tickets": tickets,
+        "still_parked": len(svc.active_tickets),
+        "rejected_full": rejected,
+        "skipped": skipped,
+        "revenue": revenue,
+        "peak": occ["peak"],
+        "peak_at": datetime.fromtimestamp(occ["peak_at"]).isoformat(),
+        "time_at_capacity_s": occ["time_at_capacity"],
+        "wall_s": wall,
+        "speedup": span / wall if wall >= MIN_WALL_S else None,
+        "ops": rec.summary(),
+    }
+
+
+def print_report(r, recorded=None):
+    print(f"{r['events']} eventos de {r['start']} a {r['end']}")
+    print(f"tarifa {r['params']['rate']:.2f} /h, capacidad {r['params']['capacity']}")
+    print(f"tickets cerrados: {r['tickets']}, siguen adentro: {r['still_parked']}, "
+          f"rechazados por lleno: {r['rejected_full']}, omitidos: {r['skipped']}")
+    line = f"recaudo: {r['revenue']:.2f}"
+    if recorded is not None:
+        line += f" (registrado: {recorded:.2f}, diferencia: {r['revenue'] - recorded:+.2f})"
+    print(line)
+    print(f"pico: {r['peak']} de {r['params']['capacity']} ({r['peak_at']}), "
+          f"tiempo lleno: {r['time_at_capacity_s'] / 60:.0f} min")
+    speedup = f" ({r['speedup']:.0f}x)" if r["speedup"] else ""
+    print(f"tiempo real: {r['wall_s']:.2f}s{speedup}")
+    print(f"{'operacion':>10} {'n':>8} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'max us':>9}")
+    for op, o in r["ops"].items():
+        print(f"{op:>10} {o['count']:>8} {o['p50_us']:>9.1f} {o['p95_us']:>9.1f} {o['p99_us']:>9.1f} {o['max_us']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay acelerado de un día del parqueadero")
+    parser.add_argument("log", nargs="?", help="registro JSONL de entradas y salidas")
+    parser.add_argument("--day", type=date.fromisoformat, default=None, help="tomar el día AAAA-MM-DD del historial")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    parser.add_argument("--save", default=None, help="guardar el registro usado en este JSONL")
+    parser.add_argument("--rate", type=float, default=None, help="tarifa de día a probar (por defecto la actual)")
+    parser.add_argument("--tariff", default=None, help="JSON con las reglas de tarifa a probar")
+    parser.add_argument("--capacity", type=int, default=None, help="puestos a probar (por defecto los actuales)")
+    parser.add_argument("--speed", type=float, default=0.0, help="aceleración (1000 = 1000x); 0 = sin pausas")
+    parser.add_argument("--json", default=None, help="guardar el resultado en este archivo")
+    args = parser.parse_args(argv)
+    if (args.log is None) == (args.day is None):
+        parser.error("indique un registro JSONL o --day")
+
+    recorded = None
+    rules, capacity = {"rate": 5.0}, 12
+    if args.day is not None:
+        try:
+            events, recorded, rules, capacity = read_history(args.db, args.archive, args.day)
+        except sqlite3.Error as e:
+            parser.error(f"no se pudo leer {args.db}: {e}")
+    else:
+        with open(args.log, encoding="utf-8") as fh:
+            try:
+                events = list(read_log(fh))
+            except ValueError as e:
+                parser.error(str(e))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            write_log(fh, events)
+    if not events:
+        print("No hay eventos para reproducir.")
+        return 1
+    if args.tariff:
+        with open(args.tariff, encoding="utf-8") as fh:
+            rules = dict(rules, **json.load(fh))
+    if args.rate is not None:
+        rules = dict(rules, rate=args.rate)
+
+    try:
+        result = replay(
+            events,
+            rate=rules.get("rate", 5.0),
+            capacity=args.capacity if args.capacity is not None else capacity,
+            speed=args.speed,
+            rules=rules,
+        )
+    except ValueError as e:  # reglas de tarifa inválidas
+        parser.error(str(e))
+    print_report(result, recorded)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Búsqueda en el historial de tickets cerrados
+--------------------------------------------
+Índice en memoria sobre todos los tickets cerrados, en orden de salida:
+
+- columnas compactas (array) con salida, vehículo, puesto, operador de salida
+  y total de cada ticket, direccionadas por su posición global g;
+- listas de postings vehículo -> [g], puesto -> [g] y operador -> [g], que
+  quedan ordenadas por salida porque los tickets se agregan en ese orden.
+
+Una consulta toma la lista más corta entre los filtros dados (o todo el
+historial), recorta el rango de fechas con bisect sobre la salida y revisa
+los demás filtros contra las columnas. Los resultados se entregan por tandas
+(SearchResults.fetch) para poder mostrarlos mientras se busca.
+
+Con archivo por día, g se traduce a (día, posición) y el registro se lee del
+archivo solo para las filas que se muestran.
+
+No depende de Tkinter.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from parqueadero_archive import RECORD, insort, record_to_ticket
+
+SCAN_CHUNK = 4096  # candidatos revisados entre pausas de SearchResults.fetch
+EMPTY = array("q")
+
+
+class TicketSearchIndex:
+    def __init__(self, archive=None, tickets=None):
+        # archive: ClosedTicketArchive; si no hay, tickets: iterable de dicts cerrados
+        self.archive = archive
+        self.checkout = array("d")
+        self.vehicle = array("q")
+        self.spot = array("q")
+        self.operator = array("q")
+        self.total = array("d")
+        self.by_vehicle = {}
+        self.by_spot = {}
+        self.by_operator = {}
+        self._days = []  # días del archivo, en orden
+        self._offsets = array("q")  # g del primer ticket de cada día
+        self._tickets = []  # sin archivo: los dicts en orden de salida
+        if archive is not None:
+            for day in archive.days():
+                self._start_day(day)
+                for r in RECORD.iter_unpack(archive.raw(day)):
+                    self._index(r[4], r[1], r[2], r[6], r[7])
+        else:
+            for t in sorted(tickets or (), key=lambda t: t["checkout"]):
+                self.add(t)
+
+    def __len__(self):
+        return len(self.checkout)
+
+    def _start_day(self, day):
+        self._days.append(day)
+        self._offsets.append(len(self.checkout))
+
+    def _index(self, checkout, vehicle_id, spot_id, user_out, total):
+        g = len(self.checkout)
+        self.checkout.append(checkout)
+        self.vehicle.append(vehicle_id)
+        self.spot.append(spot_id)
+        self.operator.append(user_out or 0)
+        self.total.append(total)
+        for postings, key in ((self.by_vehicle, vehicle_id), (self.by_spot, spot_id), (self.by_operator, user_out or 0)):
+            p = postings.get(key)
+            if p is None:
+                p = postings[key] = array("q")
+            p.append(g)
+
+    def add(self, closed):
+        # ticket recién cerrado (TicketClosed): se agrega al final del índice
+        if self.archive is not None:
+            day = closed["checkout"].date()
+            if not self._days or self._days[-1] != day:
+                self._start_day(day)
+        else:
+            self._tickets.append(closed)
+        self._index(
+            closed["checkout"].timestamp(), closed["vehicle_id"], closed["spot_id"],
+            closed["user_out"], float(closed["total"]),
+        )
+
+    def row(self, g):
+        if self.archive is None:
+            return self._tickets[g]
+        d = bisect_right(self._offsets, g) - 1
+        return record_to_ticket(self.archive.record_at(self._days[d], g - self._offsets[d]))
+
+    def _slice(self, postings, lo, hi):
+        # rango [a, b) de la lista cuya salida cae en [lo, hi)
+        key = self.checkout.__getitem__
+        if postings is None:
+            return bisect_left(self.checkout, lo), bisect_left(self.checkout, hi)
+        return bisect_left(postings, lo, key=key), bisect_left(postings, hi, key=key)
+
+    def query(self, vehicle_id=None, spot_id=None, operator_id=None, start=None, end=None,
+              min_total=None, max_total=None, newest_first=True):
+        """Genera las posiciones g que cumplen todos los filtros.
+
+        start/end son epoch en segundos sobre la salida, [start, end). Cada
+        SCAN_CHUNK candidatos revisados se genera None para permitir pausas.
+        """
+        lo = float("-inf") if start is None else start
+        hi = float("inf") if end is None else end
+        lists = []
+        if vehicle_id is not None:
+            lists.append(self.by_vehicle.get(vehicle_id, EMPTY))
+        if spot_id is not None:
+            lists.append(self.by_spot.get(spot_id, EMPTY))
+        if operator_id is not None:
+            lists.append(self.by_operator.get(operator_id, EMPTY))
+        # la lista más corta dentro del rango de fechas maneja el recorrido
+        best, a, b = None, *self._slice(None, lo, hi)
+        for p in lists:
+            pa, pb = self._slice(p, lo, hi)
+            if best is None or pb - pa < b - a:
+                best, a, b = p, pa, pb
+        positions = range(b - 1, a - 1, -1) if newest_first else range(a, b)
+
+        vehicle, spot, operator, total = self.vehicle, self.spot, self.operator, self.total
+        for n, k in enumerate(positions, 1):
+            g = best[k] if best is not None else k
+            if (
+                (vehicle_id is None or vehicle[g] == vehicle_id)
+                and (spot_id is None or spot[g] == spot_id)
+                and (operator_id is None or operator[g] == operator_id)
+                and (min_total is None or total[g] >= min_total)
+                and (max_total is None or total[g] <= max_total)
+            ):
+                yield g
+            if n % SCAN_CHUNK == 0:
+                yield None
+
+    def search(self, **filters):
+        return SearchResults(self, self.query(**filters))
+
+
+class SearchResults:
+    """Resultados de una consulta con la interfaz de HistoryIndex/ListHistory.
+
+    Se llenan por tandas con fetch(); done indica que la consulta terminó.
+    """
+
+    def __init__(self, index, refs):
+        self.index = index
+        self.refs = array("q")
+        self.total = 0.0
+        self.done = False
+        self._it = refs
+        self._key = None  # clave y sentido del último sort()
+
+    def __len__(self):
+        return len(self.refs)
+
+    def fetch(self, max_chunks=1):
+        # revisa hasta max_chunks tandas de candidatos; devuelve las filas nuevas
+        before = len(self.refs)
+        chunks = 0
+        for g in self._it:
+            if g is None:
+                chunks += 1
+                if chunks >= max_chunks:
+                    return len(self.refs) - before
+                continue
+            self.refs.append(g)
+            self.total += self.index.total[g]
+        self.done = True
+        return len(self.refs) - before
+
+    def fetch_all(self):
+        while not self.done:
+            self.fetch(64)
+        return self
+
+    def row(self, i):
+        return self.index.row(self.refs[i])
+
+    def sort(self, field, reverse=False, transform=None):
+        self.fetch_all()
+        column = {"checkout": self.index.checkout, "vehicle_id": self.index.vehicle,
+                  "spot_id": self.index.spot, "total": self.index.total}.get(field)
+        if column is not None and transform is None:
+            key = column.__getitem__
+        else:
+            # campos sin columna (id, checkin) o con transformación: leer la fila
+            def key(g):
+                v = self.index.row(g)[field]
+                return transform(v) if transform else v
+        self.refs = array("q", sorted(self.refs, key=key, reverse=reverse))
+        self._key = (key, reverse)
+
+    def append(self, g):
+        # resultado nuevo (un ticket cerrado después de la consulta)
+        self.total += self.index.total[g]
+        if self._key is None:
+            self.refs.insert(0, g)  # sin orden explícito: los más recientes primero
+        else:
+            # la consulta entrega primero los más recientes: entre iguales va adelante
+            insort(self.refs, g, *self._key, first=True)
@@ -0,0 +1,773 @@
+"""
+Servicio del parqueadero
+------------------------
+Modelo completo (usuarios, vehículos, puestos, tickets, tarifa y secuencias
+de IDs) sin dependencia de Tkinter. La ventana de parqueadero.py es un
+cliente delgado sobre este servicio; también se puede usar desde scripts,
+benchmarks o integraciones con las porterías en servidores sin pantalla.
+
+    svc = ParkingService()                      # solo memoria
+    svc = ParkingService(DB_PATH, ARCHIVE_DIR)  # SQLite + archivo por día
+
+checkin/checkout se pueden llamar desde varios hilos: la reserva del puesto
+usa las franjas de StripedSpotPool y la unicidad del ticket activo por
+vehículo se protege con locks repartidos por placa.
+
+La hora sale de self.clock (ver parqueadero_clock); con un ManualClock se
+pueden reproducir días registrados sin esperar.
+
+Los puestos pertenecen a zonas (nivel, tipos de vehículo admitidos, reservada
+o no). Cada zona lleva su contador de libres y la asignación automática
+recorre solo las zonas que admiten el tipo del vehículo (precalculadas por
+tipo, las más específicas primero); la zona general (DEFAULT_ZONE) absorbe
+los cambios de capacidad total.
+
+self.metrics (ver parqueadero_metrics) se actualiza en cada entrada, salida
+y cambio de puestos; la barra de estado y los exportadores leen de ahí.
+"""
+
+import json
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from parqueadero_archive import ClosedTicketArchive, HistoryIndex, ListHistory
+from parqueadero_billing import arrays_from_tickets, compare_tariffs
+from parqueadero_clock import SystemClock
+from parqueadero_db import PagedClosedTickets, ParkingRepository
+from parqueadero_events import (
+    CREATED, DELETED, UPDATED, ConfigChanged, EventBus, TicketClosed, TicketOpened, UserChanged, VehicleChanged,
+)
+from parqueadero_metrics import ParkingMetrics
+from parqueadero_occupancy import archive_times, merge, occupancy
+from parqueadero_search import SearchResults, TicketSearchIndex
+from parqueadero_stats import RevenueAggregates
+from parqueadero_store import ParkingStore, plate_key
+from parqueadero_tariff import Tariff
+
+DB_PATH = "parqueadero.db"
+ARCHIVE_DIR = "parqueadero_archivo"
+PLATE_LOCK_STRIPES = 64
+DEFAULT_ZONE = 1  # zona general; no se puede eliminar
+VEHICLE_TYPES = ("auto", "moto", "electrico")
+
+
+class ParkingService:
+    def __init__(self, db_path=None, archive_dir=None, synchronous="FULL", seed=True, clock=None, read_only=False):
+        # Estado de sesión y almacenamiento en memoria
+        self.session = {"user": None}  # dict con usuario autenticado
+        # Fuente de la hora actual (SystemClock o un reloj manual para replay)
+        self.clock = clock or SystemClock()
+
+        # Modelos en memoria (indexados por id, placa y username)
+        self.store = ParkingStore()
+        # Persistencia en SQLite (None: solo memoria); read_only carga la base sin escribir en ella
+        self.repo = ParkingRepository(db_path, synchronous, read_only=read_only) if db_path else None
+        self.read_only = read_only
+        self._closed_history = self.store.closed_tickets
+        # Historial por día en disco; en memoria solo quedan los cerrados de hoy
+        self.archive = ClosedTicketArchive(archive_dir) if archive_dir else None
+        self._resident_day = self.clock.today()
+        self._longest_stay = None  # estadía cerrada más larga (se calcula al primer uso)
+        # Ingresos y conteos por día/hora/puesto/operador, al día en cada salida
+        self.stats = RevenueAggregates()
+        # Eventos de dominio para las vistas (ver parqueadero_events)
+        self.events = EventBus()
+        # Índice de búsqueda del historial (se construye en la primera búsqueda)
+        self._search = None
+        self.events.subscribe(TicketClosed, self._index_closed)
+        # Contadores, gauges e histogramas en vivo (exportables a Prometheus)
+        self.metrics = ParkingMetrics()
+
+        # Configuración de negocio
+        self.rate_per_hour = 5.0  # tarifa por hora de día (USD/moneda local)
+        self.tariff = Tariff({"rate": self.rate_per_hour})  # reglas de cobro compiladas
+        self.capacity = 12  # número de puestos (todas las zonas)
+        self._zones_by_type = {}  # tipo -> ids de zonas de asignación automática, en orden
+
+        # Secuencias de IDs
+        self._user_next_id = 1
+        self._vehicle_next_id = 1
+        self._zone_next_id = 1
+        self._spot_next_id = 1
+        self._ticket_next_id = 1
+
+        # Concurrencia: locks por franja de placa, secuencias y cierre de tickets
+        self._plate_locks = [threading.Lock() for _ in range(PLATE_LOCK_STRIPES)]
+        self._id_lock = threading.Lock()
+        self._ledger_lock = threading.Lock()
+
+        if self.repo and not self.repo.is_empty():
+            self._load_state()
+        elif seed and not read_only:
+            with self.transaction():
+                self._seed_data()
+        else:
+            self._ensure_default_zone()
+        self.metrics.sync_spots(self.store)
+        if self.archive is not None:
+            # primera vez con archivo: volcar el historial que ya está en SQLite
+            if self.repo and not read_only and not self.archive.days() and self.repo.closed_count():
+                self.archive.extend(self.repo.iter_closed())
+            self._closed_history = self.archive
+        if not self.stats.count and len(self.closed_tickets):
+            # historial previo a los agregados: recalcular una sola vez
+            for t in self.closed_tickets:
+                self.stats.add(t)
+            if self.repo and not read_only:
+                self.repo.replace_aggregates(list(self.stats.rows()))
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+        if self.repo:
+            self.repo.close()
+
+    # Vistas de solo lectura sobre el almacén indexado
+    @property
+    def users(self):
+        return self.store.users.values()
+
+    @property
+    def vehicles(self):
+        return self.store.vehicles.values()
+
+    @property
+    def zones(self):
+        return self.store.zones.values()
+
+    @property
+    def spots(self):
+        return self.store.spots.values()
+
+    @property
+    def active_tickets(self):
+        return self.store.active_tickets.values()
+
+    @property
+    def closed_tickets(self):
+        return self._closed_history
+
+    def closed_tickets_between(self, start=None, end=None):
+        # rango por día de salida (inclusive); con archivo solo se leen esas particiones
+        if self.archive is not None:
+            return self.archive.iter_range(start, end)
+        return (
+            t for t in self.closed_tickets
+            if (start is None or t["checkout"].date() >= start) and (end is None or t["checkout"].date() <= end)
+        )
+
+    def history(self, start=None, end=None):
+        # filas del historial con acceso por posición (para tablas virtuales)
+        if self.archive is not None:
+            return HistoryIndex(self.archive, start, end)
+        return ListHistory(self.closed_tickets_between(start, end))
+
+    def search_index(self):
+        if self._search is None:
+            if self.archive is not None:
+                self._search = TicketSearchIndex(archive=self.archive)
+            else:
+                self._search = TicketSearchIndex(tickets=self.closed_tickets)
+        return self._search
+
+    def _index_closed(self, event):
+        if self._search is not None:
+            self._search.add(event.ticket)
+
+    def search_history(self, placa=None, spot_id=None, operator_id=None, start=None, end=None,
+                       min_total=None, max_total=None):
+        # start/end: días de salida (inclusive), igual que history(); resultados por tandas
+        index = self.search_index()
+        vehicle_id = None
+        if placa:
+            v = self.store.vehicle_by_plate(placa)
+            if v is None:
+                return SearchResults(index, iter(()))
+            vehicle_id = v["id"]
+        day = datetime.min.time()
+        return index.search(
+            vehicle_id=vehicle_id,
+            spot_id=spot_id,
+            operator_id=operator_id,
+            start=datetime.combine(start, day).timestamp() if start else None,
+            end=datetime.combine(end + timedelta(days=1), day).timestamp() if end else None,
+            min_total=min_total,
+            max_total=max_total,
+        )
+
+    def revenue_between(self, start=None, end=None):
+        return self.stats.total_between(start, end)[1]
+
+    def occupancy(self, start, end=None, bucket=60):
+        """Curva de ocupación, pico y tiempo lleno en [start, end) (datetimes).
+
+        Incluye los tickets activos con salida = ahora; end por defecto es ahora.
+        """
+        now = self.clock.now()
+        end = min(end or now, now)
+        if self.archive is not None:
+            # particiones por día de salida: un ticket que cruza la ventana sale a más
+            # tardar end + la estadía más larga registrada
+            closed = archive_times(self.archive, start.date(), (end + self._max_stay()).date())
+        else:
+            rows = [t for t in self.closed_tickets if t["checkout"] > start]
+            closed = ([t["checkin"].timestamp() for t in rows], [t["checkout"].timestamp() for t in rows])
+        active = list(self.active_tickets)
+        ins, outs = merge(closed, ([t["checkin"].timestamp() for t in active], [now.timestamp()] * len(active)))
+        return occupancy(ins, outs, start.timestamp(), end.timestamp(), len(self.store.spots), bucket)
+
+    def _max_stay(self):
+        if self._longest_stay is None:
+            if self.repo:
+                self._longest_stay = timedelta(seconds=self.repo.longest_stay())
+            else:
+                stays = (t["checkout"] - t["checkin"] for t in self.closed_tickets)
+                self._longest_stay = max(stays, default=timedelta(0))
+        return self._longest_stay
+
+    # ===================== Datos iniciales =====================
+    def _seed_data(self):
+        # Usuarios: admin por defecto
+        self._create_user("admin", "admin", nombre="Administrador")
+        # Zona general y sus puestos por capacidad
+        self._ensure_default_zone()
+        self._ensure_spots(self.capacity)
+        # Usuarios de ejemplo
+        u1 = self._create_user("maria", "1234", nombre="María Pérez")
+        u2 = self._create_user("juan", "1234", nombre="Juan Ruiz")
+        # Vehículos de ejemplo
+        self._create_vehicle("ABC123", u1["id"], marca="Toyota", modelo="Yaris", color="Rojo")
+        self._create_vehicle("XYZ789", u2["id"], marca="Chevrolet", modelo="Onix", color="Negro")
+
+    # ===================== Persistencia =====================
+    def transaction(self):
+        # agrupa escrituras en una sola transacción (sin base: no hace nada)
+        return self.repo.transaction() if self.repo else nullcontext()
+
+    def reload(self):
+        """Descarta el estado en memoria y lo vuelve a leer de la base.
+
+        Para cuando una transacción que agrupaba varias operaciones no se
+        confirmó: la memoria ya tenía esos cambios y la base no.
+        """
+        if not self.repo:
+            return
+        self.store = ParkingStore()
+        self.stats = RevenueAggregates()
+        self._search = None
+        self._longest_stay = None
+        self._load_state()
+        if self.archive is not None:
+            self._closed_history = self.archive
+            self._resident_day = self.clock.today()
+        self.metrics.sync_spots(self.store)
+
+    def _load_state(self):
+        # solo estado activo; los tickets cerrados se paginan desde la base
+        repo = self.repo
+        for u in repo.load_users():
+            self.store.add_user(u)
+        for v in repo.load_vehicles():
+            self.store.add_vehicle(v)
+        for z in repo.load_zones():
+            self.store.add_zone(z)
+        # bases anteriores a las zonas: todos los puestos quedan en la general
+        self._ensure_default_zone()
+        for s in repo.load_spots():
+            self.store.add_spot(s)
+        for t in repo.load_active_tickets():
+            self.store.open_ticket(t)
+            self.store.occupy_spot(t["spot_id"])
+        ids = repo.max_ids()
+        self._user_next_id = ids["users"] + 1
+        self._vehicle_next_id = ids["vehicles"] + 1
+        self._zone_next_id = ids["zones"] + 1
+        self._spot_next_id = ids["spots"] + 1
+        self._ticket_next_id = ids["tickets"] + 1
+        self.tariff = Tariff(repo.tariff_rules(self.rate_per_hour))
+        self.rate_per_hour = self.tariff.rules["rate"]
+        self.capacity = len(self.store.spots)
+        self._closed_history = PagedClosedTickets(repo, self.store.closed_tickets, ids["tickets"])
+        self.stats.load_rows(repo.load_aggregates())
+
+    # ===================== Sesión =====================
+    def login(self, username, password):
+        user = self._find_user_by_username(username)
+        if user and user["password"] == password:
+            self.session["user"] = user
+            return user
+        return None
+
+    def logout(self):
+        self.session["user"] = None
+
+    # ===================== Utilidades de modelo =====================
+    # Usuarios
+    def _find_user_by_username(self, username):
+        return self.store.user_by_username(username)
+
+    def get_user_by_id(self, user_id):
+        return self.store.user(user_id)
+
+    def _create_user(self, username, password, nombre=""):
+        if self._find_user_by_username(username):
+            return None
+        u = {
+            "id": self._user_next_id,
+            "username": username,
+            "password": password,
+            "nombre": nombre or username,
+        }
+        self.store.add_user(u)
+        if self.repo:
+            self.repo.insert_user(u)
+        self._user_next_id += 1
+        self.events.publish(UserChanged(u["id"], CREATED))
+        return u
+
+    def update_user(self, user_id, username, password, nombre):
+        # evitar duplicados de username
+        other = self.store.user_by_username(username)
+        if other and other["id"] != user_id:
+            return False
+        u = self.store.user(user_id)
+        if u is None:
+            return False
+        self.store.rename_user(u, username)
+        u["password"] = password
+        u["nombre"] = nombre or username
+        if self.repo:
+            self.repo.update_user(u)
+        self.events.publish(UserChanged(user_id, UPDATED))
+        return True
+
+    def delete_user(self, user_id):
+        # no permitir eliminar admin
+        u = self.store.user(user_id)
+        if u and u["username"] == "admin":
+            return False
+        # no permitir borrar usuario con vehículos o tickets activos
+        if self.store.user_has_vehicles(user_id):
+            return False
+        self.store.remove_user(user_id)
+        if self.repo:
+            self.repo.delete_user(user_id)
+        self.events.publish(UserChanged(user_id, DELETED))
+        return True
+
+    # Vehículos
+    def _find_vehicle_by_plate(self, placa):
+        return self.store.vehicle_by_plate(placa)
+
+    def get_vehicle_by_id(self, vehicle_id):
+        return self.store.vehicle(vehicle_id)
+
+    def _vehicle_type(self, tipo):
+        tipo = tipo or VEHICLE_TYPES[0]
+        if not isinstance(tipo, str):
+            raise ValueError(f"Tipo de vehículo desconocido: {tipo}.")
+        tipo = tipo.strip().lower()
+        if tipo not in VEHICLE_TYPES:
+            raise ValueError(f"Tipo de vehículo desconocido: {tipo}.")
+        return tipo
+
+    def _vehicle_record(self, placa, user_id, marca="", modelo="", color="", tipo=None):
+        return {
+            "id": self._take_id("_vehicle_next_id"),
+            "placa": placa.upper().strip(),
+            "user_id": user_id,
+            "marca": marca,
+            "modelo": modelo,
+            "color": color,
+            "tipo": self._vehicle_type(tipo),
+        }
+
+    def _create_vehicle(self, placa, user_id, marca="", modelo="", color="", tipo=None):
+        if self._find_vehicle_by_plate(placa):
+            return None
+        v = self._vehicle_record(placa, user_id, marca, modelo, color, tipo)
+        self.store.add_vehicle(v)
+        if self.repo:
+            self.repo.insert_vehicle(v)
+        self.events.publish(VehicleChanged(v["id"], CREATED))
+        return v
+
+    def update_vehicle(self, vehicle_id, placa, user_id, marca, modelo, color, tipo=None):
+        # placa única
+        other = self.store.vehicle_by_plate(placa)
+        if other and other["id"] != vehicle_id:
+            return False
+        v = self.store.vehicle(vehicle_id)
+        if v is None:
+            return False
+        tipo = self._vehicle_type(tipo) if tipo is not None else v["tipo"]
+        self.store.update_vehicle(v, placa, user_id)
+        v["marca"] = marca
+        v["modelo"] = modelo
+        v["color"] = color
+        v["tipo"] = tipo
+        if self.repo:
+            self.repo.update_vehicle(v)
+        self.events.publish(VehicleChanged(vehicle_id, UPDATED))
+        return True
+
+    def delete_vehicle(self, vehicle_id):
+        # no permitir si tiene ticket activo
+        if self.store.active_for_vehicle(vehicle_id):
+            return False
+        self.store.remove_vehicle(vehicle_id)
+        if self.repo:
+            self.repo.delete_vehicle(vehicle_id)
+        self.events.publish(VehicleChanged(vehicle_id, DELETED))
+        return True
+
+    # Zonas
+    def get_zone_by_id(self, zone_id):
+        return self.store.zone(zone_id)
+
+    def _zone_record(self, zone_id, nombre, nivel, prefijo, tipos, reservada):
+        nombre = nombre.strip()
+        if not nombre:
+            raise ValueError("La zona necesita un nombre.")
+        tipos = {self._vehicle_type(t) for t in tipos}
+        if not tipos:
+            raise ValueError("La zona debe admitir al menos un tipo de vehículo.")
+        return {
+            "id": zone_id,
+            "nombre": nombre,
+            "nivel": nivel.strip(),
+            "prefijo": prefijo.strip() or f"Z{zone_id}-",
+            "tipos": tuple(t for t in VEHICLE_TYPES if t in tipos),
+            "reservada": bool(reservada),
+        }
+
+    def _ensure_default_zone(self):
+        # la zona general existe siempre, aunque no se siembren datos
+        if DEFAULT_ZONE not in self.store.zones:
+            z = self._zone_record(DEFAULT_ZONE, "General", "", "P", VEHICLE_TYPES, False)
+            self.store.add_zone(z)
+            if self.repo and not self.read_only:
+                with self.repo.transaction():
+                    self.repo.save_zone(z)
+            self._zone_next_id = max(self._zone_next_id, DEFAULT_ZONE + 1)
+        self._index_zones()
+
+    def _index_zones(self):
+        # zonas de asignación automática por tipo (las reservadas solo con puesto o zona explícitos);
+        # primero las más específicas: una moto llena la zona de motos antes que la general
+        ordered = sorted(self.store.zones.values(), key=lambda z: (len(z["tipos"]), z["id"]))
+        self._zones_by_type = {
+            tipo: tuple(z["id"] for z in ordered if tipo in z["tipos"] and not z["reservada"])
+            for tipo in VEHICLE_TYPES
+        }
+
+    def create_zone(self, nombre, nivel="", prefijo="", tipos=VEHICLE_TYPES, reservada=False, capacidad=0):
+        z = self._zone_record(self._zone_next_id, nombre, nivel, prefijo, tipos, reservada)
+        with self.transaction():
+            self.store.add_zone(z)
+            if self.repo:
+                self.repo.save_zone(z)
+            self._zone_next_id += 1
+            self._index_zones()
+            if capacidad:
+                self.set_zone_capacity(z["id"], capacidad)
+        self.metrics.sync_spots(self.store)
+        self.events.publish(ConfigChanged("zones", z["id"]))
+        return z
+
+    def update_zone(self, zone_id, nombre, nivel, prefijo, tipos, reservada):
+        # el prefijo solo se usa para los códigos de puestos nuevos
+        if self.store.zone(zone_id) is None:
+            return False
+        z = self._zone_record(zone_id, nombre, nivel, prefijo, tipos, reservada)
+        self.store.zones[zone_id].update(z)
+        if self.repo:
+            self.repo.save_zone(z)
+        self._index_zones()
+        self.metrics.sync_spots(self.store)
+        self.events.publish(ConfigChanged("zones", zone_id))
+        return True
+
+    def delete_zone(self, zone_id):
+        # no se elimina la zona general ni una zona con vehículos adentro
+        if zone_id == DEFAULT_ZONE or self.store.zone(zone_id) is None:
+            return False
+        if self.store.zone_free_count(zone_id) < self.store.zone_size(zone_id):
+            return False
+        with self.transaction():
+            self.set_zone_capacity(zone_id, 0)
+            self.store.remove_zone(zone_id)
+            if self.repo:
+                self.repo.delete_zone(zone_id)
+        self._index_zones()
+        self.metrics.sync_spots(self.store)
+        self.events.publish(ConfigChanged("zones", zone_id))
+        return True
+
+    def zone_occupancy(self):
+        # [(zona, puestos, libres)] leídos de los contadores, sin recorrer puestos
+        return [
+            (z, self.store.zone_size(z["id"]), self.store.zone_free_count(z["id"]))
+            for z in self.store.zones.values()
+        ]
+
+    # Puestos
+    def set_zone_capacity(self, zone_id, new_capacity):
+        # Crear o ajustar cantidad de puestos de una zona (códigos <prefijo>1..<prefijo>n)
+        z = self.store.zone(zone_id)
+        if z is None:
+            raise ValueError("La zona no existe.")
+        if new_capacity < 0:
+            raise ValueError("La capacidad no puede ser negativa.")
+        current = self.store.zone_size(zone_id)
+        if new_capacity > current:
+            nuevos = []
+            for i in range(current + 1, new_capacity + 1):
+                codigo = f"{z['prefijo']}{i}"
+                s = {
+                    "id": self._spot_next_id,
+                    "codigo": codigo,
+                    "zone_id": zone_id,
+                    "ocupado": False,
+                }
+                self.store.add_spot(s)
+                nuevos.append(s)
+                self._spot_next_id += 1
+            if self.repo:
+                with self.repo.transaction():
+                    self.repo.insert_spots(nuevos)
+        elif new_capacity < current:
+            # solo podemos reducir si hay suficientes libres en la zona
+            exceso = current - new_capacity
+            if self.store.zone_free_count(zone_id) < exceso:
+                raise ValueError(f"No hay suficientes puestos libres en {z['nombre']} para reducir capacidad.")
+            # quitar últimos libres
+            to_remove = self.store.zone_highest_free(zone_id, exceso)
+            for spot_id in to_remove:
+                self.store.remove_spot(spot_id)
+            if self.repo:
+                with self.repo.transaction():
+                    self.repo.delete_spots(to_remove)
+        self.capacity = len(self.store.spots)
+        self.metrics.sync_spots(self.store)
+        self.events.publish(ConfigChanged("capacity", self.capacity))
+
+    def _ensure_spots(self, new_capacity):
+        # capacidad total: la diferencia se aplica a la zona general
+        general = self.store.zone_size(DEFAULT_ZONE) + new_capacity - len(self.store.spots)
+        if general < 0:
+            raise ValueError("La capacidad no alcanza para los puestos de las otras zonas.")
+        self.set_zone_capacity(DEFAULT_ZONE, general)
+
+    def set_rate(self, rate):
+        # solo la tarifa de día; el resto de las reglas se conserva
+        self.set_tariff(dict(self.tariff.rules, rate=rate))
+
+    def set_tariff(self, rules):
+        # ValueError si las reglas no son válidas (ver parqueadero_tariff)
+        self.tariff = Tariff(rules)
+        self.rate_per_hour = self.tariff.rules["rate"]
+        if self.repo:
+            with self.repo.transaction():
+                self.repo.set_setting("rate_per_hour", self.rate_per_hour)
+                self.repo.set_setting("tariff", json.dumps(self.tariff.rules))
+        self.events.publish(ConfigChanged("tariff", self.tariff.rules))
+
+    def available_spots(self):
+        return self.store.free_spot_list()
+
+    def free_spot_count(self):
+        return self.store.free_spot_count()
+
+    def get_spot_by_id(self, spot_id):
+        return self.store.spot(spot_id)
+
+    def get_active_ticket(self, ticket_id):
+        return self.store.active_ticket(ticket_id)
+
+    # Tickets y lógica de parqueo
+    def _take_id(self, seq):
+        # siguiente id de una secuencia, seguro entre hilos
+        with self._id_lock:
+            n = getattr(self, seq)
+            setattr(self, seq, n + 1)
+        return n
+
+    def _plate_lock(self, placa):
+        return self._plate_locks[hash(plate_key(placa)) % PLATE_LOCK_STRIPES]
+
+    def _operator_id(self, operator_id):
+        # operador explícito (porterías remotas) o el usuario de la sesión
+        if operator_id is not None:
+            return operator_id
+        return self.session["user"]["id"] if self.session.get("user") else None
+
+    def checkin(self, placa, maybe_user_id=None, marca="", modelo="", color="", spot_id=None, operator_id=None,
+                tipo=None, zone_id=None):
+        # la placa queda bloqueada de la validación a la apertura del ticket
+        t0 = time.perf_counter()
+        try:
+            with self._plate_lock(placa):
+                t = self._checkin_locked(placa, maybe_user_id, marca, modelo, color, spot_id, operator_id, tipo, zone_id)
+        except ValueError:
+            self.metrics.rejected.inc()
+            raise
+        self.metrics.checkin_seconds.observe(time.perf_counter() - t0)
+        return t
+
+    def _allocate_spot(self, tipo, spot_id, zone_id):
+        # puesto elegido, zona elegida (puede ser reservada) o la primera zona del tipo con libres
+        if spot_id:
+            s = self.store.spot(spot_id)
+            if s is not None and tipo not in self.store.zone(s["zone_id"])["tipos"]:
+                raise ValueError(f"El puesto {s['codigo']} no admite vehículos tipo {tipo}.")
+            spot = self.store.occupy_spot(spot_id)
+            if spot is None:
+                raise ValueError("Debe seleccionar un puesto disponible.")
+            return spot
+        if zone_id:
+            z = self.store.zone(zone_id)
+            if z is None:
+                raise ValueError("La zona no existe.")
+            if tipo not in z["tipos"]:
+                raise ValueError(f"La zona {z['nombre']} no admite vehículos tipo {tipo}.")
+            zones = (zone_id,)
+        else:
+            zones = self._zones_by_type[tipo]
+        spot = self.store.occupy_spot(zones=zones)
+        if spot is None:
+            raise ValueError(f"No hay puestos disponibles para {tipo}.")
+        return spot
+
+    def _checkin_locked(self, placa, maybe_user_id, marca, modelo, color, spot_id, operator_id, tipo, zone_id):
+        # Reglas: si vehículo existe, usarlo; si no existe, crear con propietario requerido
+        veh = self._find_vehicle_by_plate(placa)
+        if veh is None:
+            if not maybe_user_id:
+                raise ValueError("Debe seleccionar usuario propietario para una placa nueva.")
+            if self.store.user(maybe_user_id) is None:
+                raise ValueError("El usuario propietario no existe.")
+        # verificar que no esté ya activo
+        elif self.store.active_for_vehicle(veh["id"]):
+            raise ValueError("Este vehículo ya tiene una entrada activa.")
+        # el tipo de un vehículo registrado manda sobre el indicado
+        tipo = veh["tipo"] if veh is not None else self._vehicle_type(tipo)
+        spot = self._allocate_spot(tipo, spot_id, zone_id)
+        # vehículo nuevo y ticket se escriben primero en la base (una transacción);
+        # la memoria cambia solo si eso funcionó, así que un error no deja nada a medias
+        try:
+            new_vehicle = None
+            if veh is None:
+                new_vehicle = veh = self._vehicle_record(placa, maybe_user_id, marca, modelo, color, tipo)
+            t = {
+                "id": self._take_id("_ticket_next_id"),
+                "vehicle_id": veh["id"],
+                "spot_id": spot["id"],
+                "checkin": self.clock.now(),
+                "user_in": self._operator_id(operator_id),
+            }
+            if self.repo:
+                with self.transaction():
+                    if new_vehicle is not None:
+                        self.repo.insert_vehicle(new_vehicle)
+                    self.repo.open_ticket(t)
+        except BaseException:
+            self.store.release_spot(spot["id"])
+            raise
+        if new_vehicle is not None:
+            self.store.add_vehicle(new_vehicle)
+            self.events.publish(VehicleChanged(new_vehicle["id"], CREATED))
+        self.store.open_ticket(t)
+        self.metrics.spot_taken(spot["zone_id"])
+        # los contadores solo suman lo confirmado (en un lote de porterías, tras el COMMIT)
+        self._on_commit(self.metrics.checkins.inc)
+        self.events.publish(TicketOpened(t))
+        return t
+
+    def _compute_amount(self, checkin_dt, checkout_dt):
+        return self.tariff.price(checkin_dt, checkout_dt)
+
+    def simulate_tariffs(self, rates, start=None, end=None):
+        # recaudo del historial con tarifas planas candidatas vs. las reglas de tarifa activas
+        tickets = list(self.closed_tickets_between(start, end))
+        ins, outs, _ = arrays_from_tickets(tickets)
+        if self.tariff.flat:
+            return compare_tariffs(ins, outs, rates, self.tariff.rules["rate"])
+        current = sum(self.tariff.price(t["checkin"], t["checkout"])[0] for t in tickets)
+        return compare_tariffs(ins, outs, rates, baseline_revenue=current)
+
+    def preview_checkout(self, ticket_id):
+        # total y tiempo si la salida fuera ahora (no modifica nada)
+        ticket = self.store.active_ticket(ticket_id)
+        if ticket is None:
+            return None
+        return self._compute_amount(ticket["checkin"], self.clock.now())
+
+    def _on_commit(self, fn):
+        if self.repo:
+            self.repo.on_commit(fn)
+        else:
+            fn()
+
+    def _archive_closed(self, closed, now):
+        self.archive.append(closed)
+        self._roll_resident_day(now)
+
+    def _roll_resident_day(self, now):
+        # cambio de día: los cerrados de días anteriores ya están en su partición
+        if now.date() != self._resident_day:
+            self._resident_day = now.date()
+            self.store.evict_closed_before(now.replace(hour=0, minute=0, second=0, microsecond=0))
+
+    def checkout(self, ticket_id, operator_id=None):
+        ticket = self.store.active_ticket(ticket_id)
+        if ticket is None:
+            return None
+        # mismo lock de placa que checkin: un solo hilo cierra el ticket
+        t0 = time.perf_counter()
+        with self._plate_lock(self.store.vehicle(ticket["vehicle_id"])["placa"]):
+            if self.store.active_ticket(ticket_id) is None:
+                return None
+            closed = self._checkout_locked(ticket, operator_id)
+        self.metrics.checkout_seconds.observe(time.perf_counter() - t0)
+        return closed
+
+    def _checkout_locked(self, ticket, operator_id):
+        now = self.clock.now()
+        total, elapsed = self._compute_amount(ticket["checkin"], now)
+        closed = {
+            "id": ticket["id"],
+            "vehicle_id": ticket["vehicle_id"],
+            "spot_id": ticket["spot_id"],
+            "checkin": ticket["checkin"],
+            "checkout": now,
+            "user_in": ticket["user_in"],
+            "user_out": self._operator_id(operator_id),
+            "total": total,
+        }
+        # agregados y archivo: un hilo a la vez
+        with self._ledger_lock:
+            # primero la base; si falla, la memoria queda como estaba
+            with self.transaction():
+                if self.repo:
+                    self.repo.close_ticket(closed)
+                    self.repo.bump_aggregates(self.stats.deltas(closed))
+                if self.archive is not None:
+                    # al archivo solo lo confirmado: si la transacción externa falla no queda rastro
+                    self._on_commit(lambda: self._archive_closed(closed, now))
+            # quitar de activos y sumar a los agregados
+            self.store.close_ticket(ticket["id"], closed)
+            self.stats.add(closed)
+            if self._longest_stay is not None:
+                self._longest_stay = max(self._longest_stay, now - ticket["checkin"])
+        # liberar puesto
+        spot = self.store.release_spot(ticket["spot_id"])
+        m = self.metrics
+        if spot is not None:
+            m.spot_released(spot["zone_id"])
+        minutes = elapsed.total_seconds() / 60
+        self._on_commit(lambda: m.ticket_closed(total, minutes))
+        self.events.publish(TicketClosed(closed))
+        return closed
@@ -0,0 +1,114 @@
+"""
+Agregados de ingresos del parqueadero
+-------------------------------------
+Conteo de tickets e ingresos por día, hora del día, puesto y operador
+(entrada y salida), actualizados en cada salida. Las consultas cuestan O(1)
+o O(cubetas) y no recorren el historial.
+
+No depende de Tkinter.
+"""
+
+from datetime import date
+
+# dimensiones y cómo se serializa la clave de cada una
+DIMENSIONS = ("day", "hour", "spot", "user_in", "user_out")
+
+
+def _key_to_text(dim, key):
+    if key is None:
+        return ""
+    return key.isoformat() if dim == "day" else str(key)
+
+
+def _key_from_text(dim, text):
+    if text == "":
+        return None
+    return date.fromisoformat(text) if dim == "day" else int(text)
+
+
+class RevenueAggregates:
+    def __init__(self):
+        self.buckets = {dim: {} for dim in DIMENSIONS}  # dim -> clave -> [cantidad, total]
+        self.count = 0
+        self.total = 0.0
+
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def keys_for(closed):
+        out = closed["checkout"]
+        return {
+            "day": out.date(),
+            "hour": out.hour,
+            "spot": closed["spot_id"],
+            "user_in": closed["user_in"],
+            "user_out": closed["user_out"],
+        }
+
+    @classmethod
+    def deltas(cls, closed):
+        # los mismos deltas que devuelve add(), sin aplicarlos (para persistir primero)
+        amount = float(closed["total"])
+        return [(dim, _key_to_text(dim, key), 1, amount) for dim, key in cls.keys_for(closed).items()]
+
+    def add(self, closed):
+        # devuelve los deltas (dim, clave, cantidad, total) para persistirlos
+        amount = float(closed["total"])
+        deltas = []
+        for dim, key in self.keys_for(closed).items():
+            self._bump(dim, key, 1, amount)
+            deltas.append((dim, _key_to_text(dim, key), 1, amount))
+        self.count += 1
+        self.total += amount
+        return deltas
+
+    def _bump(self, dim, key, count, amount):
+        b = self.buckets[dim].get(key)
+        if b is None:
+            self.buckets[dim][key] = [count, amount]
+        else:
+            b[0] += count
+            b[1] += amount
+
+    # ===================== Persistencia =====================
+    def rows(self):
+        for dim, table in self.buckets.items():
+            for key, (count, amount) in table.items():
+                yield dim, _key_to_text(dim, key), count, amount
+
+    def load_rows(self, rows):
+        for dim, text, count, amount in rows:
+            self._bump(dim, _key_from_text(dim, text), count, amount)
+            if dim == "day":
+                self.count += count
+                self.total += amount
+
+    # ===================== Consultas =====================
+    def day(self, d):
+        return tuple(self.buckets["day"].get(d, (0, 0.0)))
+
+    def by_day(self, start=None, end=None):
+        return {
+            d: tuple(v) for d, v in sorted(self.buckets["day"].items())
+            if (start is None or d >= start) and (end is None or d <= end)
+        }
+
+    def total_between(self, start=None, end=None):
+        if start is None and end is None:
+            return self.count, self.total
+        count, amount = 0, 0.0
+        for c, a in self.by_day(start, end).values():
+            count += c
+            amount += a
+        return count, amount
+
+    def by_hour(self):
+        table = self.buckets["hour"]
+        return [tuple(table.get(h, (0, 0.0))) for h in range(24)]
+
+    def by_spot(self):
+        return {k: tuple(v) for k, v in self.buckets["spot"].items()}
+
+    def by_operator(self, role="user_out"):
+        return {k: tuple(v) for k, v in self.buckets[role].items()}
@@ -0,0 +1,329 @@
+"""
+Almacén indexado del parqueadero
+--------------------------------
+Guarda usuarios, vehículos, puestos y tickets en diccionarios por id y
+mantiene índices secundarios (placa, username, vehículo con ticket activo)
+para que las operaciones de la portería no dependan del tamaño de la flota.
+Cada zona tiene su propio pool de puestos libres (su tamaño es el contador
+de libres de la zona) y cada pool se reparte en franjas con su propio lock,
+así que varios hilos pueden reservar puestos a la vez sin un lock global.
+
+No depende de Tkinter: se puede importar desde scripts y benchmarks.
+"""
+
+import heapq
+import threading
+
+from parqueadero_tickets import ClosedTicketTable
+
+SPOT_STRIPES = 16
+
+
+def plate_key(placa):
+    return placa.strip().upper()
+
+
+def username_key(username):
+    return username.strip().casefold()
+
+
+class FreeSpotPool:
+    """Puestos libres en un heap por orden de puesto (id) con borrado perezoso.
+
+    allocate/release cuestan O(log n) y el conteo de libres es O(1).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._free = set()
+
+    def __len__(self):
+        return len(self._free)
+
+    def __contains__(self, spot_id):
+        return spot_id in self._free
+
+    def release(self, spot_id):
+        if spot_id not in self._free:
+            self._free.add(spot_id)
+            heapq.heappush(self._heap, spot_id)
+            # compactar cuando las entradas obsoletas dominan el heap
+            if len(self._heap) > 2 * len(self._free) + 64:
+                self._heap = sorted(self._free)
+
+    def discard(self, spot_id):
+        # la entrada del heap se descarta cuando llegue a la cima
+        self._free.discard(spot_id)
+
+    def take(self, spot_id):
+        if spot_id not in self._free:
+            return False
+        self._free.remove(spot_id)
+        return True
+
+    def lowest(self):
+        heap = self._heap
+        while heap and heap[0] not in self._free:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def allocate(self):
+        spot_id = self.lowest()
+        if spot_id is None:
+            return None
+        heapq.heappop(self._heap)
+        self._free.remove(spot_id)
+        return spot_id
+
+    def highest(self, n):
+        return heapq.nlargest(n, self._free)
+
+    def ordered(self):
+        return sorted(self._free)
+
+
+class StripedSpotPool:
+    """Puestos libres repartidos en franjas (spot_id % n), cada una con su lock.
+
+    take() es el compare-and-set de la reserva: solo un hilo gana un puesto
+    libre. allocate() busca el más bajo entre franjas y reintenta si otro hilo
+    lo tomó primero; con un solo hilo da el mismo puesto que FreeSpotPool.
+    """
+
+    def __init__(self, stripes=SPOT_STRIPES):
+        self._pools = [FreeSpotPool() for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, spot_id):
+        i = spot_id % len(self._pools)
+        return self._pools[i], self._locks[i]
+
+    def __len__(self):
+        return sum(len(p) for p in self._pools)
+
+    def __contains__(self, spot_id):
+        return spot_id in self._stripe(spot_id)[0]
+
+    def release(self, spot_id):
+        pool, lock = self._stripe(spot_id)
+        with lock:
+            pool.release(spot_id)
+
+    def discard(self, spot_id):
+        pool, lock = self._stripe(spot_id)
+        with lock:
+            pool.discard(spot_id)
+
+    def take(self, spot_id):
+        pool, lock = self._stripe(spot_id)
+        with lock:
+            return pool.take(spot_id)
+
+    def lowest(self):
+        best = None
+        for pool, lock in zip(self._pools, self._locks):
+            with lock:
+                spot_id = pool.lowest()
+            if spot_id is not None and (best is None or spot_id < best):
+                best = spot_id
+        return best
+
+    def allocate(self):
+        while True:
+            spot_id = self.lowest()
+            if spot_id is None or self.take(spot_id):
+                return spot_id
+
+    def highest(self, n):
+        out = []
+        for pool, lock in zip(self._pools, self._locks):
+            with lock:
+                out.extend(pool.highest(n))
+        return heapq.nlargest(n, out)
+
+    def ordered(self):
+        out = []
+        for pool, lock in zip(self._pools, self._locks):
+            with lock:
+                out.extend(pool.ordered())
+        out.sort()
+        return out
+
+
+class ParkingStore:
+    def __init__(self):
+        # Tablas principales (id -> registro), conservan el orden de inserción
+        self.users = {}  # {id, username, password, nombre}
+        self.vehicles = {}  # {id, placa, user_id, marca, modelo, color, tipo}
+        self.zones = {}  # {id, nombre, nivel, prefijo, tipos(tuple), reservada(bool)}
+        self.spots = {}  # {id, codigo, zone_id, ocupado(bool)}
+        self.active_tickets = {}  # {id, vehicle_id, spot_id, checkin, user_in}
+        # cerrados en columnas (ver parqueadero_tickets); cada fila se lee como dict
+        self.closed_tickets = ClosedTicketTable()  # {id, vehicle_id, spot_id, checkin, checkout, user_in, user_out, total}
+
+        # Índices secundarios
+        self._users_by_name = {}  # username.casefold() -> usuario
+        self._vehicles_by_plate = {}  # placa.upper() -> vehículo
+        self._vehicle_count_by_user = {}  # user_id -> cantidad de vehículos
+        self._vehicle_count_lock = threading.Lock()  # check-ins concurrentes crean vehículos
+        self._active_by_vehicle = {}  # vehicle_id -> ticket activo
+        # Contadores por zona: libres en su propio pool (len es el conteo) y total de puestos
+        self._zone_free = {}  # zone_id -> StripedSpotPool
+        self._zone_size = {}  # zone_id -> cantidad de puestos
+
+    # ===================== Usuarios =====================
+    def user(self, user_id):
+        return self.users.get(user_id)
+
+    def user_by_username(self, username):
+        return self._users_by_name.get(username_key(username))
+
+    def add_user(self, u):
+        self.users[u["id"]] = u
+        self._users_by_name[username_key(u["username"])] = u
+
+    def rename_user(self, u, username):
+        self._users_by_name.pop(username_key(u["username"]), None)
+        u["username"] = username
+        self._users_by_name[username_key(username)] = u
+
+    def remove_user(self, user_id):
+        u = self.users.pop(user_id, None)
+        if u is not None:
+            self._users_by_name.pop(username_key(u["username"]), None)
+            self._vehicle_count_by_user.pop(user_id, None)
+        return u
+
+    def user_has_vehicles(self, user_id):
+        return self._vehicle_count_by_user.get(user_id, 0) > 0
+
+    # ===================== Vehículos =====================
+    def vehicle(self, vehicle_id):
+        return self.vehicles.get(vehicle_id)
+
+    def vehicle_by_plate(self, placa):
+        return self._vehicles_by_plate.get(plate_key(placa))
+
+    def add_vehicle(self, v):
+        self.vehicles[v["id"]] = v
+        self._vehicles_by_plate[plate_key(v["placa"])] = v
+        self._count_vehicle(v["user_id"], 1)
+
+    def update_vehicle(self, v, placa, user_id):
+        self._vehicles_by_plate.pop(plate_key(v["placa"]), None)
+        self._count_vehicle(v["user_id"], -1)
+        v["placa"] = plate_key(placa)
+        v["user_id"] = user_id
+        self._vehicles_by_plate[v["placa"]] = v
+        self._count_vehicle(user_id, 1)
+
+    def remove_vehicle(self, vehicle_id):
+        v = self.vehicles.pop(vehicle_id, None)
+        if v is not None:
+            self._vehicles_by_plate.pop(plate_key(v["placa"]), None)
+            self._count_vehicle(v["user_id"], -1)
+        return v
+
+    def _count_vehicle(self, user_id, delta):
+        with self._vehicle_count_lock:
+            n = self._vehicle_count_by_user.get(user_id, 0) + delta
+            if n > 0:
+                self._vehicle_count_by_user[user_id] = n
+            else:
+                self._vehicle_count_by_user.pop(user_id, None)
+
+    # ===================== Zonas =====================
+    def zone(self, zone_id):
+        return self.zones.get(zone_id)
+
+    def add_zone(self, z):
+        self.zones[z["id"]] = z
+        self._zone_free.setdefault(z["id"], StripedSpotPool())
+        self._zone_size.setdefault(z["id"], 0)
+
+    def remove_zone(self, zone_id):
+        # solo zonas sin puestos (lo valida el servicio)
+        self._zone_free.pop(zone_id, None)
+        self._zone_size.pop(zone_id, None)
+        return self.zones.pop(zone_id, None)
+
+    def zone_size(self, zone_id):
+        return self._zone_size.get(zone_id, 0)
+
+    def zone_free_count(self, zone_id):
+        pool = self._zone_free.get(zone_id)
+        return len(pool) if pool is not None else 0
+
+    def zone_highest_free(self, zone_id, n):
+        return self._zone_free[zone_id].highest(n)
+
+    # ===================== Puestos =====================
+    def spot(self, spot_id):
+        return self.spots.get(spot_id)
+
+    def add_spot(self, s):
+        self.spots[s["id"]] = s
+        self._zone_size[s["zone_id"]] += 1
+        if not s["ocupado"]:
+            self._zone_free[s["zone_id"]].release(s["id"])
+
+    def remove_spot(self, spot_id):
+        s = self.spots.pop(spot_id, None)
+        if s is not None:
+            self._zone_free[s["zone_id"]].discard(spot_id)
+            self._zone_size[s["zone_id"]] -= 1
+        return s
+
+    def occupy_spot(self, spot_id=None, zones=None):
+        # sin id: el puesto libre más bajo de la primera zona (en el orden de zones) que tenga libres
+        if spot_id is None:
+            for zone_id in self._zone_free if zones is None else zones:
+                spot_id = self._zone_free[zone_id].allocate()
+                if spot_id is not None:
+                    break
+            else:
+                return None
+        else:
+            s = self.spots.get(spot_id)
+            if s is None or not self._zone_free[s["zone_id"]].take(spot_id):
+                return None
+        s = self.spots[spot_id]
+        s["ocupado"] = True
+        return s
+
+    def release_spot(self, spot_id):
+        s = self.spots.get(spot_id)
+        if s is not None:
+            s["ocupado"] = False
+            self._zone_free[s["zone_id"]].release(spot_id)
+        return s
+
+    def free_spot_count(self):
+        # O(zonas): suma de los contadores
+        return sum(len(pool) for pool in self._zone_free.values())
+
+    def free_spot_list(self):
+        ids = heapq.merge(*(pool.ordered() for pool in self._zone_free.values()))
+        return [self.spots[i] for i in ids]
+
+    # ===================== Tickets =====================
+    def active_ticket(self, ticket_id):
+        return self.active_tickets.get(ticket_id)
+
+    def active_for_vehicle(self, vehicle_id):
+        return self._active_by_vehicle.get(vehicle_id)
+
+    def open_ticket(self, t):
+        self.active_tickets[t["id"]] = t
+        self._active_by_vehicle[t["vehicle_id"]] = t
+
+    def close_ticket(self, ticket_id, closed):
+        t = self.active_tickets.pop(ticket_id, None)
+        if t is not None:
+            self._active_by_vehicle.pop(t["vehicle_id"], None)
+        self.closed_tickets.append(closed)
+        return t
+
+    def evict_closed_before(self, limit):
+        # deja residentes solo los cerrados con salida >= limit (el resto está archivado)
+        self.closed_tickets.drop_before(limit)
@@ -0,0 +1,133 @@
+"""
+Motor de tarifas del parqueadero
+--------------------------------
+Reglas de cobro:
+
+- tarifa por hora de día (rate) y, opcional, de noche (night_rate) entre
+  night_start y night_end (HH:MM, puede cruzar la medianoche);
+- precio fijo de la primera hora (first_hour), opcional;
+- minutos de gracia (grace_minutes): estadías de hasta esos minutos no pagan;
+- tope por cada 24 h desde la entrada (daily_cap), opcional.
+
+Igual que la regla plana, se cobra mínimo un minuto y el tiempo se redondea
+a horas completas; cada tramo del tiempo cobrado paga la tarifa de su franja
+(una hora que cruza las 20:00 se prorratea entre día y noche).
+
+Las reglas se compilan en una tabla por tramos del día (inicio, tarifa) con
+sumas acumuladas, así que el costo de cualquier intervalo sale de dos
+búsquedas binarias: O(log tramos) sin importar cuántos días dure la estadía.
+Sin franjas, primera hora, gracia ni tope se usa compute_amount tal cual.
+
+No depende de Tkinter.
+"""
+
+import math
+from bisect import bisect_right
+
+from parqueadero_billing import compute_amount
+
+DAY = 86_400
+DEFAULT_RULES = {
+    "rate": 5.0,
+    "night_rate": None,
+    "night_start": "20:00",
+    "night_end": "06:00",
+    "first_hour": None,
+    "grace_minutes": 0,
+    "daily_cap": None,
+}
+
+
+def parse_hhmm(text):
+    # "HH:MM" -> segundos desde medianoche
+    try:
+        h, m = (int(x) for x in str(text).split(":"))
+    except ValueError:
+        raise ValueError(f"Hora inválida: {text} (use HH:MM).") from None
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise ValueError(f"Hora inválida: {text} (use HH:MM).")
+    return h * 3600 + m * 60
+
+
+def normalize_rules(rules):
+    """Reglas completas y validadas (ValueError con el problema)."""
+    out = dict(DEFAULT_RULES)
+    out.update({k: v for k, v in rules.items() if k in DEFAULT_RULES})
+    out["rate"] = float(out["rate"])
+    for key in ("night_rate", "first_hour", "daily_cap"):
+        if out[key] is not None:
+            out[key] = float(out[key])
+    out["grace_minutes"] = int(out["grace_minutes"] or 0)
+    if min(out["rate"], out["night_rate"] or 0, out["first_hour"] or 0, out["grace_minutes"]) < 0:
+        raise ValueError("Las tarifas y los minutos de gracia no pueden ser negativos.")
+    if out["daily_cap"] is not None and out["daily_cap"] <= 0:
+        raise ValueError("El tope diario debe ser mayor que cero.")
+    parse_hhmm(out["night_start"])
+    parse_hhmm(out["night_end"])
+    return out
+
+
+class Tariff:
+    def __init__(self, rules=None):
+        self.rules = normalize_rules(rules or {})
+        r = self.rules
+        self.flat = (
+            r["night_rate"] in (None, r["rate"])
+            and r["first_hour"] is None
+            and not r["grace_minutes"]
+            and r["daily_cap"] is None
+        )
+        # tramos del día: inicio (s) y tarifa por hora; prefix[k] = costo de 00:00 al inicio del tramo k
+        bands = [(0, r["rate"])]
+        if r["night_rate"] is not None:
+            start, end = parse_hhmm(r["night_start"]), parse_hhmm(r["night_end"])
+            if start > end:  # cruza la medianoche
+                bands = [(0, r["night_rate"]), (end, r["rate"]), (start, r["night_rate"])]
+            elif start < end:
+                bands = [(0, r["rate"]), (start, r["night_rate"]), (end, r["rate"])]
+        self.starts = [s for s, _ in bands]
+        self.rates = [rate for _, rate in bands]
+        self.prefix = [0.0]
+        for k in range(1, len(bands)):
+            self.prefix.append(self.prefix[-1] + (self.starts[k] - self.starts[k - 1]) * self.rates[k - 1] / 3600)
+        self.day_total = self.prefix[-1] + (DAY - self.starts[-1]) * self.rates[-1] / 3600
+
+    def _cum(self, x):
+        # costo acumulado desde las 00:00 hasta x segundos después (x puede pasar de un día)
+        days, tod = divmod(x, DAY)
+        k = bisect_right(self.starts, tod) - 1
+        return days * self.day_total + self.prefix[k] + (tod - self.starts[k]) * self.rates[k] / 3600
+
+    def cost(self, start_tod, seconds):
+        # costo de `seconds` segundos a partir de la hora del día start_tod
+        return self._cum(start_tod + seconds) - self._cum(start_tod)
+
+    def _window(self, tod, seconds, first):
+        # una ventana de hasta 24 h desde la entrada, con primera hora y tope
+        c = self.cost(tod, seconds)
+        if first and self.rules["first_hour"] is not None:
+            c += self.rules["first_hour"] - self.cost(tod, min(3600, seconds))
+        cap = self.rules["daily_cap"]
+        return c if cap is None else min(c, cap)
+
+    def price(self, checkin_dt, checkout_dt):
+        """(total, tiempo transcurrido) de una estadía."""
+        if self.flat:
+            return compute_amount(checkin_dt, checkout_dt, self.rules["rate"])
+        elapsed = checkout_dt - checkin_dt
+        minutes = max(1, int(elapsed.total_seconds() // 60))
+        if minutes <= self.rules["grace_minutes"]:
+            return 0.0, elapsed
+        billed = math.ceil(minutes / 60) * 3600
+        tod = checkin_dt.hour * 3600 + checkin_dt.minute * 60 + checkin_dt.second + checkin_dt.microsecond / 1e6
+        full, rest = divmod(billed, DAY)
+        if not full:
+            total = self._window(tod, rest, True)
+        else:
+            # las ventanas completas después de la primera cuestan un día entero
+            cap = self.rules["daily_cap"]
+            day = self.day_total if cap is None else min(self.day_total, cap)
+            total = self._window(tod, DAY, True) + (full - 1) * day
+            if rest:
+                total += self._window(tod, rest, False)
+        return round(total, 2), elapsed
@@ -0,0 +1,128 @@
+"""
+Tickets cerrados en formato compacto
+------------------------------------
+Un ticket cerrado como dict con datetimes ocupa varios cientos de bytes. Con
+millones de tickets en memoria eso domina el consumo del proceso, así que el
+almacén los guarda como columnas (struct-of-arrays):
+
+- ids, vehículo, puesto y operadores en array("q") (0 = sin operador);
+- entrada y salida en microsegundos de reloj local (ver billing.wall_micros),
+  sin pérdida de precisión al volver a datetime;
+- total en array("d").
+
+Al leer una fila se arma un ClosedTicket: un registro con __slots__ que se
+lee como dict (t["checkout"], get, keys, items, dict(t)), así que las vistas,
+los agregados y el archivo no cambian.
+
+No depende de Tkinter.
+"""
+
+from array import array
+from collections.abc import Mapping
+from datetime import timedelta
+
+from parqueadero_billing import EPOCH, wall_micros
+
+FIELDS = ("id", "vehicle_id", "spot_id", "checkin", "checkout", "user_in", "user_out", "total")
+_FIELD_SET = frozenset(FIELDS)
+
+
+class ClosedTicket(Mapping):
+    """Ticket cerrado de solo lectura con la interfaz de lectura de un dict."""
+
+    __slots__ = FIELDS
+
+    def __init__(self, id, vehicle_id, spot_id, checkin, checkout, user_in, user_out, total):
+        self.id = id
+        self.vehicle_id = vehicle_id
+        self.spot_id = spot_id
+        self.checkin = checkin
+        self.checkout = checkout
+        self.user_in = user_in
+        self.user_out = user_out
+        self.total = total
+
+    @classmethod
+    def from_dict(cls, t):
+        return cls(*(t[k] for k in FIELDS))
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"ClosedTicket({dict(self)!r})"
+
+
+class ClosedTicketTable:
+    """Tickets cerrados en columnas, en orden de cierre.
+
+    Se indexa por posición (t = table[i]) y se itera como una lista de
+    tickets; cada acceso arma un ClosedTicket nuevo.
+    """
+
+    def __init__(self, tickets=()):
+        self.ids = array("q")
+        self.vehicle = array("q")
+        self.spot = array("q")
+        self.checkin = array("q")  # microsegundos de reloj local
+        self.checkout = array("q")
+        self.user_in = array("q")  # 0 = sin operador
+        self.user_out = array("q")
+        self.total = array("d")
+        self._columns = (
+            self.ids, self.vehicle, self.spot, self.checkin, self.checkout,
+            self.user_in, self.user_out, self.total,
+        )
+        self.extend(tickets)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, t):
+        self.ids.append(t["id"])
+        self.vehicle.append(t["vehicle_id"])
+        self.spot.append(t["spot_id"])
+        self.checkin.append(wall_micros(t["checkin"]))
+        self.checkout.append(wall_micros(t["checkout"]))
+        self.user_in.append(t["user_in"] or 0)
+        self.user_out.append(t["user_out"] or 0)
+        self.total.append(float(t["total"]))
+
+    def extend(self, tickets):
+        for t in tickets:
+            self.append(t)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        return ClosedTicket(
+            self.ids[i],
+            self.vehicle[i],
+            self.spot[i],
+            EPOCH + timedelta(0, 0, self.checkin[i]),
+            EPOCH + timedelta(0, 0, self.checkout[i]),
+            self.user_in[i] or None,
+            self.user_out[i] or None,
+            self.total[i],
+        )
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self[i]
+
+    def drop_before(self, limit):
+        # quita los tickets con salida < limit (datetime)
+        cut = wall_micros(limit)
+        keep = [i for i, out in enumerate(self.checkout) if out >= cut]
+        if len(keep) == len(self):
+            return
+        for col in self._columns:
+            col[:] = array(col.typecode, [col[i] for i in keep])